@@ -1,13 +1,154 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
+from pymongo.errors import PyMongoError
+
+from api.compression import CompressionMiddleware
+from api.handlers import admin, demo, metrics, movie
+from api.metrics import MetricsMiddleware, MetricsRegistry
+from api.profiling import ProfileStore, ProfilingMiddleware
+from api.repository.movie.abstractions import MovieRepository
+from api.repository.movie.cache import CachedMovieRepository
+from api.repository.movie.factory import create_backend, create_movie_repository
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.mongo import MongoMovieRepository
+from api.repository.movie.pool import PoolMetrics
+from api.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+async def provision_indexes(repo: MovieRepository, settings: Settings):
+    if settings.mongo_ensure_indexes:
+        try:
+            await repo.ensure_indexes()
+        except PyMongoError:
+            if settings.mongo_require_indexes:
+                raise
+            # Checking them would wait for the failing server again.
+            logger.exception("Failed to create movie repository indexes")
+            return
+    try:
+        missing_indexes = await repo.missing_indexes()
+    except PyMongoError:
+        if settings.mongo_require_indexes:
+            raise
+        logger.exception("Failed to check movie repository indexes")
+        return
+    if not missing_indexes:
+        return
+    message = f"Movie repository is missing indexes: {', '.join(missing_indexes)}"
+    if settings.mongo_require_indexes:
+        raise RuntimeError(message)
+    logger.error(message)
+
 
-from api.handlers import demo, movie
+async def snapshot_periodically(
+    repo: MemoryMovieRepository,
+    path: str,
+    interval_seconds: float,
+):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await repo.save_snapshot(path)
+        except OSError:
+            logger.exception("Failed to save the movie snapshot to %s", path)
+
+
+def register_repository_metrics(
+    registry: MetricsRegistry,
+    repo: MovieRepository,
+    backend: MovieRepository,
+    pool_metrics: PoolMetrics,
+):
+    # Read from the existing statistics only when the metrics are scraped.
+    if isinstance(backend, MongoMovieRepository):
+        registry.callback_gauge(
+            "mongo_pool",
+            "MongoDB connection pool statistics of this worker.",
+            lambda: {(name,): value for name, value in pool_metrics.stats().items()},
+            ("stat",),
+        )
+    if isinstance(repo, CachedMovieRepository):
+        cache = repo.cache
+        registry.callback_gauge(
+            "movie_cache",
+            "Movie cache statistics of this worker.",
+            lambda: {(name,): value for name, value in cache.stats().items()},
+            ("stat",),
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = movie.settings_instance()
+    # The client is created here rather than at import time so that every
+    # worker process gets its own pool, bound to its own event loop.
+    pool_metrics = PoolMetrics(max_pool_size=settings.mongo_max_pool_size)
+    registry = getattr(app.state, "metrics", None)
+    backend = create_backend(settings, event_listeners=[pool_metrics])
+    repo = create_movie_repository(settings, metrics=registry, backend=backend)
+    if registry is not None:
+        register_repository_metrics(registry, repo, backend, pool_metrics)
+    app.state.pool_metrics = pool_metrics
+    app.state.movie_repository = repo
+    snapshots = None
+    snapshot_path = settings.memory_snapshot_path
+    if settings.movie_repository_backend == "memory" and snapshot_path is not None:
+        snapshots = asyncio.create_task(
+            snapshot_periodically(
+                backend,
+                snapshot_path,
+                settings.memory_snapshot_interval_seconds,
+            ),
+        )
+    try:
+        await provision_indexes(repo, settings)
+        yield
+    finally:
+        if snapshots is not None:
+            snapshots.cancel()
+            with suppress(asyncio.CancelledError):
+                await snapshots
+        # Closing drains the queued writes into the backend first, closing
+        # the memory backend keeps its movies for the final snapshot.
+        await repo.close()
+        if snapshots is not None:
+            await backend.save_snapshot(snapshot_path)
 
 
 def create_app():
-    app = FastAPI(docs_url="/")
+    app = FastAPI(docs_url="/", lifespan=lifespan)
+
+    # Middlewares
+    settings = movie.settings_instance()
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_minimum_bytes,
+            gzip_level=settings.compression_gzip_level,
+            brotli_quality=settings.compression_brotli_quality,
+        )
+    if settings.profiling_enabled:
+        store = ProfileStore(max_entries=settings.profiling_max_entries)
+        app.state.profiles = store
+        app.add_middleware(
+            ProfilingMiddleware,
+            store=store,
+            header=settings.profiling_header,
+        )
+    if settings.metrics_enabled:
+        registry = MetricsRegistry()
+        app.state.metrics = registry
+        app.add_middleware(MetricsMiddleware, registry=registry)
 
     # Routers
     app.include_router(demo.router)
     app.include_router(movie.router)
+    app.include_router(admin.router)
+    app.include_router(metrics.router)
 
     return app
@@ -0,0 +1,183 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+class GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level: int = 6):
+        # wbits 16 + MAX_WBITS writes the gzip header and trailer.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        # Flushed per chunk so that streamed chunks reach the client as they
+        # are produced instead of waiting in the compressor.
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH,
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    name = "br"
+
+    def __init__(self, quality: int = 4):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    """Content codings of an Accept-Encoding header with their q values."""
+    encodings = {}
+    for item in accept_encoding.split(","):
+        name, _, parameters = item.partition(";")
+        quality = 1.0
+        parameter, _, value = parameters.partition("=")
+        if parameter.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if name.strip():
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def weaken_etag(headers: MutableHeaders):
+    """
+    Mark the ETag weak, a compressed body is another representation, still
+    equivalent for If-None-Match.
+    """
+    if "etag" in headers and not headers["etag"].startswith("W/"):
+        headers["ETag"] = f"W/{headers['etag']}"
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with brotli, when the brotli
+    package is installed, or gzip, as negotiated with Accept-Encoding.
+    Complete bodies smaller than minimum_size are sent as they are,
+    streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self._minimum_size = minimum_size
+        self._gzip_level = gzip_level
+        self._brotli_quality = brotli_quality
+
+    def encoder(self, scope: Scope) -> GzipEncoder | BrotliEncoder | None:
+        encodings = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        wildcard = encodings.get("*", 0.0)
+        qualities = {}
+        if brotli is not None:
+            qualities[BrotliEncoder.name] = encodings.get("br", wildcard)
+        qualities[GzipEncoder.name] = encodings.get("gzip", wildcard)
+        # The highest q value wins, brotli on a tie.
+        name = max(qualities, key=qualities.__getitem__)
+        if qualities[name] <= 0:
+            return None
+        if name == BrotliEncoder.name:
+            return BrotliEncoder(self._brotli_quality)
+        return GzipEncoder(self._gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        encoder = self.encoder(scope) if scope["type"] == "http" else None
+        if encoder is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(send, encoder, self._minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    """
+    CompressionResponder compresses the response messages of one request,
+    the response start is held back until the first body chunk tells
+    whether the body is worth compressing.
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        encoder: GzipEncoder | BrotliEncoder,
+        minimum_size: int,
+    ):
+        self._send = send
+        self._encoder = encoder
+        self._minimum_size = minimum_size
+        self._start_message: Message | None = None
+        self._compressing = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self._start_message = message
+        elif message["type"] != "http.response.body":
+            await self._send(message)
+        elif self._compressing:
+            await self._send_body(message)
+        elif self._start_message is None:
+            await self._send(message)
+        else:
+            await self._start(message)
+
+    async def _start(self, message: Message):
+        start_message, self._start_message = self._start_message, None
+        headers = MutableHeaders(raw=start_message.setdefault("headers", []))
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if start_message["status"] == 304 and "content-encoding" not in headers:
+            # Validated against the representation a 200 would have sent,
+            # compressed, so it carries the same weak ETag.
+            headers.add_vary_header("Accept-Encoding")
+            weaken_etag(headers)
+        if (
+            "content-encoding" in headers
+            or start_message["status"] in (204, 304)
+            or (not more_body and len(body) < self._minimum_size)
+        ):
+            await self._send(start_message)
+            await self._send(message)
+            return
+        headers["Content-Encoding"] = self._encoder.name
+        headers.add_vary_header("Accept-Encoding")
+        weaken_etag(headers)
+        if more_body:
+            del headers["content-length"]
+            self._compressing = True
+            await self._send(start_message)
+            await self._send_body(message)
+            return
+        compressed = self._encoder.compress(body) + self._encoder.finish()
+        headers["Content-Length"] = str(len(compressed))
+        await self._send(start_message)
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    async def _send_body(self, message: Message):
+        more_body = message.get("more_body", False)
+        body = self._encoder.compress(message.get("body", b""))
+        if not more_body:
+            body += self._encoder.finish()
+        await self._send(
+            {"type": "http.response.body", "body": body, "more_body": more_body},
+        )
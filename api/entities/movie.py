@@ -49,3 +49,7 @@ class UpdateMovie(BaseModel):
     title: Optional[str]
     description: Optional[str]
     watched: Optional[bool]
+
+
+class BulkUpdateMovie(UpdateMovie):
+    movie_id: str
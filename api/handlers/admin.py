@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from starlette import status
+from starlette.responses import PlainTextResponse, Response
+
+from api.handlers.movie import movie_repository
+from api.profiling import ProfileStore, profile_data, profile_text
+from api.repository.movie.cache import CachedMovieRepository
+from api.repository.movie.mongo import MongoMovieRepository
+from api.responses.cache import CacheStatsResponse
+from api.responses.pool import PoolStatsResponse
+from api.responses.profile import ProfileResponse
+from api.responses.stats import MovieStatsResponse
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+
+
+@router.get("/cache", response_model=CacheStatsResponse)
+async def get_cache_stats(
+    repo: MongoMovieRepository = Depends(
+        movie_repository,
+    ),
+):
+    if not isinstance(repo, CachedMovieRepository):
+        return Response(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content="Movie cache is not enabled",
+        )
+    return CacheStatsResponse(**repo.cache.stats())
+
+
+@router.post("/stats/rebuild", response_model=MovieStatsResponse)
+async def rebuild_movie_stats(
+    repo: MongoMovieRepository = Depends(
+        movie_repository,
+    ),
+):
+    # Recounts the whole catalog, for when the incremental counters drifted.
+    await repo.rebuild_stats()
+    return MovieStatsResponse(**await repo.stats())
+
+
+@router.get("/pool", response_model=PoolStatsResponse)
+async def get_pool_stats(request: Request):
+    pool_metrics = getattr(request.app.state, "pool_metrics", None)
+    if pool_metrics is None:
+        return Response(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content="Connection pool metrics are not available",
+        )
+    return PoolStatsResponse(**pool_metrics.stats())
+
+
+def profile_store(request: Request) -> ProfileStore:
+    store = getattr(request.app.state, "profiles", None)
+    if store is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling is not enabled",
+        )
+    return store
+
+
+@router.get("/profiles", response_model=list[ProfileResponse])
+async def get_profiles(
+    store: ProfileStore = Depends(
+        profile_store,
+    ),
+):
+    return [ProfileResponse(**record._asdict()) for record in store.records()]
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    output_format: str = Query("prof", alias="format", regex="^(prof|text)$"),
+    store: ProfileStore = Depends(
+        profile_store,
+    ),
+):
+    record = store.get(profile_id)
+    if record is None:
+        return Response(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content=f"Profile {profile_id} is not exist",
+        )
+    if output_format == "text":
+        return PlainTextResponse(profile_text(record))
+    # Open with python -m pstats, snakeviz or any other pstats viewer.
+    return Response(
+        content=profile_data(record),
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": f'attachment; filename="{profile_id}.prof"',
+        },
+    )
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Request
+from starlette import status
+from starlette.responses import Response
+
+from api.metrics import CONTENT_TYPE
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=Response)
+async def get_metrics(request: Request):
+    registry = getattr(request.app.state, "metrics", None)
+    if registry is None:
+        return Response(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content="Metrics are not enabled",
+        )
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -1,15 +1,32 @@
+import base64
+import hashlib
+import json
 import uuid
 from collections import namedtuple
 from functools import lru_cache
+from typing import AsyncIterator, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request
 from starlette import status
-from starlette.responses import Response
+from starlette.responses import Response, StreamingResponse
 
-from api.entities.movie import Movie, UpdateMovie
-from api.repository.movie.abstractions import RepositoryException
+from api.entities.movie import BulkUpdateMovie, Movie, UpdateMovie
+from api.repository.movie.abstractions import (
+    FILTER_SORTS,
+    MOVIE_FIELDS,
+    SEARCH_MODES,
+    VERSION_FIELD,
+    BulkItemResult,
+    MovieRepository,
+    RepositoryException,
+    VersionConflictException,
+)
 from api.repository.movie.mongo import MongoMovieRepository
+from api.responses.bulk import BulkItemResponse
 from api.responses.detail import DetailResponse
+from api.responses.fast_json import FastJSONResponse, render_json
+from api.responses.imports import ImportResponse
+from api.responses.stats import MovieStatsResponse
 from api.settings import Settings
 
 router = APIRouter(prefix="/api/v1/movies", tags=["movies"])
@@ -20,17 +37,252 @@ def settings_instance():
     return Settings()
 
 
-@lru_cache()
-def movie_repository(settings: Settings = Depends(settings_instance)):
-    return MongoMovieRepository(
-        connection_string=settings.mongo_connection_string,
-        database=settings.mongo_database_name,
+def movie_repository(request: Request) -> MovieRepository:
+    # Created and closed by the application lifespan, see api.api.
+    return request.app.state.movie_repository
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(title: str, movie_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([title, movie_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        title, movie_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if isinstance(title, str) and isinstance(movie_id, str):
+            return title, movie_id
+    except (TypeError, ValueError):
+        pass
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid pagination cursor",
     )
 
 
-def pagination_params(offset: int = Query(0, qe=0), limit: int = Query(1000, le=1000)):
-    Pagination = namedtuple("Pagination", ["offset", "limit"])
-    return Pagination(offset=offset, limit=limit)
+def movie_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def page_etag(versions: list[tuple[str, int]]) -> str:
+    """ETag of a page from the (movie id, version) pairs of its movies."""
+    digest = hashlib.blake2b(json.dumps(versions).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    # Weak comparison, as If-None-Match requires.
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def if_match_versions(if_match: str) -> list[int]:
+    """
+    Versions listed by an If-Match header. Weak tags are accepted as well,
+    they only come from compressed representations of the same version.
+    """
+    versions = []
+    for tag in if_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.append(int(tag[1:-1]))
+    return versions
+
+
+def title_page_headers(
+    title: str,
+    versions: list[tuple[str, int]],
+    limit: int,
+) -> dict:
+    headers = {"ETag": page_etag(versions)}
+    if limit and len(versions) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(title, versions[-1][0])
+    return headers
+
+
+def split_version(document: dict) -> tuple[int, dict]:
+    # Copied rather than popped, documents may be shared with other readers.
+    return document[VERSION_FIELD], {
+        key: value for key, value in document.items() if key != VERSION_FIELD
+    }
+
+
+def pagination_params(
+    offset: int = Query(0, qe=0),
+    limit: int = Query(1000, le=1000),
+    cursor: str | None = Query(None, description="Cursor from X-Next-Cursor."),
+):
+    Pagination = namedtuple("Pagination", ["offset", "limit", "cursor"])
+    return Pagination(
+        offset=offset,
+        limit=limit,
+        cursor=decode_cursor(cursor) if cursor is not None else None,
+    )
+
+
+def field_selection(
+    fields: Optional[str] = Query(
+        None,
+        description="Comma separated Movie fields to return, movie_id is always "
+        "included.",
+    ),
+) -> list[str] | None:
+    if fields is None:
+        return None
+    selected_fields = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown_fields = set(selected_fields).difference(MOVIE_FIELDS)
+    if unknown_fields:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}",
+        )
+    return selected_fields
+
+
+def bulk_size_exceeded(items: list, settings: Settings) -> Response | None:
+    if len(items) <= settings.bulk_max_items:
+        return None
+    return Response(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        content=f"Bulk requests are limited to {settings.bulk_max_items} items",
+    )
+
+
+def bulk_item_responses(
+    results: list[BulkItemResult],
+    success_status: str,
+) -> list[BulkItemResponse]:
+    return [
+        BulkItemResponse(
+            movie_id=result.movie_id,
+            status=success_status if result.error is None else "failed",
+            detail=result.error,
+        )
+        for result in results
+    ]
+
+
+async def ndjson_documents(
+    repo: MovieRepository,
+    batch_size: int,
+) -> AsyncIterator[str]:
+    lines = []
+    async for document in repo.iter_documents(batch_size=batch_size):
+        lines.append(json.dumps(document))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def json_array_chunks(
+    documents: AsyncIterator[dict],
+    chunk_bytes: int,
+) -> AsyncIterator[bytes]:
+    """
+    Encode documents as a JSON array in chunks of about chunk_bytes, so the
+    response is sent while the documents are still being read.
+    """
+    chunk = bytearray(b"[")
+    separator = b""
+    async for document in documents:
+        chunk += separator
+        chunk += render_json(document)
+        separator = b","
+        if len(chunk) >= chunk_bytes:
+            yield bytes(chunk)
+            chunk.clear()
+    chunk += b"]"
+    yield bytes(chunk)
+
+
+async def stream_title_page(
+    repo: MovieRepository,
+    title: str,
+    pagination,
+    after_movie_id: str | None,
+    fields: list[str] | None,
+    documents: list[dict],
+    chunk_bytes: int,
+) -> StreamingResponse:
+    """
+    Stream a title page from its first documents, already read, and the rest
+    of the title. A page with a limit ends at the last movie of a read of its
+    ids, which is its cursor, so the next page neither skips nor repeats a
+    movie when the title changes in between. The page has no ETag as its
+    documents come from more than one read.
+    """
+    headers = {}
+    last_movie_id = None
+    if pagination.limit:
+        versions = await repo.get_title_versions(
+            title=title,
+            offset=pagination.offset,
+            limit=pagination.limit,
+            after_movie_id=after_movie_id,
+        )
+        if len(versions) == pagination.limit:
+            last_movie_id = versions[-1][0]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(title, last_movie_id)
+    rest = repo.iter_documents_by_title(
+        title=title,
+        fields=fields,
+        limit=0,
+        after_movie_id=documents[-1]["movie_id"],
+        through_movie_id=last_movie_id,
+    )
+    if last_movie_id is not None:
+        documents = [
+            document for document in documents if document["movie_id"] <= last_movie_id
+        ]
+    return StreamingResponse(
+        json_array_chunks(chain_documents(documents, rest), chunk_bytes),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+async def chain_documents(
+    first: list[dict],
+    rest: AsyncIterator[dict],
+) -> AsyncIterator[dict]:
+    for document in first:
+        yield document
+    async for document in rest:
+        yield document
+
+
+async def ndjson_lines(
+    stream: AsyncIterator[bytes],
+    max_line_bytes: int,
+) -> AsyncIterator[bytes | None]:
+    """
+    Split a byte stream into lines, lines longer than max_line_bytes are
+    dropped and reported as None so the buffer never grows past that size.
+    """
+    buffer = b""
+    oversized = False
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield None if oversized or len(line) > max_line_bytes else line
+            oversized = False
+        if len(buffer) > max_line_bytes:
+            buffer = b""
+            oversized = True
+    if oversized or buffer:
+        yield None if oversized else buffer
+
+
+async def import_batch(repo: MovieRepository, movies: list[Movie]) -> int:
+    results = await repo.create_many(movies)
+    return sum(1 for result in results if result.error is None)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
@@ -45,58 +297,298 @@ async def create_movie(
     return movie.movie_id
 
 
+@router.post("/bulk", response_model=list[BulkItemResponse])
+async def create_movies(
+    movies: list[Movie],
+    settings: Settings = Depends(settings_instance),
+    repo: MongoMovieRepository = Depends(
+        movie_repository,
+    ),
+):
+    if response := bulk_size_exceeded(movies, settings):
+        return response
+    for movie in movies:
+        movie.movie_id = str(uuid.uuid4())
+    results = await repo.create_many(movies)
+    return bulk_item_responses(results, "created")
+
+
+@router.patch("/bulk", response_model=list[BulkItemResponse])
+async def update_movies(
+    updates: list[BulkUpdateMovie],
+    settings: Settings = Depends(settings_instance),
+    repo: MongoMovieRepository = Depends(
+        movie_repository,
+    ),
+):
+    if response := bulk_size_exceeded(updates, settings):
+        return response
+    results = await repo.update_many(
+        [
+            (update.movie_id, update.dict(exclude_unset=True, exclude={"movie_id"}))
+            for update in updates
+        ],
+    )
+    return bulk_item_responses(results, "updated")
+
+
+@router.delete("/bulk", response_model=list[BulkItemResponse])
+async def delete_movies(
+    movie_ids: list[str] = Body(...),
+    settings: Settings = Depends(settings_instance),
+    repo: MongoMovieRepository = Depends(
+        movie_repository,
+    ),
+):
+    if response := bulk_size_exceeded(movie_ids, settings):
+        return response
+    results = await repo.delete_many(movie_ids)
+    return bulk_item_responses(results, "deleted")
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_movies(
+    settings: Settings = Depends(settings_instance),
+    repo: MongoMovieRepository = Depends(
+        movie_repository,
+    ),
+):
+    return StreamingResponse(
+        ndjson_documents(repo, settings.export_batch_size),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post("/import", response_model=ImportResponse)
+async def import_movies(
+    request: Request,
+    settings: Settings = Depends(settings_instance),
+    repo: MongoMovieRepository = Depends(
+        movie_repository,
+    ),
+):
+    imported, failed = 0, 0
+    batch = []
+    lines = ndjson_lines(request.stream(), settings.import_max_line_bytes)
+    async for line in lines:
+        if line is not None and not line.strip():
+            continue
+        try:
+            batch.append(Movie(**json.loads(line)))
+        except (TypeError, ValueError):
+            failed += 1
+            continue
+        if len(batch) >= settings.import_batch_size:
+            stored = await import_batch(repo, batch)
+            imported, failed = imported + stored, failed + len(batch) - stored
+            batch = []
+    if batch:
+        stored = await import_batch(repo, batch)
+        imported, failed = imported + stored, failed + len(batch) - stored
+    return ImportResponse(imported=imported, failed=failed)
+
+
 @router.get(
     "/",
+    response_class=FastJSONResponse,
 )
 async def get_movie_by_title(
     title: str = Query(..., description="The title of the movie.", min_length=3),
     pagination=Depends(pagination_params),
+    fields=Depends(field_selection),
+    if_none_match: Optional[str] = Header(None),
+    settings: Settings = Depends(settings_instance),
     repo: MongoMovieRepository = Depends(
         movie_repository,
     ),
 ):
-    movie = await repo.get_by_title(
+    after_movie_id = None
+    if pagination.cursor is not None:
+        cursor_title, after_movie_id = pagination.cursor
+        if cursor_title != title:
+            return Response(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content="Pagination cursor does not match the requested title",
+            )
+    if if_none_match is not None:
+        # Only the versions of the page are read to check the client's copy.
+        versions = await repo.get_title_versions(
+            title=title,
+            offset=pagination.offset,
+            limit=pagination.limit,
+            after_movie_id=after_movie_id,
+        )
+        headers = title_page_headers(title, versions, pagination.limit)
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    # At most one movie more than the buffer is read first, a page that fits
+    # is sent whole with the headers of the same read, a larger one streamed.
+    buffer_limit = settings.title_stream_buffer_documents + 1
+    streamable = pagination.limit == 0 or pagination.limit > buffer_limit
+    # Stored documents are returned as they are instead of being rebuilt
+    # into Movie models and encoded again.
+    versioned_documents = await repo.get_documents_by_title(
         title=title,
+        fields=fields,
         offset=pagination.offset,
-        limit=pagination.limit,
+        limit=buffer_limit if streamable else pagination.limit,
+        after_movie_id=after_movie_id,
+        with_version=True,
     )
-    if movie is None:
-        return DetailResponse(message=f"Movie with title {title} is not exist")
-    return movie
+    versions = []
+    documents = []
+    for versioned_document in versioned_documents:
+        version, document = split_version(versioned_document)
+        versions.append((document["movie_id"], version))
+        documents.append(document)
+    if streamable and len(documents) == buffer_limit:
+        return await stream_title_page(
+            repo,
+            title,
+            pagination,
+            after_movie_id,
+            fields,
+            documents,
+            settings.title_stream_chunk_bytes,
+        )
+    headers = title_page_headers(title, versions, pagination.limit)
+    return FastJSONResponse(content=documents, headers=headers)
+
+
+@router.get(
+    "/search",
+    response_class=FastJSONResponse,
+)
+async def search_movies(
+    q: str = Query(..., description="Words or title prefix to search for."),
+    mode: str = Query(
+        "text",
+        description="text ranks movies by the words found in their title and "
+        "description, prefix matches the beginning of the title.",
+        regex=f"^({'|'.join(SEARCH_MODES)})$",
+    ),
+    limit: int = Query(20, ge=1, le=100),
+    fields=Depends(field_selection),
+    repo: MongoMovieRepository = Depends(
+        movie_repository,
+    ),
+):
+    documents = await repo.search_documents(
+        q.strip(),
+        mode=mode,
+        fields=fields,
+        limit=limit,
+    )
+    return FastJSONResponse(content=documents)
+
+
+@router.get(
+    "/filter",
+    response_class=FastJSONResponse,
+)
+async def filter_movies(
+    release_year_from: Optional[int] = Query(None, description="Inclusive."),
+    release_year_to: Optional[int] = Query(None, description="Inclusive."),
+    watched: Optional[bool] = Query(None),
+    sort: str = Query(
+        "release_year",
+        description="release_year, or -release_year for the newest first.",
+        regex=f"^({'|'.join(FILTER_SORTS)})$",
+    ),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=1000),
+    fields=Depends(field_selection),
+    repo: MongoMovieRepository = Depends(
+        movie_repository,
+    ),
+):
+    documents = await repo.filter_documents(
+        release_year_from=release_year_from,
+        release_year_to=release_year_to,
+        watched=watched,
+        sort=sort,
+        fields=fields,
+        offset=offset,
+        limit=limit,
+    )
+    return FastJSONResponse(content=documents)
+
+
+@router.get("/stats", response_model=MovieStatsResponse)
+async def get_movie_stats(
+    repo: MongoMovieRepository = Depends(
+        movie_repository,
+    ),
+):
+    return MovieStatsResponse(**await repo.stats())
 
 
 @router.get(
     "/{movie_id}",
+    response_class=FastJSONResponse,
 )
 async def get_movie_by_id(
     movie_id: str,
+    fields=Depends(field_selection),
+    if_none_match: Optional[str] = Header(None),
     repo: MongoMovieRepository = Depends(
         movie_repository,
     ),
 ):
-    movie = await repo.get(movie_id=movie_id)
-    if movie is None:
+    if if_none_match is not None:
+        # Only the version is read to check the client's copy.
+        version = await repo.get_version(movie_id)
+        if version is not None and etag_matches(if_none_match, movie_etag(version)):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": movie_etag(version)},
+            )
+    versioned_document = await repo.get_document(
+        movie_id=movie_id,
+        fields=fields,
+        with_version=True,
+    )
+    if versioned_document is None:
         return Response(
             status_code=status.HTTP_404_NOT_FOUND,
             content=f"Movie with id {movie_id} is not exist",
         )
-    return movie
+    version, document = split_version(versioned_document)
+    return FastJSONResponse(content=document, headers={"ETag": movie_etag(version)})
 
 
 @router.patch("/{movie_id}")
 async def update_movie(
     movie_id: str,
     update_parameters: UpdateMovie,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     repo: MongoMovieRepository = Depends(
         movie_repository,
     ),
 ):
+    parameters = update_parameters.dict(exclude_unset=True)
     try:
-        await repo.update(
-            movie_id=movie_id,
-            update_parameters=update_parameters.dict(exclude_unset=True),
-        )
+        if if_match is None or if_match.strip() == "*":
+            await repo.update(movie_id=movie_id, update_parameters=parameters)
+            return DetailResponse(message="Movie successfully updated")
+        versions = if_match_versions(if_match)
+        version = versions[0] if versions else None
+        if len(versions) > 1:
+            # The listed version the movie has, if any, is checked again by
+            # the compare-and-set update.
+            current_version = await repo.get_version(movie_id)
+            version = current_version if current_version in versions else None
+        if version is None:
+            raise VersionConflictException(f"movie: {movie_id} was modified")
+        new_version = await repo.update_if_version(movie_id, version, parameters)
+        response.headers["ETag"] = movie_etag(new_version)
         return DetailResponse(message="Movie successfully updated")
+    except VersionConflictException as exc:
+        return Response(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            content=exc.args[0],
+        )
     except RepositoryException as exc:
         return Response(status_code=status.HTTP_400_BAD_REQUEST, content=exc.args[0])
 
@@ -0,0 +1,242 @@
+import bisect
+import math
+import time
+from typing import Callable, Iterator
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Latency buckets in seconds.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def format_labels(labelnames: tuple[str, ...], labelvalues: tuple) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(
+        f'{name}="{escape(str(value))}"' for name, value in zip(labelnames, labelvalues)
+    )
+    return "{" + pairs + "}"
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterator[tuple[str, tuple[str, ...], tuple, float]]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        for name, labelnames, labelvalues, value in self.samples():
+            labels = format_labels(labelnames, labelvalues)
+            yield f"{name}{labels} {format_value(value)}"
+
+
+class Counter(Metric):
+    """Monotonic counter, one value per label combination."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labelvalues: tuple = (), amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, labelvalues: tuple = ()) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        for labelvalues, value in self._values.items():
+            yield self.name, self.labelnames, labelvalues, value
+
+
+class Gauge(Counter):
+    """Value which can go up and down, one value per label combination."""
+
+    type = "gauge"
+
+    def dec(self, labelvalues: tuple = (), amount: float = 1):
+        self.inc(labelvalues, -amount)
+
+    def set(self, value: float, labelvalues: tuple = ()):
+        self._values[labelvalues] = value
+
+
+class CallbackGauge(Metric):
+    """Gauge whose values are read from a callback when the metrics are scraped."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], dict[tuple, float]],
+        labelnames=(),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+
+    def samples(self):
+        for labelvalues, value in self._callback().items():
+            yield self.name, self.labelnames, labelvalues, value
+
+
+class Histogram(Metric):
+    """
+    Histogram with fixed buckets. Observations only increment a bucket, the
+    cumulative counts are computed when the metrics are rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames=(),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # labelvalues -> [per bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, labelvalues: tuple = ()):
+        counts = self._values.get(labelvalues)
+        if counts is None:
+            counts = self._values[labelvalues] = [0] * (len(self._buckets) + 2)
+        counts[bisect.bisect_left(self._buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, labelvalues: tuple = ()) -> int:
+        counts = self._values.get(labelvalues)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def samples(self):
+        labelnames = (*self.labelnames, "le")
+        for labelvalues, counts in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self._buckets, math.inf), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    labelnames,
+                    (*labelvalues, format_value(bound)),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", self.labelnames, labelvalues, counts[-1]
+            yield f"{self.name}_count", self.labelnames, labelvalues, cumulative
+
+
+class MetricsRegistry:
+    """
+    MetricsRegistry holds the metrics of a worker process and renders them
+    in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric):
+        """Add a metric, replacing any metric registered under the same name."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._get_or_register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=()) -> Histogram:
+        return self._get_or_register(Histogram, name, documentation, labelnames)
+
+    def callback_gauge(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], dict[tuple, float]],
+        labelnames=(),
+    ) -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, callback, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _get_or_register(self, metric_class, name, documentation, labelnames):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self.register(metric_class(name, documentation, labelnames))
+        return metric
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template and the
+    number of requests in flight.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry):
+        self.app = app
+        self._latency = registry.histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency by method, route and status code.",
+            ("method", "route", "status"),
+        )
+        self._in_flight = registry.gauge(
+            "http_requests_in_flight",
+            "HTTP requests currently being served.",
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        self._in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self._in_flight.dec()
+            # The router stores the matched route in the scope, its path
+            # template keeps the label cardinality bounded.
+            route = scope.get("route")
+            self._latency.observe(
+                time.perf_counter() - started,
+                (
+                    scope["method"],
+                    getattr(route, "path", "unmatched"),
+                    status_code,
+                ),
+            )
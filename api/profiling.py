@@ -0,0 +1,121 @@
+import cProfile
+import io
+import marshal
+import pstats
+import secrets
+import time
+from collections import OrderedDict, namedtuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+ProfileRecord = namedtuple(
+    "ProfileRecord",
+    ["profile_id", "method", "path", "status_code", "duration_seconds", "stats"],
+)
+
+
+class ProfileStore:
+    """
+    ProfileStore keeps the most recent request profiles, the oldest one is
+    dropped once max_entries are stored.
+    """
+
+    def __init__(self, max_entries: int = 20):
+        self._max_entries = max_entries
+        self._records: OrderedDict[str, ProfileRecord] = OrderedDict()
+
+    def add(self, record: ProfileRecord):
+        self._records[record.profile_id] = record
+        while len(self._records) > self._max_entries:
+            self._records.popitem(last=False)
+
+    def get(self, profile_id: str) -> ProfileRecord | None:
+        return self._records.get(profile_id)
+
+    def records(self) -> list[ProfileRecord]:
+        return list(reversed(self._records.values()))
+
+
+def profile_data(record: ProfileRecord) -> bytes:
+    """Profile in the binary format written by cProfile and read by pstats."""
+    return marshal.dumps(record.stats)
+
+
+def profile_text(record: ProfileRecord, limit: int = 50) -> str:
+    output = io.StringIO()
+    stats = pstats.Stats(StatsSource(record.stats), stream=output)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return output.getvalue()
+
+
+class StatsSource:
+    """Minimal profile stand-in pstats.Stats loads collected stats from."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware running cProfile for requests which carry the profiling
+    header and storing the result in a ProfileStore. It is only installed
+    when profiling is enabled in the settings.
+
+    The profiler traces the whole event loop thread, so work done for other
+    requests while the profiled one awaits shows up in its profile too. Only
+    one request is profiled at a time, others carrying the header while a
+    profile is running are served without one.
+    """
+
+    def __init__(self, app: ASGIApp, store: ProfileStore, header: str):
+        self.app = app
+        self._store = store
+        self._header = header.lower().encode("latin-1")
+        self._active = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or self._active
+            or not any(name == self._header for name, _ in scope["headers"])
+        ):
+            await self.app(scope, receive, send)
+            return
+        profile_id = secrets.token_hex(8)
+        status_code = 500
+
+        async def send_with_profile_id(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER.lower().encode("latin-1"), profile_id.encode()),
+                ]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        self._active = True
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            self._active = False
+            profiler.create_stats()
+            self._store.add(
+                ProfileRecord(
+                    profile_id=profile_id,
+                    method=scope["method"],
+                    path=scope["path"],
+                    status_code=status_code,
+                    duration_seconds=time.perf_counter() - started,
+                    stats=profiler.stats,
+                ),
+            )
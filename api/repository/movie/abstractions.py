@@ -1,16 +1,111 @@
 import abc
+import re
+import time
+from collections import namedtuple
+from typing import AsyncIterator, Iterable
 
 from api.entities.movie import Movie
 
+# Fields of the stored movie documents, movie_id is part of every projection.
+MOVIE_FIELDS = tuple(Movie.__fields__)
+
+# Outcome of a single item of a bulk operation, error is None on success.
+BulkItemResult = namedtuple("BulkItemResult", ["movie_id", "error"])
+
+# Document key holding the movie version, see MovieRepository.get_version.
+VERSION_FIELD = "version"
+
+# Outcome of a single delete.
+DeletedMovie = namedtuple("DeletedMovie", ["deleted_count"])
+
+
+# Search modes: "text" matches whole words of the title and the description,
+# ranked by relevance, "prefix" matches the beginning of the title.
+SEARCH_MODES = ("text", "prefix")
+
+# Relevance of a word found in each searchable field.
+SEARCH_WEIGHTS = {"title": 10, "description": 1}
+
+# Orders of filtered queries, ties are broken by movie id in the same
+# direction.
+FILTER_SORTS = ("release_year", "-release_year")
+
+_WORD = re.compile(r"\w+")
+
 
 class RepositoryException(Exception):
     pass
 
 
+class VersionConflictException(RepositoryException):
+    pass
+
+
+def projection_fields(fields: list[str] | None) -> tuple[str, ...]:
+    """
+    Movie fields returned for a projection, in document order. movie_id is
+    always included, None selects every field.
+    """
+    if fields is None:
+        return MOVIE_FIELDS
+    return tuple(
+        field for field in MOVIE_FIELDS if field == "movie_id" or field in fields
+    )
+
+
+def new_version() -> int:
+    """
+    Version of a newly created movie. Starting from the clock rather than
+    from 1 keeps a movie recreated under a deleted movie's id from reusing
+    the deleted movie's versions.
+    """
+    return time.time_ns()
+
+
+def search_tokens(text: str) -> list[str]:
+    """Case-insensitive words of a text, in order, as used by text search."""
+    return _WORD.findall(text.casefold())
+
+
+def movie_stats(counts: Iterable[tuple[bool, int, int]]) -> dict:
+    """
+    Catalog statistics from the number of movies per (watched, release
+    year) pair.
+    """
+    by_release_year: dict[int, int] = {}
+    watched = total = 0
+    for is_watched, release_year, count in counts:
+        if not count:
+            continue
+        by_release_year[release_year] = by_release_year.get(release_year, 0) + count
+        total += count
+        if is_watched:
+            watched += count
+    return {
+        "total": total,
+        "watched": watched,
+        "unwatched": total - watched,
+        "watched_ratio": watched / total if total else 0.0,
+        "by_release_year": dict(sorted(by_release_year.items())),
+    }
+
+
 class MovieRepository(abc.ABC):
+    async def close(self):
+        pass
+
+    async def ensure_indexes(self):
+        pass
+
+    async def missing_indexes(self) -> list[str]:
+        return []
+
     async def create(self, movie: Movie):
         raise NotImplementedError
 
+    async def create_many(self, movies: list[Movie]) -> list[BulkItemResult]:
+        raise NotImplementedError
+
     async def get(self, movie_id: str) -> Movie | None:
         raise NotImplementedError
 
@@ -19,11 +114,131 @@ class MovieRepository(abc.ABC):
         title: str,
         offset: int = 0,
         limit: int = 1000,
+        after_movie_id: str | None = None,
     ) -> list[Movie]:
         raise NotImplementedError
 
+    async def get_document(
+        self,
+        movie_id: str,
+        fields: list[str] | None = None,
+        with_version: bool = False,
+    ) -> dict | None:
+        """
+        The selected fields of a movie, with_version adds the movie version
+        under VERSION_FIELD.
+        """
+        raise NotImplementedError
+
+    async def get_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        with_version: bool = False,
+    ) -> list[dict]:
+        raise NotImplementedError
+
+    async def get_version(self, movie_id: str) -> int | None:
+        """
+        Version of a movie, it changes on every update. None when the movie
+        does not exist.
+        """
+        raise NotImplementedError
+
+    async def get_title_versions(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[tuple[str, int]]:
+        """(movie id, version) pairs of a get_documents_by_title page."""
+        raise NotImplementedError
+
+    async def search_documents(
+        self,
+        query: str,
+        mode: str = "text",
+        fields: list[str] | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        raise NotImplementedError
+
+    async def filter_documents(
+        self,
+        release_year_from: int | None = None,
+        release_year_to: int | None = None,
+        watched: bool | None = None,
+        sort: str = "release_year",
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+    ) -> list[dict]:
+        """
+        Documents of the movies released between release_year_from and
+        release_year_to, both inclusive, with the given watched flag. None
+        leaves a criterion out.
+        """
+        raise NotImplementedError
+
+    def iter_documents(self, batch_size: int = 1000) -> AsyncIterator[dict]:
+        raise NotImplementedError
+
+    def iter_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        through_movie_id: str | None = None,
+    ) -> AsyncIterator[dict]:
+        """
+        The get_documents_by_title page as it is read from the backend, so
+        that large pages are not held in memory at once. through_movie_id
+        ends the page at that movie id, included.
+        """
+        raise NotImplementedError
+
+    async def stats(self) -> dict:
+        """
+        Catalog statistics, see movie_stats. They are kept up to date by the
+        writes so reading them does not depend on the catalog size.
+        """
+        raise NotImplementedError
+
+    async def rebuild_stats(self):
+        """Recompute the statistics from the stored movies."""
+        pass
+
     async def delete(self, movie_id: str):
         raise NotImplementedError
 
+    async def delete_many(self, movie_ids: list[str]) -> list[BulkItemResult]:
+        raise NotImplementedError
+
     async def update(self, movie_id: str, update_parameters: dict):
         raise NotImplementedError
+
+    async def update_if_version(
+        self,
+        movie_id: str,
+        version: int,
+        update_parameters: dict,
+    ) -> int:
+        """
+        Update the movie only if its version is still version, checked and
+        applied as one step, and return its new version. An update which
+        changes nothing keeps the version. Raises VersionConflictException
+        when the movie has another version.
+        """
+        raise NotImplementedError
+
+    async def update_many(
+        self,
+        updates: list[tuple[str, dict]],
+    ) -> list[BulkItemResult]:
+        raise NotImplementedError
@@ -0,0 +1,384 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import (
+    BulkItemResult,
+    MovieRepository,
+    projection_fields,
+)
+from api.repository.movie.delegating import DelegatingMovieRepository
+
+# Returned by TTLCache lookups when there is no live entry, None is a valid
+# cached value (a movie which does not exist).
+MISSING = object()
+
+# Tag carried by every cached title page.
+TITLE_PAGES_TAG = ("title-pages",)
+
+# Kinds of the title page keys, which hold the title after the kind.
+TITLE_PAGE_KINDS = ("title", "title-documents", "title-versions")
+
+
+class TTLCache:
+    """
+    TTLCache is a bounded LRU cache whose entries expire ttl_seconds after
+    they were stored. Entries carry tags so related entries can be
+    invalidated together.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        # key -> (expires_at, value, tags), least recently used first.
+        self._entries: OrderedDict[Hashable, tuple[float, Any, tuple]] = OrderedDict()
+        # tag -> keys of the entries carrying that tag.
+        self._tags: dict[Hashable, set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        value = self.peek(key)
+        if value is MISSING:
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: Hashable) -> Any:
+        """Look a key up without touching the statistics or the LRU order."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value, _ = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            return MISSING
+        return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = ()):
+        if key in self._entries:
+            self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (self._clock() + self._ttl_seconds, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self._max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def tagged(self, tag: Hashable) -> list[Hashable]:
+        """Keys of the entries carrying tag, live or expired."""
+        return list(self._tags.get(tag, ()))
+
+    def invalidate(self, tag: Hashable):
+        for key in self._tags.pop(tag, ()):
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self._max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+
+class CachedMovieRepository(DelegatingMovieRepository):
+    """
+    CachedMovieRepository serves get and get_by_title from a TTLCache in
+    front of another repository and invalidates affected entries on writes.
+    """
+
+    def __init__(
+        self,
+        repository: MovieRepository,
+        max_entries: int = 10000,
+        ttl_seconds: float = 30.0,
+    ):
+        super().__init__(repository)
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        # Bumped after every write, a read which overlapped a write is not
+        # cached because it may have observed the previous state.
+        self._generation = 0
+
+    @property
+    def cache(self) -> TTLCache:
+        return self._cache
+
+    async def create(self, movie: Movie):
+        try:
+            await self._repository.create(movie)
+        finally:
+            self._invalidate_created(movie)
+
+    async def create_many(self, movies: list[Movie]) -> list[BulkItemResult]:
+        try:
+            return await self._repository.create_many(movies)
+        finally:
+            for movie in movies:
+                self._invalidate_created(movie)
+
+    async def get(self, movie_id: str) -> Movie | None:
+        return await self._read(
+            ("movie", movie_id),
+            lambda: self._repository.get(movie_id),
+            lambda movie: [("id", movie_id)],
+        )
+
+    async def get_by_title(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[Movie]:
+        return await self._read(
+            ("title", title, offset, limit, after_movie_id),
+            lambda: self._repository.get_by_title(
+                title=title,
+                offset=offset,
+                limit=limit,
+                after_movie_id=after_movie_id,
+            ),
+            lambda movies: self._title_page_tags(
+                title,
+                [movie.id for movie in movies],
+            ),
+        )
+
+    async def get_document(
+        self,
+        movie_id: str,
+        fields: list[str] | None = None,
+        with_version: bool = False,
+    ) -> dict | None:
+        return await self._read(
+            ("document", movie_id, projection_fields(fields), with_version),
+            lambda: self._repository.get_document(
+                movie_id,
+                fields=fields,
+                with_version=with_version,
+            ),
+            lambda document: [("id", movie_id)],
+        )
+
+    async def get_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        with_version: bool = False,
+    ) -> list[dict]:
+        return await self._read(
+            (
+                "title-documents",
+                title,
+                projection_fields(fields),
+                offset,
+                limit,
+                after_movie_id,
+                with_version,
+            ),
+            lambda: self._repository.get_documents_by_title(
+                title=title,
+                fields=fields,
+                offset=offset,
+                limit=limit,
+                after_movie_id=after_movie_id,
+                with_version=with_version,
+            ),
+            lambda documents: self._title_page_tags(
+                title,
+                [document["movie_id"] for document in documents],
+            ),
+        )
+
+    async def get_version(self, movie_id: str) -> int | None:
+        return await self._read(
+            ("version", movie_id),
+            lambda: self._repository.get_version(movie_id),
+            lambda version: [("id", movie_id)],
+        )
+
+    async def get_title_versions(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[tuple[str, int]]:
+        return await self._read(
+            ("title-versions", title, offset, limit, after_movie_id),
+            lambda: self._repository.get_title_versions(
+                title=title,
+                offset=offset,
+                limit=limit,
+                after_movie_id=after_movie_id,
+            ),
+            lambda versions: self._title_page_tags(
+                title,
+                [movie_id for movie_id, _ in versions],
+            ),
+        )
+
+    async def delete(self, movie_id: str):
+        previous_title = self._cached_title(movie_id)
+        try:
+            return await self._repository.delete(movie_id)
+        finally:
+            self._invalidate_changed(movie_id, previous_title)
+
+    async def delete_many(self, movie_ids: list[str]) -> list[BulkItemResult]:
+        previous_titles = [self._cached_title(movie_id) for movie_id in movie_ids]
+        try:
+            return await self._repository.delete_many(movie_ids)
+        finally:
+            for movie_id, previous_title in zip(movie_ids, previous_titles):
+                self._invalidate_changed(movie_id, previous_title)
+
+    async def update(self, movie_id: str, update_parameters: dict):
+        previous_title = self._cached_title(movie_id)
+        try:
+            await self._repository.update(movie_id, update_parameters)
+        finally:
+            self._invalidate_changed(
+                movie_id,
+                previous_title,
+                update_parameters.get("title"),
+            )
+
+    async def update_if_version(
+        self,
+        movie_id: str,
+        version: int,
+        update_parameters: dict,
+    ) -> int:
+        previous_title = self._cached_title(movie_id)
+        try:
+            return await self._repository.update_if_version(
+                movie_id,
+                version,
+                update_parameters,
+            )
+        finally:
+            self._invalidate_changed(
+                movie_id,
+                previous_title,
+                update_parameters.get("title"),
+            )
+
+    async def update_many(
+        self,
+        updates: list[tuple[str, dict]],
+    ) -> list[BulkItemResult]:
+        previous_titles = [self._cached_title(movie_id) for movie_id, _ in updates]
+        try:
+            return await self._repository.update_many(updates)
+        finally:
+            for (movie_id, update_parameters), previous_title in zip(
+                updates,
+                previous_titles,
+            ):
+                self._invalidate_changed(
+                    movie_id,
+                    previous_title,
+                    update_parameters.get("title"),
+                )
+
+    async def _read(
+        self,
+        key: Hashable,
+        load: Callable[[], Awaitable[Any]],
+        tags: Callable[[Any], list[Hashable]],
+    ) -> Any:
+        value = self._cache.get(key)
+        if value is not MISSING:
+            return value
+        generation = self._generation
+        value = await load()
+        if generation == self._generation:
+            self._cache.set(key, value, tags=tags(value))
+        return value
+
+    @staticmethod
+    def _title_page_tags(title: str, movie_ids: list[str]) -> list[Hashable]:
+        tags: list[Hashable] = [TITLE_PAGES_TAG, ("title", title)]
+        tags.extend(("id", movie_id) for movie_id in movie_ids)
+        return tags
+
+    def _cached_title(self, movie_id: str) -> Any:
+        """
+        Title of a movie as seen by the live cached reads listing it, None
+        when it is cached as absent and MISSING when none of them knows it.
+        Read before writing, the write invalidates those reads.
+        """
+        for key in self._cache.tagged(("id", movie_id)):
+            value = self._cache.peek(key)
+            if value is MISSING:
+                continue
+            kind = key[0]
+            if kind in TITLE_PAGE_KINDS:
+                return key[1]
+            if value is None:
+                return None
+            if kind == "movie":
+                return value.title
+            if kind == "document" and "title" in value:
+                return value["title"]
+        return MISSING
+
+    def _invalidate_created(self, movie: Movie):
+        self._generation += 1
+        self._cache.invalidate(("id", movie.id))
+        self._cache.invalidate(("title", movie.title))
+
+    def _invalidate_changed(
+        self,
+        movie_id: str,
+        previous_title: Any,
+        new_title: str | None = None,
+    ):
+        self._generation += 1
+        self._cache.invalidate(("id", movie_id))
+        if previous_title is MISSING:
+            # The movie's title is unknown, any title page may have shifted.
+            self._cache.invalidate(TITLE_PAGES_TAG)
+        elif previous_title is not None:
+            self._cache.invalidate(("title", previous_title))
+        if new_title is not None:
+            self._cache.invalidate(("title", new_title))
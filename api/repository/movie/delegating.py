@@ -0,0 +1,185 @@
+from typing import AsyncIterator
+
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import BulkItemResult, MovieRepository
+
+
+class DelegatingMovieRepository(MovieRepository):
+    """
+    DelegatingMovieRepository forwards every call to a wrapped repository,
+    it is the base for repositories which decorate another backend.
+    """
+
+    def __init__(self, repository: MovieRepository):
+        self._repository = repository
+
+    @property
+    def repository(self) -> MovieRepository:
+        return self._repository
+
+    async def close(self):
+        await self._repository.close()
+
+    async def ensure_indexes(self):
+        await self._repository.ensure_indexes()
+
+    async def missing_indexes(self) -> list[str]:
+        return await self._repository.missing_indexes()
+
+    async def create(self, movie: Movie):
+        await self._repository.create(movie)
+
+    async def create_many(self, movies: list[Movie]) -> list[BulkItemResult]:
+        return await self._repository.create_many(movies)
+
+    async def get(self, movie_id: str) -> Movie | None:
+        return await self._repository.get(movie_id)
+
+    async def get_by_title(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[Movie]:
+        return await self._repository.get_by_title(
+            title=title,
+            offset=offset,
+            limit=limit,
+            after_movie_id=after_movie_id,
+        )
+
+    async def get_document(
+        self,
+        movie_id: str,
+        fields: list[str] | None = None,
+        with_version: bool = False,
+    ) -> dict | None:
+        return await self._repository.get_document(
+            movie_id,
+            fields=fields,
+            with_version=with_version,
+        )
+
+    async def get_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        with_version: bool = False,
+    ) -> list[dict]:
+        return await self._repository.get_documents_by_title(
+            title=title,
+            fields=fields,
+            offset=offset,
+            limit=limit,
+            after_movie_id=after_movie_id,
+            with_version=with_version,
+        )
+
+    async def get_version(self, movie_id: str) -> int | None:
+        return await self._repository.get_version(movie_id)
+
+    async def get_title_versions(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[tuple[str, int]]:
+        return await self._repository.get_title_versions(
+            title=title,
+            offset=offset,
+            limit=limit,
+            after_movie_id=after_movie_id,
+        )
+
+    async def search_documents(
+        self,
+        query: str,
+        mode: str = "text",
+        fields: list[str] | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        return await self._repository.search_documents(
+            query,
+            mode=mode,
+            fields=fields,
+            limit=limit,
+        )
+
+    async def filter_documents(
+        self,
+        release_year_from: int | None = None,
+        release_year_to: int | None = None,
+        watched: bool | None = None,
+        sort: str = "release_year",
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+    ) -> list[dict]:
+        return await self._repository.filter_documents(
+            release_year_from=release_year_from,
+            release_year_to=release_year_to,
+            watched=watched,
+            sort=sort,
+            fields=fields,
+            offset=offset,
+            limit=limit,
+        )
+
+    def iter_documents(self, batch_size: int = 1000) -> AsyncIterator[dict]:
+        return self._repository.iter_documents(batch_size=batch_size)
+
+    def iter_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        through_movie_id: str | None = None,
+    ) -> AsyncIterator[dict]:
+        return self._repository.iter_documents_by_title(
+            title=title,
+            fields=fields,
+            offset=offset,
+            limit=limit,
+            after_movie_id=after_movie_id,
+            through_movie_id=through_movie_id,
+        )
+
+    async def stats(self) -> dict:
+        return await self._repository.stats()
+
+    async def rebuild_stats(self):
+        await self._repository.rebuild_stats()
+
+    async def delete(self, movie_id: str):
+        return await self._repository.delete(movie_id)
+
+    async def delete_many(self, movie_ids: list[str]) -> list[BulkItemResult]:
+        return await self._repository.delete_many(movie_ids)
+
+    async def update(self, movie_id: str, update_parameters: dict):
+        await self._repository.update(movie_id, update_parameters)
+
+    async def update_if_version(
+        self,
+        movie_id: str,
+        version: int,
+        update_parameters: dict,
+    ) -> int:
+        return await self._repository.update_if_version(
+            movie_id,
+            version,
+            update_parameters,
+        )
+
+    async def update_many(
+        self,
+        updates: list[tuple[str, dict]],
+    ) -> list[BulkItemResult]:
+        return await self._repository.update_many(updates)
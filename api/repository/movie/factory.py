@@ -0,0 +1,96 @@
+import os
+
+from api.metrics import MetricsRegistry
+from api.repository.movie.abstractions import MovieRepository
+from api.repository.movie.cache import CachedMovieRepository
+from api.repository.movie.instrumented import InstrumentedMovieRepository
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.mongo import MongoMovieRepository
+from api.repository.movie.single_flight import SingleFlightMovieRepository
+from api.repository.movie.sqlite import SqliteMovieRepository
+from api.repository.movie.write_behind import WriteBehindMovieRepository
+from api.settings import Settings
+
+
+def mongo_client_options(
+    settings: Settings,
+    event_listeners: list | None = None,
+) -> dict:
+    options = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+        "connectTimeoutMS": settings.mongo_connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+        "socketTimeoutMS": settings.mongo_socket_timeout_ms,
+        "readPreference": settings.mongo_read_preference,
+        "event_listeners": event_listeners,
+    }
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def create_backend(
+    settings: Settings,
+    event_listeners: list | None = None,
+) -> MovieRepository:
+    backend = settings.movie_repository_backend
+    if backend == "mongo":
+        return MongoMovieRepository(
+            connection_string=settings.mongo_connection_string,
+            database=settings.mongo_database_name,
+            **mongo_client_options(settings, event_listeners),
+        )
+    if backend == "memory":
+        repo = MemoryMovieRepository(compact=settings.memory_compact_storage)
+        snapshot_path = settings.memory_snapshot_path
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            repo.load_snapshot(snapshot_path)
+        return repo
+    if backend == "sqlite":
+        return SqliteMovieRepository(
+            settings.sqlite_path,
+            synchronous=settings.sqlite_synchronous,
+            compact=settings.memory_compact_storage,
+        )
+    raise ValueError(f"Unknown movie repository backend: {backend}")
+
+
+def create_movie_repository(
+    settings: Settings,
+    event_listeners: list | None = None,
+    metrics: MetricsRegistry | None = None,
+    backend: MovieRepository | None = None,
+) -> MovieRepository:
+    """
+    Build the movie repository described by the settings, on top of backend
+    when it was already created by create_backend. Call it once per worker
+    process, after the fork, from the application lifespan.
+    """
+    repo = backend or create_backend(settings, event_listeners)
+    if metrics is not None:
+        # Below the cache, so only the calls reaching the backend are timed.
+        repo = InstrumentedMovieRepository(
+            repo,
+            metrics,
+            backend=settings.movie_repository_backend,
+        )
+    if settings.write_behind_enabled:
+        # Below the read coalescing and the cache, which see a queued write
+        # as done and forward the reads that must wait for it.
+        repo = WriteBehindMovieRepository(
+            repo,
+            max_batch=settings.write_behind_max_batch,
+            flush_interval_seconds=settings.write_behind_flush_interval_seconds,
+            durability=settings.write_behind_durability,
+            max_pending=settings.write_behind_max_pending,
+        )
+    if settings.movie_single_flight_enabled:
+        repo = SingleFlightMovieRepository(repo, metrics)
+    if settings.movie_cache_enabled:
+        repo = CachedMovieRepository(
+            repo,
+            max_entries=settings.movie_cache_max_entries,
+            ttl_seconds=settings.movie_cache_ttl_seconds,
+        )
+    return repo
@@ -0,0 +1,256 @@
+import time
+from typing import Any, AsyncIterator, Awaitable
+
+from api.entities.movie import Movie
+from api.metrics import MetricsRegistry
+from api.repository.movie.abstractions import BulkItemResult, MovieRepository
+from api.repository.movie.delegating import DelegatingMovieRepository
+
+
+class InstrumentedMovieRepository(DelegatingMovieRepository):
+    """
+    InstrumentedMovieRepository records the latency and the errors of every
+    call to another repository, labelled by backend and operation.
+    """
+
+    def __init__(
+        self,
+        repository: MovieRepository,
+        registry: MetricsRegistry,
+        backend: str,
+    ):
+        super().__init__(repository)
+        self._backend = backend
+        self._latency = registry.histogram(
+            "movie_repository_operation_duration_seconds",
+            "Movie repository call latency by backend and operation.",
+            ("backend", "operation"),
+        )
+        self._errors = registry.counter(
+            "movie_repository_operation_errors_total",
+            "Movie repository calls which raised, by backend and operation.",
+            ("backend", "operation"),
+        )
+
+    async def close(self):
+        await self._timed("close", self._repository.close())
+
+    async def ensure_indexes(self):
+        await self._timed("ensure_indexes", self._repository.ensure_indexes())
+
+    async def missing_indexes(self) -> list[str]:
+        return await self._timed(
+            "missing_indexes",
+            self._repository.missing_indexes(),
+        )
+
+    async def create(self, movie: Movie):
+        await self._timed("create", self._repository.create(movie))
+
+    async def create_many(self, movies: list[Movie]) -> list[BulkItemResult]:
+        return await self._timed("create_many", self._repository.create_many(movies))
+
+    async def get(self, movie_id: str) -> Movie | None:
+        return await self._timed("get", self._repository.get(movie_id))
+
+    async def get_by_title(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[Movie]:
+        return await self._timed(
+            "get_by_title",
+            self._repository.get_by_title(
+                title=title,
+                offset=offset,
+                limit=limit,
+                after_movie_id=after_movie_id,
+            ),
+        )
+
+    async def get_document(
+        self,
+        movie_id: str,
+        fields: list[str] | None = None,
+        with_version: bool = False,
+    ) -> dict | None:
+        return await self._timed(
+            "get_document",
+            self._repository.get_document(
+                movie_id,
+                fields=fields,
+                with_version=with_version,
+            ),
+        )
+
+    async def get_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        with_version: bool = False,
+    ) -> list[dict]:
+        return await self._timed(
+            "get_documents_by_title",
+            self._repository.get_documents_by_title(
+                title=title,
+                fields=fields,
+                offset=offset,
+                limit=limit,
+                after_movie_id=after_movie_id,
+                with_version=with_version,
+            ),
+        )
+
+    async def get_version(self, movie_id: str) -> int | None:
+        return await self._timed("get_version", self._repository.get_version(movie_id))
+
+    async def get_title_versions(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[tuple[str, int]]:
+        return await self._timed(
+            "get_title_versions",
+            self._repository.get_title_versions(
+                title=title,
+                offset=offset,
+                limit=limit,
+                after_movie_id=after_movie_id,
+            ),
+        )
+
+    async def search_documents(
+        self,
+        query: str,
+        mode: str = "text",
+        fields: list[str] | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        return await self._timed(
+            "search_documents",
+            self._repository.search_documents(
+                query,
+                mode=mode,
+                fields=fields,
+                limit=limit,
+            ),
+        )
+
+    async def filter_documents(
+        self,
+        release_year_from: int | None = None,
+        release_year_to: int | None = None,
+        watched: bool | None = None,
+        sort: str = "release_year",
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+    ) -> list[dict]:
+        return await self._timed(
+            "filter_documents",
+            self._repository.filter_documents(
+                release_year_from=release_year_from,
+                release_year_to=release_year_to,
+                watched=watched,
+                sort=sort,
+                fields=fields,
+                offset=offset,
+                limit=limit,
+            ),
+        )
+
+    async def iter_documents(self, batch_size: int = 1000) -> AsyncIterator[dict]:
+        # Timed from the first fetch until the iteration stops.
+        labels = (self._backend, "iter_documents")
+        started = time.perf_counter()
+        try:
+            async for document in self._repository.iter_documents(batch_size):
+                yield document
+        except Exception:
+            self._errors.inc(labels)
+            raise
+        finally:
+            self._latency.observe(time.perf_counter() - started, labels)
+
+    async def iter_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        through_movie_id: str | None = None,
+    ) -> AsyncIterator[dict]:
+        labels = (self._backend, "iter_documents_by_title")
+        started = time.perf_counter()
+        try:
+            async for document in self._repository.iter_documents_by_title(
+                title=title,
+                fields=fields,
+                offset=offset,
+                limit=limit,
+                after_movie_id=after_movie_id,
+                through_movie_id=through_movie_id,
+            ):
+                yield document
+        except Exception:
+            self._errors.inc(labels)
+            raise
+        finally:
+            self._latency.observe(time.perf_counter() - started, labels)
+
+    async def stats(self) -> dict:
+        return await self._timed("stats", self._repository.stats())
+
+    async def rebuild_stats(self):
+        await self._timed("rebuild_stats", self._repository.rebuild_stats())
+
+    async def delete(self, movie_id: str):
+        return await self._timed("delete", self._repository.delete(movie_id))
+
+    async def delete_many(self, movie_ids: list[str]) -> list[BulkItemResult]:
+        return await self._timed(
+            "delete_many",
+            self._repository.delete_many(movie_ids),
+        )
+
+    async def update(self, movie_id: str, update_parameters: dict):
+        await self._timed(
+            "update",
+            self._repository.update(movie_id, update_parameters),
+        )
+
+    async def update_if_version(
+        self,
+        movie_id: str,
+        version: int,
+        update_parameters: dict,
+    ) -> int:
+        return await self._timed(
+            "update_if_version",
+            self._repository.update_if_version(movie_id, version, update_parameters),
+        )
+
+    async def update_many(
+        self,
+        updates: list[tuple[str, dict]],
+    ) -> list[BulkItemResult]:
+        return await self._timed("update_many", self._repository.update_many(updates))
+
+    async def _timed(self, operation: str, call: Awaitable[Any]) -> Any:
+        labels = (self._backend, operation)
+        started = time.perf_counter()
+        try:
+            return await call
+        except Exception:
+            self._errors.inc(labels)
+            raise
+        finally:
+            self._latency.observe(time.perf_counter() - started, labels)
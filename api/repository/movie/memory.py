@@ -1,53 +1,729 @@
-from collections import namedtuple
+import asyncio
+import bisect
+import heapq
+import sys
+from itertools import chain, groupby, islice, product
+from typing import AsyncIterator
+
+from pydantic import ValidationError
 
 from api.entities.movie import Movie
-from api.repository.movie.abstractions import MovieRepository, RepositoryException
+from api.repository.movie.abstractions import (
+    MOVIE_FIELDS,
+    SEARCH_WEIGHTS,
+    VERSION_FIELD,
+    BulkItemResult,
+    DeletedMovie,
+    MovieRepository,
+    RepositoryException,
+    VersionConflictException,
+    movie_stats,
+    new_version,
+    projection_fields,
+    search_tokens,
+)
+from api.repository.movie.snapshot import read_snapshot, write_snapshot
+
+# Length of the title prefix the title search keys are bucketed by.
+TITLE_BUCKET_LENGTH = 2
+
+# Text searches of up to this many distinct words are ranked by weight
+# combinations, longer ones score every posting of their words.
+MAX_COMBINED_WORDS = 4
+
+# Release years seen by compact storage, every record of a year refers to
+# the same int instead of its own.
+_RELEASE_YEARS: dict[int, int] = {}
+
+
+def stored_movie(
+    movie_id: str,
+    release_year: int,
+    title: str,
+    description: str,
+    watched: bool,
+) -> Movie:
+    """
+    Movie rebuilt from the fields of a movie stored by a memory backend,
+    without validation. The memory backends only store movies validated on
+    create or update.
+    """
+    return Movie.construct(
+        movie_id=movie_id,
+        release_year=release_year,
+        title=title,
+        description=description,
+        watched=watched,
+    )
+
+
+class MovieRecord:
+    """
+    MovieRecord holds a stored movie in compact storage mode. It has the
+    fields of a Movie in slots, without the instance dict, the set of fields
+    and the validators of the model.
+    """
+
+    __slots__ = MOVIE_FIELDS
+
+    def __init__(
+        self,
+        movie_id: str,
+        release_year: int,
+        title: str,
+        description: str,
+        watched: bool,
+    ):
+        self.movie_id = movie_id
+        self.release_year = _RELEASE_YEARS.setdefault(release_year, release_year)
+        # Titles repeat across movies, equal ones share a single string.
+        self.title = sys.intern(title)
+        self.description = description
+        self.watched = watched
+
+    @classmethod
+    def from_movie(cls, movie: Movie) -> "MovieRecord":
+        return cls(
+            movie.movie_id,
+            movie.release_year,
+            movie.title,
+            movie.description,
+            movie.watched,
+        )
+
+    @property
+    def id(self) -> str:
+        return self.movie_id
+
+    def to_movie(self) -> Movie:
+        return stored_movie(
+            self.movie_id,
+            self.release_year,
+            self.title,
+            self.description,
+            self.watched,
+        )
 
 
 class MemoryMovieRepository(MovieRepository):
     """
     MemoryMovieRepository implements the repository pattern by using
     a simple in memory database.
+
+    In compact mode movies are stored as MovieRecord instances and a new
+    Movie is built for every get, so callers can no longer change a stored
+    movie through the returned one.
     """
 
-    def __init__(self):
-        self._storage = {}
+    def __init__(self, compact: bool = False):
+        self._compact = compact
+        self._storage: dict[str, Movie | MovieRecord] = {}
+        # movie id -> version, bumped by every update.
+        self._versions: dict[str, int] = {}
+        # title -> sorted ids of the movies with that title, so that title
+        # lookups never scan the whole storage and pages can be located by
+        # offset or by seeking past a movie id.
+        self._title_index: dict[str, list[str]] = {}
+        # word -> {weight: movie ids}, the inverted index used by text search,
+        # grouped by the weight of the word in the movies.
+        self._word_index: dict[str, dict[int, set[str]]] = {}
+        # Sorted (case folded title, movie id) keys, bucketed by the first
+        # characters of the title so inserts only shift a small list. A title
+        # prefix is a contiguous range of one bucket, or of consecutive
+        # buckets for prefixes shorter than the bucket key.
+        self._title_keys: dict[str, list[tuple[str, str]]] = {}
+        # (watched, release year) -> sorted ids, plus the sorted release years
+        # present, so a year range is a bisected run of small sorted lists.
+        self._year_index: dict[tuple[bool, int], list[str]] = {}
+        self._years: list[int] = []
+        # Snapshots are written one at a time, the write of a cancelled
+        # save_snapshot keeps running on its thread until it is done.
+        self._snapshot_lock = asyncio.Lock()
+        self._snapshot_write: asyncio.Future | None = None
+
+    def load_snapshot(self, path: str):
+        """Add the movies of a snapshot, replacing stored ones with their ids."""
+        for fields, version in read_snapshot(path):
+            movie = MovieRecord(*fields) if self._compact else stored_movie(*fields)
+            self._storage[movie.id] = movie
+            self._versions[movie.id] = version
+        self._reindex()
+
+    async def save_snapshot(self, path: str):
+        """
+        Write the stored movies to a snapshot at path. Only references are
+        copied on the event loop, the snapshot is encoded and written on a
+        worker thread. Updates replace stored movies rather than changing
+        them, so every movie is saved as it was when the snapshot started.
+        A snapshot still being written is waited for first.
+        """
+        async with self._snapshot_lock:
+            if self._snapshot_write is not None:
+                await asyncio.wait([self._snapshot_write])
+            movies = list(self._storage.values())
+            versions = self._versions.copy()
+            self._snapshot_write = asyncio.ensure_future(
+                asyncio.to_thread(
+                    write_snapshot,
+                    path,
+                    ((movie, versions[movie.id]) for movie in movies),
+                    len(movies),
+                ),
+            )
+            await asyncio.shield(self._snapshot_write)
 
     async def create(self, movie: Movie):
-        self._storage[movie.id] = movie
+        self._create(movie)
+
+    async def create_many(self, movies: list[Movie]) -> list[BulkItemResult]:
+        results = []
+        for movie in movies:
+            error = None
+            # Like the unique movie_id index of the Mongo repository, a movie
+            # already stored, or listed earlier in the batch, is refused.
+            if movie.id in self._storage:
+                error = f"movie: {movie.id} already exists"
+            else:
+                self._create(movie)
+            results.append(BulkItemResult(movie_id=movie.id, error=error))
+        return results
 
     async def get(self, movie_id: str) -> Movie | None:
-        return self._storage.get(movie_id)
+        movie = self._storage.get(movie_id)
+        if movie is None:
+            return None
+        return self._movie(movie)
 
     async def get_by_title(
         self,
         title: str,
         offset: int = 0,
         limit: int = 1000,
+        after_movie_id: str | None = None,
     ) -> list[Movie]:
-        return_value = []
-        for _, value in self._storage.items():
-            if title == value.title:
-                return_value.append(value)
-        if limit == 0:
-            return return_value[offset:]
-        return return_value[offset : offset + limit]
+        return [
+            self._movie(movie)
+            for movie in self._title_page(title, offset, limit, after_movie_id)
+        ]
+
+    async def get_document(
+        self,
+        movie_id: str,
+        fields: list[str] | None = None,
+        with_version: bool = False,
+    ) -> dict | None:
+        movie = self._storage.get(movie_id)
+        if movie is None:
+            return None
+        document = self._document(movie, projection_fields(fields))
+        if with_version:
+            document[VERSION_FIELD] = self._versions[movie_id]
+        return document
+
+    async def get_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        with_version: bool = False,
+    ) -> list[dict]:
+        selected_fields = projection_fields(fields)
+        documents = [
+            self._document(movie, selected_fields)
+            for movie in self._title_page(title, offset, limit, after_movie_id)
+        ]
+        if with_version:
+            for document in documents:
+                document[VERSION_FIELD] = self._versions[document["movie_id"]]
+        return documents
+
+    async def get_version(self, movie_id: str) -> int | None:
+        return self._versions.get(movie_id)
+
+    async def get_title_versions(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[tuple[str, int]]:
+        return [
+            (movie.id, self._versions[movie.id])
+            for movie in self._title_page(title, offset, limit, after_movie_id)
+        ]
+
+    async def search_documents(
+        self,
+        query: str,
+        mode: str = "text",
+        fields: list[str] | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        if mode == "prefix":
+            movie_ids = self._prefix_matches(query.casefold(), limit)
+        else:
+            movie_ids = self._text_matches(search_tokens(query), limit)
+        selected_fields = projection_fields(fields)
+        return [
+            self._document(self._storage[movie_id], selected_fields)
+            for movie_id in movie_ids
+        ]
+
+    async def filter_documents(
+        self,
+        release_year_from: int | None = None,
+        release_year_to: int | None = None,
+        watched: bool | None = None,
+        sort: str = "release_year",
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+    ) -> list[dict]:
+        selected_fields = projection_fields(fields)
+        return [
+            self._document(self._storage[movie_id], selected_fields)
+            for movie_id in self._filter_page(
+                release_year_from,
+                release_year_to,
+                watched,
+                sort.startswith("-"),
+                offset,
+                limit,
+            )
+        ]
+
+    async def iter_documents(self, batch_size: int = 1000) -> AsyncIterator[dict]:
+        # Iterate over a snapshot of the ids, the storage may change while the
+        # consumer is suspended between documents.
+        for movie_id in list(self._storage):
+            movie = self._storage.get(movie_id)
+            if movie is not None:
+                yield self._document(movie, MOVIE_FIELDS)
+
+    async def iter_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        through_movie_id: str | None = None,
+    ) -> AsyncIterator[dict]:
+        selected_fields = projection_fields(fields)
+        for movie in self._title_page(
+            title,
+            offset,
+            limit,
+            after_movie_id,
+            through_movie_id,
+        ):
+            yield self._document(movie, selected_fields)
+
+    async def stats(self) -> dict:
+        # The year index holds the movies of every (watched, year) pair.
+        return movie_stats(
+            (watched, release_year, len(movie_ids))
+            for (watched, release_year), movie_ids in self._year_index.items()
+        )
 
     async def delete(self, movie_id: str):
-        deleted_movie = self._storage.pop(movie_id, None)
-        DeletedMovie = namedtuple("DeletedMovie", ["deleted_count"])
-        deleted_count = 0
-        if deleted_movie:
-            deleted_count = 1
+        deleted_count = 1 if self._delete(movie_id) else 0
         return DeletedMovie(deleted_count=deleted_count)
 
+    async def delete_many(self, movie_ids: list[str]) -> list[BulkItemResult]:
+        results = []
+        for movie_id in movie_ids:
+            error = None if self._delete(movie_id) else f"movie: {movie_id} not found"
+            results.append(BulkItemResult(movie_id=movie_id, error=error))
+        return results
+
     async def update(self, movie_id: str, update_parameters: dict):
+        self._update(movie_id, update_parameters)
+
+    async def update_if_version(
+        self,
+        movie_id: str,
+        version: int,
+        update_parameters: dict,
+    ) -> int:
+        current_version = self._versions.get(movie_id)
+        if current_version is None:
+            raise RepositoryException(f"movie: {movie_id} not found")
+        if current_version != version:
+            raise VersionConflictException(f"movie: {movie_id} was modified")
+        self._update(movie_id, update_parameters)
+        return self._versions[movie_id]
+
+    async def update_many(
+        self,
+        updates: list[tuple[str, dict]],
+    ) -> list[BulkItemResult]:
+        results = []
+        for movie_id, update_parameters in updates:
+            try:
+                self._update(movie_id, update_parameters)
+            except RepositoryException as exc:
+                results.append(BulkItemResult(movie_id=movie_id, error=exc.args[0]))
+            else:
+                results.append(BulkItemResult(movie_id=movie_id, error=None))
+        return results
+
+    def _title_page(
+        self,
+        title: str,
+        offset: int,
+        limit: int,
+        after_movie_id: str | None,
+        through_movie_id: str | None = None,
+    ) -> list[Movie | MovieRecord]:
+        movie_ids = self._title_index.get(title)
+        if not movie_ids:
+            return []
+        if after_movie_id is not None:
+            offset = bisect.bisect_right(movie_ids, after_movie_id)
+        stop = None if limit == 0 else offset + limit
+        if through_movie_id is not None:
+            through = bisect.bisect_right(movie_ids, through_movie_id)
+            stop = through if stop is None else min(stop, through)
+        return [self._storage[movie_id] for movie_id in movie_ids[offset:stop]]
+
+    def _text_matches(self, words: list[str], limit: int) -> list[str]:
+        words = [word for word in set(words) if word in self._word_index]
+        if not words:
+            return []
+        if len(words) > MAX_COMBINED_WORDS:
+            return self._scored_matches(words, limit)
+        # A movie has one weight per word, 0 when the word is missing, and
+        # its score is their sum. The combinations of weights are visited by
+        # score, so only the postings of the best scores are read, until the
+        # top results are complete.
+        choices = [
+            [*sorted(self._word_index[word].items(), reverse=True), (0, None)]
+            for word in words
+        ]
+        combinations = sorted(
+            (
+                combination
+                for combination in product(*choices)
+                if any(movie_ids is not None for _, movie_ids in combination)
+            ),
+            key=self._combination_score,
+            reverse=True,
+        )
+        best: list[str] = []
+        for _, level in groupby(combinations, key=self._combination_score):
+            # Ties in movie id order.
+            best.extend(
+                heapq.nsmallest(
+                    limit - len(best),
+                    chain.from_iterable(
+                        self._combination_matches(words, combination)
+                        for combination in level
+                    ),
+                ),
+            )
+            if len(best) >= limit:
+                break
+        return best
+
+    @staticmethod
+    def _combination_score(combination: tuple) -> int:
+        return sum(weight for weight, _ in combination)
+
+    def _combination_matches(self, words: list[str], combination: tuple):
+        """Ids of the movies with exactly the weights of combination."""
+        present = sorted(
+            (movie_ids for _, movie_ids in combination if movie_ids is not None),
+            key=len,
+        )
+        matches = (
+            present[0].intersection(*present[1:]) if len(present) > 1 else present[0]
+        )
+        absent = [
+            level_ids
+            for word, (_, movie_ids) in zip(words, combination)
+            if movie_ids is None
+            for level_ids in self._word_index[word].values()
+        ]
+        if not absent:
+            return matches
+        return (
+            movie_id
+            for movie_id in matches
+            if not any(movie_id in level_ids for level_ids in absent)
+        )
+
+    def _scored_matches(self, words: list[str], limit: int) -> list[str]:
+        scores: dict[str, int] = {}
+        for word in words:
+            for weight, movie_ids in self._word_index[word].items():
+                for movie_id in movie_ids:
+                    scores[movie_id] = scores.get(movie_id, 0) + weight
+        # Highest score first, ties in movie id order.
+        best = heapq.nsmallest(
+            limit,
+            scores.items(),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return [movie_id for movie_id, _ in best]
+
+    def _prefix_matches(self, prefix: str, limit: int) -> list[str]:
+        if not prefix:
+            return []
+        bucket = prefix[:TITLE_BUCKET_LENGTH]
+        if len(prefix) >= TITLE_BUCKET_LENGTH:
+            title_keys = self._title_keys.get(bucket, [])
+            start = bisect.bisect_left(title_keys, (prefix, ""))
+            candidates = iter(title_keys[start : start + limit])
+        else:
+            candidates = chain.from_iterable(
+                self._title_keys[key]
+                for key in sorted(self._title_keys)
+                if key.startswith(bucket)
+            )
+        movie_ids = []
+        for title_key, movie_id in islice(candidates, limit):
+            if not title_key.startswith(prefix):
+                break
+            movie_ids.append(movie_id)
+        return movie_ids
+
+    def _filter_page(
+        self,
+        release_year_from: int | None,
+        release_year_to: int | None,
+        watched: bool | None,
+        descending: bool,
+        offset: int,
+        limit: int,
+    ) -> list[str]:
+        start = 0
+        if release_year_from is not None:
+            start = bisect.bisect_left(self._years, release_year_from)
+        stop = len(self._years)
+        if release_year_to is not None:
+            stop = bisect.bisect_right(self._years, release_year_to)
+        years = self._years[start:stop]
+        flags = (False, True) if watched is None else (watched,)
+        movie_ids: list[str] = []
+        for year in reversed(years) if descending else years:
+            year_ids = [
+                self._year_index[flag, year]
+                for flag in flags
+                if (flag, year) in self._year_index
+            ]
+            year_count = sum(len(ids) for ids in year_ids)
+            if offset >= year_count:
+                # Whole years before the page are skipped by their size.
+                offset -= year_count
+                continue
+            if len(year_ids) == 1:
+                ordered = reversed(year_ids[0]) if descending else year_ids[0]
+            else:
+                ordered = heapq.merge(
+                    *(reversed(ids) if descending else ids for ids in year_ids),
+                    reverse=descending,
+                )
+            page = list(islice(ordered, offset, None if limit == 0 else offset + limit))
+            offset = 0
+            movie_ids.extend(page)
+            if limit:
+                limit -= len(page)
+                if not limit:
+                    break
+        return movie_ids
+
+    @staticmethod
+    def _document(movie: Movie | MovieRecord, fields: tuple[str, ...]) -> dict:
+        return {field: getattr(movie, field) for field in fields}
+
+    def _stored(self, movie: Movie) -> Movie | MovieRecord:
+        return MovieRecord.from_movie(movie) if self._compact else movie
+
+    @staticmethod
+    def _movie(movie: Movie | MovieRecord) -> Movie:
+        return movie.to_movie() if isinstance(movie, MovieRecord) else movie
+
+    def _create(self, movie: Movie):
+        existing_movie = self._storage.get(movie.id)
+        if existing_movie is not None:
+            self._unindex_title(existing_movie.title, existing_movie.id)
+            self._unindex_search(
+                existing_movie.id,
+                existing_movie.title,
+                existing_movie.description,
+            )
+            self._unindex_year(
+                existing_movie.watched,
+                existing_movie.release_year,
+                existing_movie.id,
+            )
+        self._storage[movie.id] = self._stored(movie)
+        self._versions[movie.id] = new_version()
+        self._index_title(movie.title, movie.id)
+        self._index_search(movie.id, movie.title, movie.description)
+        self._index_year(movie.watched, movie.release_year, movie.id)
+
+    def _delete(self, movie_id: str) -> bool:
+        deleted_movie = self._storage.pop(movie_id, None)
+        if deleted_movie is None:
+            return False
+        del self._versions[movie_id]
+        self._unindex_title(deleted_movie.title, movie_id)
+        self._unindex_search(movie_id, deleted_movie.title, deleted_movie.description)
+        self._unindex_year(deleted_movie.watched, deleted_movie.release_year, movie_id)
+        return True
+
+    def _update(self, movie_id: str, update_parameters: dict):
+        """
+        Validate the updated movie and swap it in for the stored one, which
+        is never changed, so readers holding it and the indexes always see
+        a whole movie. Nothing changes when the update fails.
+        """
         movie = self._storage.get(movie_id)
         if movie is None:
             raise RepositoryException(f"movie: {movie_id} not found")
-        for key, value in update_parameters.items():
-            if key == "id":
-                raise RepositoryException("can't update movie id")
-            if hasattr(movie, key):
-                # update the Movie entity field
-                setattr(movie, key, value)
+        if update_parameters.get("movie_id", movie_id) != movie_id:
+            raise RepositoryException("can't update movie id")
+        if "id" in update_parameters:
+            raise RepositoryException("can't update movie id")
+        document = self._document(movie, MOVIE_FIELDS)
+        changes = {
+            key: value for key, value in update_parameters.items() if key in document
+        }
+        try:
+            updated_movie = Movie(**document | changes)
+        except ValidationError as exc:
+            messages = "; ".join(error["msg"] for error in exc.errors())
+            raise RepositoryException(f"movie: {movie_id} not updated, {messages}")
+        if self._document(updated_movie, MOVIE_FIELDS) == document:
+            # Unchanged movies keep their version, as in the Mongo backend.
+            return
+        self._storage[movie_id] = self._stored(updated_movie)
+        self._versions[movie_id] += 1
+        if updated_movie.title != movie.title:
+            self._unindex_title(movie.title, movie_id)
+            self._index_title(updated_movie.title, movie_id)
+        if (updated_movie.title, updated_movie.description) != (
+            movie.title,
+            movie.description,
+        ):
+            self._unindex_search(movie_id, movie.title, movie.description)
+            self._index_search(movie_id, updated_movie.title, updated_movie.description)
+        if (updated_movie.watched, updated_movie.release_year) != (
+            movie.watched,
+            movie.release_year,
+        ):
+            self._unindex_year(movie.watched, movie.release_year, movie_id)
+            self._index_year(
+                updated_movie.watched,
+                updated_movie.release_year,
+                movie_id,
+            )
+
+    def _reindex(self):
+        """
+        Rebuild every index from the storage, each index list is sorted once
+        instead of inserting the movies one by one.
+        """
+        self._title_index = {}
+        self._word_index = {}
+        self._title_keys = {}
+        self._year_index = {}
+        for movie_id, movie in self._storage.items():
+            self._title_index.setdefault(movie.title, []).append(movie_id)
+            for word, weight in self._word_weights(
+                movie.title,
+                movie.description,
+            ).items():
+                self._word_index.setdefault(word, {}).setdefault(weight, set()).add(
+                    movie_id,
+                )
+            title_key = movie.title.casefold()
+            self._title_keys.setdefault(title_key[:TITLE_BUCKET_LENGTH], []).append(
+                (title_key, movie_id),
+            )
+            self._year_index.setdefault(
+                (movie.watched, movie.release_year),
+                [],
+            ).append(movie_id)
+        for index in (self._title_index, self._title_keys, self._year_index):
+            for keys in index.values():
+                keys.sort()
+        self._years = sorted({release_year for _, release_year in self._year_index})
+
+    def _index_title(self, title: str, movie_id: str):
+        bisect.insort(self._title_index.setdefault(title, []), movie_id)
+
+    def _unindex_title(self, title: str, movie_id: str):
+        movie_ids = self._title_index.get(title)
+        if movie_ids is None:
+            return
+        position = bisect.bisect_left(movie_ids, movie_id)
+        if position < len(movie_ids) and movie_ids[position] == movie_id:
+            del movie_ids[position]
+        if not movie_ids:
+            del self._title_index[title]
+
+    def _index_search(self, movie_id: str, title: str, description: str):
+        for word, weight in self._word_weights(title, description).items():
+            self._word_index.setdefault(word, {}).setdefault(weight, set()).add(
+                movie_id,
+            )
+        title_key = title.casefold()
+        bisect.insort(
+            self._title_keys.setdefault(title_key[:TITLE_BUCKET_LENGTH], []),
+            (title_key, movie_id),
+        )
+
+    def _unindex_search(self, movie_id: str, title: str, description: str):
+        for word, weight in self._word_weights(title, description).items():
+            levels = self._word_index.get(word)
+            if levels is None or weight not in levels:
+                continue
+            levels[weight].discard(movie_id)
+            if not levels[weight]:
+                del levels[weight]
+            if not levels:
+                del self._word_index[word]
+        title_key = title.casefold()
+        bucket = title_key[:TITLE_BUCKET_LENGTH]
+        title_keys = self._title_keys.get(bucket)
+        if title_keys is None:
+            return
+        position = bisect.bisect_left(title_keys, (title_key, movie_id))
+        if position < len(title_keys) and title_keys[position] == (title_key, movie_id):
+            del title_keys[position]
+        if not title_keys:
+            del self._title_keys[bucket]
+
+    def _index_year(self, watched: bool, release_year: int, movie_id: str):
+        movie_ids = self._year_index.get((watched, release_year))
+        if movie_ids is None:
+            movie_ids = self._year_index[watched, release_year] = []
+            if (not watched, release_year) not in self._year_index:
+                bisect.insort(self._years, release_year)
+        bisect.insort(movie_ids, movie_id)
+
+    def _unindex_year(self, watched: bool, release_year: int, movie_id: str):
+        movie_ids = self._year_index.get((watched, release_year))
+        if movie_ids is None:
+            return
+        position = bisect.bisect_left(movie_ids, movie_id)
+        if position < len(movie_ids) and movie_ids[position] == movie_id:
+            del movie_ids[position]
+        if movie_ids:
+            return
+        del self._year_index[watched, release_year]
+        if (not watched, release_year) not in self._year_index:
+            del self._years[bisect.bisect_left(self._years, release_year)]
+
+    @staticmethod
+    def _word_weights(title: str, description: str) -> dict[str, int]:
+        weights: dict[str, int] = {}
+        for field, text in (("title", title), ("description", description)):
+            for word in set(search_tokens(text)):
+                weights[word] = weights.get(word, 0) + SEARCH_WEIGHTS[field]
+        return weights
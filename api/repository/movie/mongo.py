@@ -1,7 +1,92 @@
+from collections import Counter
+from typing import AsyncIterator
+
 import motor.motor_asyncio
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, UpdateOne
+from pymongo.collation import Collation, CollationStrength
+from pymongo.errors import BulkWriteError, PyMongoError
 
 from api.entities.movie import Movie
-from api.repository.movie.abstractions import MovieRepository, RepositoryException
+from api.repository.movie.abstractions import (
+    SEARCH_WEIGHTS,
+    VERSION_FIELD,
+    BulkItemResult,
+    DeletedMovie,
+    MovieRepository,
+    RepositoryException,
+    VersionConflictException,
+    movie_stats,
+    new_version,
+    projection_fields,
+    search_tokens,
+)
+
+# Compares strings ignoring case, used by title prefix search.
+CASE_INSENSITIVE = Collation(locale="en", strength=CollationStrength.SECONDARY)
+
+# Indexes the movie collection is expected to have, keyed by index name.
+MOVIE_INDEXES = {
+    "movie_id": IndexModel([("movie_id", ASCENDING)], name="movie_id", unique=True),
+    # Version lookups are answered from these indexes without reading the
+    # documents.
+    "movie_id_version": IndexModel(
+        [("movie_id", ASCENDING), (VERSION_FIELD, ASCENDING)],
+        name="movie_id_version",
+    ),
+    "title_movie_id_version": IndexModel(
+        [("title", ASCENDING), ("movie_id", ASCENDING), (VERSION_FIELD, ASCENDING)],
+        name="title_movie_id_version",
+    ),
+    # Filtered queries: the watched equality first, then the release year
+    # which is both the sort key and the range, then movie_id for ties.
+    "release_year_movie_id": IndexModel(
+        [("release_year", ASCENDING), ("movie_id", ASCENDING)],
+        name="release_year_movie_id",
+    ),
+    "watched_release_year_movie_id": IndexModel(
+        [("watched", ASCENDING), ("release_year", ASCENDING), ("movie_id", ASCENDING)],
+        name="watched_release_year_movie_id",
+    ),
+    # Word search, without stemming or stop words so that every word matches
+    # the same way it does in the memory repository.
+    "title_description_text": IndexModel(
+        [("title", TEXT), ("description", TEXT)],
+        name="title_description_text",
+        weights=SEARCH_WEIGHTS,
+        default_language="none",
+    ),
+    "title_movie_id_ci": IndexModel(
+        [("title", ASCENDING), ("movie_id", ASCENDING)],
+        name="title_movie_id_ci",
+        collation=CASE_INSENSITIVE,
+    ),
+}
+
+# Sorts after every other character under the collation, the upper bound of
+# a prefix range.
+_COLLATION_MAX = "\uffff"
+
+
+# Movie fields the statistics are counted by.
+STATS_FIELDS = ("watched", "release_year")
+
+
+def stats_key(document: dict) -> tuple[bool, int]:
+    return document["watched"], document["release_year"]
+
+
+def projection(fields: list[str] | None = None, with_version: bool = False) -> dict:
+    """Mongo projection returning the selected Movie fields of a document."""
+    document_projection = {"_id": 0} | dict.fromkeys(projection_fields(fields), 1)
+    if with_version:
+        document_projection[VERSION_FIELD] = 1
+    return document_projection
+
+
+def versioned(document: dict) -> dict:
+    # Movies stored before versions were introduced have none yet.
+    document.setdefault(VERSION_FIELD, 0)
+    return document
 
 
 class MongoMovieRepository(MovieRepository):
@@ -14,14 +99,65 @@ class MongoMovieRepository(MovieRepository):
         self,
         connection_string: str,
         database: str,
+        client: motor.motor_asyncio.AsyncIOMotorClient | None = None,
+        **client_options,
     ):
-        self._client = motor.motor_asyncio.AsyncIOMotorClient(connection_string)
+        if client is None:
+            client = motor.motor_asyncio.AsyncIOMotorClient(
+                connection_string,
+                **client_options,
+            )
+        # An existing client can be passed in, e.g. a Motor compatible stand-in.
+        self._client = client
         self._database = self._client[database]
         # movie collections which holds our movie documents.
         self._movies = self._database["movies"]
+        # Number of movies per (watched, release_year) pair, one document per
+        # pair, maintained by the writes and rebuilt by rebuild_stats.
+        self._stats = self._database["movie_stats"]
+
+    async def close(self):
+        self._client.close()
+
+    async def ensure_indexes(self):
+        # create_indexes is a no-op for indexes which already exist with the
+        # same specification, so this is safe to run on every startup.
+        await self._movies.create_indexes(list(MOVIE_INDEXES.values()))
+        # The counters are only maintained by the writes, a catalog stored
+        # before them, or restored without them, is counted once here.
+        if await self._stats.find_one() is None and await self._movies.find_one():
+            await self.rebuild_stats()
+
+    async def missing_indexes(self) -> list[str]:
+        existing_indexes = await self._movies.index_information()
+        return [name for name in MOVIE_INDEXES if name not in existing_indexes]
 
     async def create(self, movie: Movie):
-        await self._movies.insert_one(movie.dict())
+        document = movie.dict() | {VERSION_FIELD: new_version()}
+        await self._movies.insert_one(document)
+        await self._count(Counter([stats_key(document)]))
+
+    async def create_many(self, movies: list[Movie]) -> list[BulkItemResult]:
+        if not movies:
+            return []
+        errors = {}
+        documents = [movie.dict() | {VERSION_FIELD: new_version()} for movie in movies]
+        try:
+            await self._movies.insert_many(documents, ordered=False)
+        except BulkWriteError as exc:
+            for write_error in exc.details["writeErrors"]:
+                errors[write_error["index"]] = write_error["errmsg"]
+        await self._count(
+            Counter(
+                stats_key(document)
+                for index, document in enumerate(documents)
+                if index not in errors
+            ),
+        )
+        return [
+            BulkItemResult(movie_id=movie.id, error=errors.get(index))
+            for index, movie in enumerate(movies)
+        ]
 
     async def get(self, movie_id: str) -> Movie | None:
         document = await self._movies.find_one({"movie_id": movie_id})
@@ -34,23 +170,537 @@ class MongoMovieRepository(MovieRepository):
         title: str,
         offset: int = 0,
         limit: int = 1000,
+        after_movie_id: str | None = None,
     ) -> list[Movie]:
         return_value = []
-        documents_cursor = self._movies.find({"title": title}).skip(offset).limit(limit)
+        documents_cursor = self._title_cursor(title, offset, limit, after_movie_id)
         async for document in documents_cursor:
             return_value.append(Movie(**document))
 
         return return_value
 
+    async def get_document(
+        self,
+        movie_id: str,
+        fields: list[str] | None = None,
+        with_version: bool = False,
+    ) -> dict | None:
+        document = await self._movies.find_one(
+            {"movie_id": movie_id},
+            projection(fields, with_version),
+        )
+        if document is not None and with_version:
+            versioned(document)
+        return document
+
+    async def get_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        with_version: bool = False,
+    ) -> list[dict]:
+        documents_cursor = self._title_cursor(
+            title,
+            offset,
+            limit,
+            after_movie_id,
+            projection(fields, with_version),
+        )
+        documents = await documents_cursor.to_list(length=None)
+        if with_version:
+            for document in documents:
+                versioned(document)
+        return documents
+
+    async def get_version(self, movie_id: str) -> int | None:
+        document = await self._movies.find_one(
+            {"movie_id": movie_id},
+            {"_id": 0, VERSION_FIELD: 1},
+        )
+        if document is None:
+            return None
+        return versioned(document)[VERSION_FIELD]
+
+    async def get_title_versions(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[tuple[str, int]]:
+        documents_cursor = self._title_cursor(
+            title,
+            offset,
+            limit,
+            after_movie_id,
+            {"_id": 0, "movie_id": 1, VERSION_FIELD: 1},
+        )
+        return [
+            (document["movie_id"], versioned(document)[VERSION_FIELD])
+            async for document in documents_cursor
+        ]
+
+    async def search_documents(
+        self,
+        query: str,
+        mode: str = "text",
+        fields: list[str] | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        if mode == "prefix":
+            if not query:
+                return []
+            documents_cursor = (
+                self._movies.find(
+                    {"title": {"$gte": query, "$lt": query + _COLLATION_MAX}},
+                    projection(fields),
+                )
+                .collation(CASE_INSENSITIVE)
+                .sort([("title", ASCENDING), ("movie_id", ASCENDING)])
+                .limit(limit)
+            )
+            return await documents_cursor.to_list(length=None)
+        words = search_tokens(query)
+        if not words:
+            return []
+        score = {"score": {"$meta": "textScore"}}
+        documents_cursor = (
+            # Rebuilt from the words, so no phrase or negation syntax applies.
+            self._movies.find(
+                {"$text": {"$search": " ".join(words)}},
+                projection(fields) | score,
+            )
+            .sort([("score", score["score"]), ("movie_id", ASCENDING)])
+            .limit(limit)
+        )
+        documents = await documents_cursor.to_list(length=None)
+        for document in documents:
+            del document["score"]
+        return documents
+
+    async def filter_documents(
+        self,
+        release_year_from: int | None = None,
+        release_year_to: int | None = None,
+        watched: bool | None = None,
+        sort: str = "release_year",
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+    ) -> list[dict]:
+        query: dict = {}
+        if watched is not None:
+            query["watched"] = watched
+        release_year = {}
+        if release_year_from is not None:
+            release_year["$gte"] = release_year_from
+        if release_year_to is not None:
+            release_year["$lte"] = release_year_to
+        if release_year:
+            query["release_year"] = release_year
+        direction = DESCENDING if sort.startswith("-") else ASCENDING
+        documents_cursor = (
+            self._movies.find(query, projection(fields))
+            .sort([("release_year", direction), ("movie_id", direction)])
+            .skip(offset)
+            .limit(limit)
+        )
+        return await documents_cursor.to_list(length=None)
+
+    async def iter_documents(self, batch_size: int = 1000) -> AsyncIterator[dict]:
+        documents_cursor = self._movies.find({}, projection()).batch_size(
+            batch_size,
+        )
+        async for document in documents_cursor:
+            yield document
+
+    async def iter_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        through_movie_id: str | None = None,
+    ) -> AsyncIterator[dict]:
+        # The small first batch of the cursor lets the first documents reach
+        # the consumer before the rest of the page is fetched.
+        documents_cursor = self._title_cursor(
+            title,
+            offset,
+            limit,
+            after_movie_id,
+            projection(fields),
+            through_movie_id,
+        )
+        async for document in documents_cursor:
+            yield document
+
+    async def stats(self) -> dict:
+        documents = await self._stats.find({}).to_list(length=None)
+        return movie_stats(
+            (
+                document["_id"]["watched"],
+                document["_id"]["release_year"],
+                document["count"],
+            )
+            for document in documents
+        )
+
+    async def rebuild_stats(self):
+        # $out replaces the statistics collection atomically once the
+        # aggregation has completed. The counts of writes made while it runs
+        # may be missing from the aggregation while their increments land in
+        # the replaced collection, and are lost with it: rebuild when the
+        # catalog is not being written, or rebuild again.
+        await self._movies.aggregate(
+            [
+                {
+                    "$group": {
+                        "_id": {field: f"${field}" for field in STATS_FIELDS},
+                        "count": {"$sum": 1},
+                    },
+                },
+                {"$out": self._stats.name},
+            ],
+        ).to_list(length=None)
+
     async def delete(self, movie_id: str):
-        return await self._movies.delete_one({"movie_id": movie_id})
+        deleted_document = await self._movies.find_one_and_delete(
+            {"movie_id": movie_id},
+            projection=self._stats_projection(),
+        )
+        if deleted_document is None:
+            return DeletedMovie(deleted_count=0)
+        await self._count(Counter({stats_key(deleted_document): -1}))
+        return DeletedMovie(deleted_count=1)
+
+    async def delete_many(self, movie_ids: list[str]) -> list[BulkItemResult]:
+        existing_ids = await self._existing_ids(movie_ids)
+        # One delete per counter, its filter pinned to the counter's
+        # (watched, release_year) pair, so that its deleted count is exactly
+        # what leaves that counter even when other writers change the movies
+        # meanwhile.
+        groups: dict[tuple[bool, int], list[str]] = {}
+        for movie_id, document in existing_ids.items():
+            groups.setdefault(stats_key(document), []).append(movie_id)
+        counts: Counter = Counter()
+        try:
+            moved_ids = []
+            for key, group_ids in groups.items():
+                result = await self._movies.delete_many(
+                    {"movie_id": {"$in": group_ids}} | dict(zip(STATS_FIELDS, key)),
+                )
+                counts[key] -= result.deleted_count
+                if result.deleted_count < len(group_ids):
+                    moved_ids.extend(group_ids)
+            # Movies moved to another counter since the read are deleted on
+            # their own, movies deleted by another writer are already gone.
+            for movie_id in await self._existing_ids(moved_ids):
+                deleted_document = await self._movies.find_one_and_delete(
+                    {"movie_id": movie_id},
+                    projection=self._stats_projection(),
+                )
+                if deleted_document is not None:
+                    counts[stats_key(deleted_document)] -= 1
+        finally:
+            await self._count(counts)
+        results = []
+        for movie_id in movie_ids:
+            error = None if movie_id in existing_ids else f"movie: {movie_id} not found"
+            results.append(BulkItemResult(movie_id=movie_id, error=error))
+            # A movie listed again is already deleted.
+            existing_ids.pop(movie_id, None)
+        return results
 
     async def update(self, movie_id: str, update_parameters: dict):
         if "id" in update_parameters.keys():
             raise RepositoryException("can't update movie id.")
-        result = await self._movies.update_one(
-            {"movie_id": movie_id},
-            {"$set": update_parameters},
+        if not update_parameters:
+            raise RepositoryException(f"movie: {movie_id} not updated")
+        if not update_parameters.keys() & set(STATS_FIELDS):
+            result = await self._movies.update_one(
+                self._changed(movie_id, update_parameters),
+                self._versioned_update(update_parameters),
+            )
+            if result.modified_count == 0:
+                raise RepositoryException(f"movie: {movie_id} not updated")
+            return
+        # The previous values tell whether the movie moved between counters.
+        previous_document = await self._movies.find_one_and_update(
+            self._changed(movie_id, update_parameters),
+            self._versioned_update(update_parameters),
+            projection=self._stats_projection(),
         )
-        if result.modified_count == 0:
+        if previous_document is None:
             raise RepositoryException(f"movie: {movie_id} not updated")
+        await self._count(
+            self._moved(previous_document, previous_document | update_parameters),
+        )
+
+    async def update_if_version(
+        self,
+        movie_id: str,
+        version: int,
+        update_parameters: dict,
+    ) -> int:
+        if "id" in update_parameters.keys():
+            raise RepositoryException("can't update movie id.")
+        previous_document = None
+        if update_parameters:
+            # Movies stored before versioning have no version field, see
+            # versioned.
+            expected_version = version if version else {"$in": [0, None]}
+            previous_document = await self._movies.find_one_and_update(
+                self._changed(movie_id, update_parameters)
+                | {VERSION_FIELD: expected_version},
+                self._versioned_update(update_parameters),
+                projection=self._stats_projection(),
+            )
+        if previous_document is None:
+            current_version = await self.get_version(movie_id)
+            if current_version is None:
+                raise RepositoryException(f"movie: {movie_id} not found")
+            if current_version != version:
+                raise VersionConflictException(f"movie: {movie_id} was modified")
+            # The update changes nothing, the movie keeps its version.
+            return version
+        await self._count(
+            self._moved(previous_document, previous_document | update_parameters),
+        )
+        return version + 1
+
+    async def update_many(
+        self,
+        updates: list[tuple[str, dict]],
+    ) -> list[BulkItemResult]:
+        fields = {key for _, update_parameters in updates for key in update_parameters}
+        existing_ids = await self._existing_ids(
+            [movie_id for movie_id, _ in updates],
+            fields - {"id"},
+        )
+        errors: list[str | None] = [None] * len(updates)
+        # The first update of every movie is batched, any other update of a
+        # movie is applied on its own afterwards, in order.
+        batched_positions: dict[str, int] = {}
+        later_positions = []
+        for position, (movie_id, update_parameters) in enumerate(updates):
+            previous_document = existing_ids.get(movie_id)
+            if "id" in update_parameters.keys():
+                errors[position] = "can't update movie id."
+            elif previous_document is None:
+                errors[position] = f"movie: {movie_id} not found"
+            elif movie_id in batched_positions:
+                later_positions.append(position)
+            elif all(
+                previous_document.get(key) == value
+                for key, value in update_parameters.items()
+            ):
+                # As update reports it, nothing would be changed.
+                errors[position] = f"movie: {movie_id} not updated"
+            else:
+                batched_positions[movie_id] = position
+        counts: Counter = Counter()
+        try:
+            write_errors, unmatched = await self._bulk_update(
+                [
+                    (existing_ids[movie_id], updates[position][1])
+                    for movie_id, position in batched_positions.items()
+                ],
+            )
+            for index, (movie_id, position) in enumerate(batched_positions.items()):
+                if index in write_errors:
+                    errors[position] = write_errors[index]
+                elif index in unmatched:
+                    later_positions.append(position)
+                else:
+                    previous_document = existing_ids[movie_id]
+                    updated_document = previous_document | updates[position][1]
+                    counts.update(self._moved(previous_document, updated_document))
+            for position in sorted(later_positions):
+                errors[position] = await self._update_counted(
+                    *updates[position],
+                    counts,
+                )
+        finally:
+            await self._count(counts)
+        return [
+            BulkItemResult(movie_id=movie_id, error=error)
+            for (movie_id, _), error in zip(updates, errors)
+        ]
+
+    async def _bulk_update(
+        self,
+        updates: list[tuple[dict, dict]],
+    ) -> tuple[dict[int, str], set[int]]:
+        """
+        Apply the (previous document, update parameters) updates in one
+        unordered bulk write, every update pinned to the version and the
+        statistics pair of its previous document so that an applied update
+        moves exactly the counters update_many counts for it. Returns the
+        write errors and the updates which matched nothing, by index.
+        """
+        if not updates:
+            return {}, set()
+        # The updates set this call's own version, which tells the applied
+        # ones apart when some did not match.
+        version = new_version()
+        requests = [
+            UpdateOne(
+                {
+                    "movie_id": previous_document["movie_id"],
+                    VERSION_FIELD: previous_document[VERSION_FIELD]
+                    or {"$in": [0, None]},
+                }
+                | {field: previous_document[field] for field in STATS_FIELDS},
+                {"$set": update_parameters | {VERSION_FIELD: version}},
+            )
+            for previous_document, update_parameters in updates
+        ]
+        try:
+            result = await self._movies.bulk_write(requests, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as exc:
+            details = exc.details
+        write_errors = {
+            write_error["index"]: write_error["errmsg"]
+            for write_error in details["writeErrors"]
+        }
+        if details["nMatched"] == len(requests) - len(write_errors):
+            return write_errors, set()
+        # An applied update left this version, or a later one when the movie
+        # has been updated again since.
+        applied_cursor = self._movies.find(
+            {
+                "movie_id": {
+                    "$in": [
+                        previous_document["movie_id"]
+                        for previous_document, _ in updates
+                    ],
+                },
+                VERSION_FIELD: {"$gte": version},
+            },
+            {"_id": 0, "movie_id": 1},
+        )
+        applied_ids = {document["movie_id"] async for document in applied_cursor}
+        return write_errors, {
+            index
+            for index, (previous_document, _) in enumerate(updates)
+            if index not in write_errors
+            and previous_document["movie_id"] not in applied_ids
+        }
+
+    async def _update_counted(
+        self,
+        movie_id: str,
+        update_parameters: dict,
+        counts: Counter,
+    ) -> str | None:
+        """
+        Update one movie of update_many on its own, adding its move to counts,
+        and return its error.
+        """
+        if "id" in update_parameters.keys():
+            return "can't update movie id."
+        previous_document = None
+        if update_parameters:
+            try:
+                previous_document = await self._movies.find_one_and_update(
+                    self._changed(movie_id, update_parameters),
+                    self._versioned_update(update_parameters),
+                    projection=self._stats_projection(),
+                )
+            except PyMongoError as exc:
+                return str(exc)
+        if previous_document is None:
+            if await self.get_version(movie_id) is None:
+                return f"movie: {movie_id} not found"
+            # As update reports it, nothing was changed.
+            return f"movie: {movie_id} not updated"
+        counts.update(
+            self._moved(previous_document, previous_document | update_parameters),
+        )
+        return None
+
+    def _title_cursor(
+        self,
+        title: str,
+        offset: int,
+        limit: int,
+        after_movie_id: str | None,
+        document_projection: dict | None = None,
+        through_movie_id: str | None = None,
+    ):
+        query: dict = {"title": title}
+        if after_movie_id is not None:
+            # Seek through the (title, movie_id) index instead of skipping.
+            query["movie_id"] = {"$gt": after_movie_id}
+            offset = 0
+        if through_movie_id is not None:
+            query.setdefault("movie_id", {})["$lte"] = through_movie_id
+        return (
+            self._movies.find(query, document_projection)
+            .sort([("title", ASCENDING), ("movie_id", ASCENDING)])
+            .skip(offset)
+            .limit(limit)
+        )
+
+    async def _existing_ids(
+        self,
+        movie_ids: list[str],
+        fields=(),
+    ) -> dict[str, dict]:
+        """Version, statistics and the given fields of the stored movies, by id."""
+        if not movie_ids:
+            return {}
+        documents_cursor = self._movies.find(
+            {"movie_id": {"$in": list(dict.fromkeys(movie_ids))}},
+            self._stats_projection(["movie_id", VERSION_FIELD, *fields]),
+        )
+        return {
+            document["movie_id"]: versioned(document)
+            async for document in documents_cursor
+        }
+
+    @staticmethod
+    def _changed(movie_id: str, update_parameters: dict) -> dict:
+        """
+        Matches the movie only when the update changes it, so that unchanged
+        movies keep their version and report nothing modified.
+        """
+        return {
+            "movie_id": movie_id,
+            "$or": [{key: {"$ne": value}} for key, value in update_parameters.items()],
+        }
+
+    @staticmethod
+    def _versioned_update(update_parameters: dict) -> dict:
+        return {"$set": update_parameters, "$inc": {VERSION_FIELD: 1}}
+
+    @staticmethod
+    def _stats_projection(fields=()) -> dict:
+        return {"_id": 0} | dict.fromkeys([*fields, *STATS_FIELDS], 1)
+
+    @staticmethod
+    def _moved(previous_document: dict, updated_document: dict) -> Counter:
+        if stats_key(previous_document) == stats_key(updated_document):
+            return Counter()
+        return Counter(
+            {stats_key(previous_document): -1, stats_key(updated_document): 1},
+        )
+
+    async def _count(self, counts: Counter):
+        requests = [
+            UpdateOne(
+                {"_id": dict(zip(STATS_FIELDS, key))},
+                {"$inc": {"count": count}},
+                upsert=True,
+            )
+            for key, count in counts.items()
+            if count
+        ]
+        if requests:
+            await self._stats.bulk_write(requests, ordered=False)
@@ -0,0 +1,85 @@
+import threading
+
+from pymongo import monitoring
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    PoolMetrics listens to the Motor/PyMongo connection pool events and keeps
+    the counters needed to size the pool of a single worker process.
+    """
+
+    def __init__(self, max_pool_size: int):
+        self._max_pool_size = max_pool_size
+        # Pool events are published from the driver's threads.
+        self._lock = threading.Lock()
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._created = 0
+        self._closed = 0
+        self._checkouts = 0
+        self._checkout_failures = 0
+        self._clears = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": self._max_pool_size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "utilization": (
+                    self._in_use / self._max_pool_size if self._max_pool_size else 0.0
+                ),
+                "created": self._created,
+                "closed": self._closed,
+                "checkouts": self._checkouts,
+                "checkout_failures": self._checkout_failures,
+                "clears": self._clears,
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self._open += 1
+            self._created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._open -= 1
+            self._closed += 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._waiting += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._waiting -= 1
+            self._checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self._waiting -= 1
+            self._in_use += 1
+            self._checkouts += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._in_use -= 1
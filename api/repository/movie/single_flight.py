@@ -0,0 +1,246 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from api.entities.movie import Movie
+from api.metrics import MetricsRegistry
+from api.repository.movie.abstractions import (
+    BulkItemResult,
+    MovieRepository,
+    projection_fields,
+)
+from api.repository.movie.delegating import DelegatingMovieRepository
+
+
+class SingleFlightMovieRepository(DelegatingMovieRepository):
+    """
+    SingleFlightMovieRepository collapses concurrent identical reads into a
+    single call to another repository, every caller awaits the same result.
+
+    Concurrent callers share the returned objects, they must not mutate
+    them. A read which is in flight when a write completes is not joined by
+    later callers, so they observe the write.
+    """
+
+    def __init__(
+        self,
+        repository: MovieRepository,
+        registry: MetricsRegistry | None = None,
+    ):
+        super().__init__(repository)
+        registry = registry or MetricsRegistry()
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self._collapsed = registry.counter(
+            "movie_repository_collapsed_calls_total",
+            "Movie repository reads served by joining an identical read in "
+            "flight, by operation.",
+            ("operation",),
+        )
+
+    def collapsed_calls(self, operation: str) -> int:
+        return int(self._collapsed.value((operation,)))
+
+    async def create(self, movie: Movie):
+        await self._write(lambda: self._repository.create(movie))
+
+    async def create_many(self, movies: list[Movie]) -> list[BulkItemResult]:
+        return await self._write(lambda: self._repository.create_many(movies))
+
+    async def get(self, movie_id: str) -> Movie | None:
+        return await self._read(
+            ("get", movie_id),
+            lambda: self._repository.get(movie_id),
+        )
+
+    async def get_by_title(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[Movie]:
+        return await self._read(
+            ("get_by_title", title, offset, limit, after_movie_id),
+            lambda: self._repository.get_by_title(
+                title=title,
+                offset=offset,
+                limit=limit,
+                after_movie_id=after_movie_id,
+            ),
+        )
+
+    async def get_document(
+        self,
+        movie_id: str,
+        fields: list[str] | None = None,
+        with_version: bool = False,
+    ) -> dict | None:
+        return await self._read(
+            ("get_document", movie_id, projection_fields(fields), with_version),
+            lambda: self._repository.get_document(
+                movie_id,
+                fields=fields,
+                with_version=with_version,
+            ),
+        )
+
+    async def get_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        with_version: bool = False,
+    ) -> list[dict]:
+        return await self._read(
+            (
+                "get_documents_by_title",
+                title,
+                projection_fields(fields),
+                offset,
+                limit,
+                after_movie_id,
+                with_version,
+            ),
+            lambda: self._repository.get_documents_by_title(
+                title=title,
+                fields=fields,
+                offset=offset,
+                limit=limit,
+                after_movie_id=after_movie_id,
+                with_version=with_version,
+            ),
+        )
+
+    async def get_version(self, movie_id: str) -> int | None:
+        return await self._read(
+            ("get_version", movie_id),
+            lambda: self._repository.get_version(movie_id),
+        )
+
+    async def get_title_versions(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[tuple[str, int]]:
+        return await self._read(
+            ("get_title_versions", title, offset, limit, after_movie_id),
+            lambda: self._repository.get_title_versions(
+                title=title,
+                offset=offset,
+                limit=limit,
+                after_movie_id=after_movie_id,
+            ),
+        )
+
+    async def search_documents(
+        self,
+        query: str,
+        mode: str = "text",
+        fields: list[str] | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        return await self._read(
+            ("search_documents", query, mode, projection_fields(fields), limit),
+            lambda: self._repository.search_documents(
+                query,
+                mode=mode,
+                fields=fields,
+                limit=limit,
+            ),
+        )
+
+    async def filter_documents(
+        self,
+        release_year_from: int | None = None,
+        release_year_to: int | None = None,
+        watched: bool | None = None,
+        sort: str = "release_year",
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+    ) -> list[dict]:
+        return await self._read(
+            (
+                "filter_documents",
+                release_year_from,
+                release_year_to,
+                watched,
+                sort,
+                projection_fields(fields),
+                offset,
+                limit,
+            ),
+            lambda: self._repository.filter_documents(
+                release_year_from=release_year_from,
+                release_year_to=release_year_to,
+                watched=watched,
+                sort=sort,
+                fields=fields,
+                offset=offset,
+                limit=limit,
+            ),
+        )
+
+    async def stats(self) -> dict:
+        return await self._read(("stats",), self._repository.stats)
+
+    async def rebuild_stats(self):
+        await self._write(self._repository.rebuild_stats)
+
+    async def delete(self, movie_id: str):
+        return await self._write(lambda: self._repository.delete(movie_id))
+
+    async def delete_many(self, movie_ids: list[str]) -> list[BulkItemResult]:
+        return await self._write(lambda: self._repository.delete_many(movie_ids))
+
+    async def update(self, movie_id: str, update_parameters: dict):
+        await self._write(
+            lambda: self._repository.update(movie_id, update_parameters),
+        )
+
+    async def update_if_version(
+        self,
+        movie_id: str,
+        version: int,
+        update_parameters: dict,
+    ) -> int:
+        return await self._write(
+            lambda: self._repository.update_if_version(
+                movie_id,
+                version,
+                update_parameters,
+            ),
+        )
+
+    async def update_many(
+        self,
+        updates: list[tuple[str, dict]],
+    ) -> list[BulkItemResult]:
+        return await self._write(lambda: self._repository.update_many(updates))
+
+    async def _read(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._collapsed.inc((key[0],))
+        else:
+            # A task rather than the caller's coroutine, so cancelling the
+            # first caller does not cancel the read for the others.
+            task = asyncio.ensure_future(load())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    async def _write(self, write: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await write()
+        finally:
+            # Reads in flight may have missed the write, later reads must
+            # not join them.
+            self._in_flight.clear()
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
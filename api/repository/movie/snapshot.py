@@ -0,0 +1,95 @@
+import mmap
+import os
+import struct
+import tempfile
+from typing import Iterable, Iterator
+
+from api.entities.movie import Movie
+
+MAGIC = b"MOVIESN1"
+
+# Magic and movie count.
+HEADER = struct.Struct("<8sQ")
+
+# Version, release year, watched and the encoded lengths of the movie id, the
+# title and the description, which follow the record as UTF-8.
+RECORD = struct.Struct("<qi?III")
+
+
+def write_snapshot(path: str, movies: Iterable[tuple[Movie, int]], count: int):
+    """
+    Write count (movie, version) pairs to path. The snapshot is written to a
+    temporary file of its own, next to path, which replaces path once it is
+    complete, so path always holds a whole snapshot even when several
+    processes write it.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(
+        prefix=f"{name}.",
+        suffix=".tmp",
+        dir=directory,
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as snapshot_file:
+            snapshot_file.write(HEADER.pack(MAGIC, count))
+            for movie, version in movies:
+                movie_id = movie.movie_id.encode()
+                title = movie.title.encode()
+                description = movie.description.encode()
+                snapshot_file.write(
+                    RECORD.pack(
+                        version,
+                        movie.release_year,
+                        movie.watched,
+                        len(movie_id),
+                        len(title),
+                        len(description),
+                    ),
+                )
+                snapshot_file.write(movie_id + title + description)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def read_snapshot(path: str) -> Iterator[tuple[tuple, int]]:
+    """
+    (fields, version) pairs of a snapshot written by write_snapshot, the
+    fields of a movie are in the order of MOVIE_FIELDS.
+    """
+    with open(path, "rb") as snapshot_file, mmap.mmap(
+        snapshot_file.fileno(),
+        0,
+        access=mmap.ACCESS_READ,
+    ) as data:
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not a movie snapshot")
+        magic, count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a movie snapshot")
+        offset = HEADER.size
+        for _ in range(count):
+            (
+                version,
+                release_year,
+                watched,
+                id_length,
+                title_length,
+                description_length,
+            ) = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            title_offset = offset + id_length
+            description_offset = title_offset + title_length
+            end = description_offset + description_length
+            fields = (
+                str(data[offset:title_offset], "utf-8"),
+                release_year,
+                str(data[title_offset:description_offset], "utf-8"),
+                str(data[description_offset:end], "utf-8"),
+                watched,
+            )
+            offset = end
+            yield fields, version
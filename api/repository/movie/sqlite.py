@@ -0,0 +1,153 @@
+import asyncio
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable
+
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import MOVIE_FIELDS, BulkItemResult
+from api.repository.movie.memory import MemoryMovieRepository, MovieRecord, stored_movie
+
+# SQLite synchronous levels, FULL syncs the WAL on every commit so an
+# acknowledged write survives a power loss, NORMAL only an application crash.
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    movie_id TEXT PRIMARY KEY,
+    document TEXT NOT NULL,
+    version INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+
+class SqliteMovieRepository(MemoryMovieRepository):
+    """
+    SqliteMovieRepository serves every read from the in memory repository
+    and persists every write to a SQLite database in WAL mode, the database
+    is loaded into memory when the repository is created.
+
+    Writes are applied to memory and committed one at a time, and return
+    once they are committed. A write whose commit fails is rolled back in
+    memory, concurrent readers on this process may see it until then.
+    Commits run on a single background thread to keep the event loop free.
+    """
+
+    def __init__(self, path: str, synchronous: str = "FULL", compact: bool = False):
+        super().__init__(compact=compact)
+        if synchronous.upper() not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown SQLite synchronous level: {synchronous}")
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={synchronous.upper()}")
+        with self._connection:
+            self._connection.execute(SCHEMA)
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._write_lock = asyncio.Lock()
+        self._load()
+
+    async def close(self):
+        self._writer.shutdown(wait=True)
+        self._connection.close()
+
+    async def create(self, movie: Movie):
+        await self._write([movie.id], partial(super().create, movie))
+
+    async def create_many(self, movies: list[Movie]) -> list[BulkItemResult]:
+        return await self._write(
+            [movie.id for movie in movies],
+            partial(super().create_many, movies),
+        )
+
+    async def delete(self, movie_id: str):
+        return await self._write([movie_id], partial(super().delete, movie_id))
+
+    async def delete_many(self, movie_ids: list[str]) -> list[BulkItemResult]:
+        return await self._write(movie_ids, partial(super().delete_many, movie_ids))
+
+    async def update(self, movie_id: str, update_parameters: dict):
+        await self._write(
+            [movie_id],
+            partial(super().update, movie_id, update_parameters),
+        )
+
+    async def update_if_version(
+        self,
+        movie_id: str,
+        version: int,
+        update_parameters: dict,
+    ) -> int:
+        return await self._write(
+            [movie_id],
+            partial(super().update_if_version, movie_id, version, update_parameters),
+        )
+
+    async def update_many(
+        self,
+        updates: list[tuple[str, dict]],
+    ) -> list[BulkItemResult]:
+        return await self._write(
+            [movie_id for movie_id, _ in updates],
+            partial(super().update_many, updates),
+        )
+
+    def _load(self):
+        rows = self._connection.execute("SELECT document, version FROM movies")
+        for document, version in rows:
+            fields = json.loads(document)
+            movie = MovieRecord(**fields) if self._compact else stored_movie(**fields)
+            self._storage[movie.id] = movie
+            self._versions[movie.id] = version
+        # Indexed once, as load_snapshot does, rather than movie by movie.
+        self._reindex()
+
+    async def _write(self, movie_ids: list[str], write: Callable[[], Awaitable]):
+        async with self._write_lock:
+            # Stored movies are replaced rather than changed, the references
+            # are enough to put them back.
+            previous = {
+                movie_id: (self._storage.get(movie_id), self._versions.get(movie_id))
+                for movie_id in movie_ids
+            }
+            result = await write()
+            try:
+                await self._persist(movie_ids)
+            except Exception:
+                self._restore(previous)
+                raise
+            return result
+
+    def _restore(self, previous: dict[str, tuple]):
+        for movie_id, (movie, version) in previous.items():
+            self._delete(movie_id)
+            if movie is not None:
+                self._create(movie)
+                self._versions[movie_id] = version
+
+    async def _persist(self, movie_ids: list[str]):
+        # The rows are read now, before anything else can change the movies,
+        # and the single writer thread commits them in submission order.
+        upserts, deletes = [], []
+        for movie_id in dict.fromkeys(movie_ids):
+            movie = self._storage.get(movie_id)
+            if movie is None:
+                deletes.append((movie_id,))
+            else:
+                document = json.dumps(self._document(movie, MOVIE_FIELDS))
+                upserts.append((movie_id, document, self._versions[movie_id]))
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer, self._commit, upserts, deletes)
+
+    def _commit(self, upserts: list[tuple], deletes: list[tuple]):
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO movies (movie_id, document, version) VALUES (?, ?, ?) "
+                "ON CONFLICT (movie_id) DO UPDATE "
+                "SET document = excluded.document, version = excluded.version",
+                upserts,
+            )
+            self._connection.executemany(
+                "DELETE FROM movies WHERE movie_id = ?",
+                deletes,
+            )
@@ -0,0 +1,362 @@
+import asyncio
+import logging
+from collections import namedtuple
+from itertools import chain, groupby
+from typing import AsyncIterator
+
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import (
+    BulkItemResult,
+    MovieRepository,
+    RepositoryException,
+)
+from api.repository.movie.delegating import DelegatingMovieRepository
+
+logger = logging.getLogger(__name__)
+
+# "queued" returns once a write is queued, a crash loses the queued writes
+# and their errors are only logged. "flushed" returns once the batch holding
+# the write is stored, and raises its error.
+WRITE_DURABILITIES = ("queued", "flushed")
+
+# A queued create or update, written is resolved once it is stored.
+PendingWrite = namedtuple(
+    "PendingWrite",
+    ["operation", "movie_id", "payload", "written", "queued_at"],
+)
+
+
+class WriteBehindMovieRepository(DelegatingMovieRepository):
+    """
+    WriteBehindMovieRepository queues single creates and updates and writes
+    them to another repository in batches, through create_many and
+    update_many, once max_batch writes are queued or flush_interval_seconds
+    after the first one.
+
+    Writes are stored in the order they were queued. get, get_document,
+    get_version and the other writes of a movie wait for its queued writes
+    first, and the reads of several movies wait for every queued write, so
+    this worker reads its own writes and a cache above never keeps a page
+    without them. close drains the queue before closing the repository.
+    """
+
+    def __init__(
+        self,
+        repository: MovieRepository,
+        max_batch: int = 500,
+        flush_interval_seconds: float = 0.005,
+        durability: str = "flushed",
+        max_pending: int = 10000,
+    ):
+        super().__init__(repository)
+        if durability not in WRITE_DURABILITIES:
+            raise ValueError(f"Unknown write durability: {durability}")
+        self._max_batch = max_batch
+        self._flush_interval_seconds = flush_interval_seconds
+        self._durability = durability
+        # None in the queue asks for the writes before it to be flushed now.
+        self._queue: asyncio.Queue[PendingWrite | None] = asyncio.Queue(max_pending)
+        # movie id -> written futures of its queued writes.
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._flusher: asyncio.Task | None = None
+        self._closed = False
+
+    async def close(self):
+        self._closed = True
+        if self._flusher is not None:
+            await self._queue.put(None)
+            await self._queue.join()
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        await self._repository.close()
+
+    async def create(self, movie: Movie):
+        await self._enqueue("create", movie.id, movie)
+
+    async def create_many(self, movies: list[Movie]) -> list[BulkItemResult]:
+        await self._settle([movie.id for movie in movies])
+        return await self._repository.create_many(movies)
+
+    async def get(self, movie_id: str) -> Movie | None:
+        await self._settle([movie_id])
+        return await self._repository.get(movie_id)
+
+    async def get_by_title(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[Movie]:
+        await self._settle_all()
+        return await self._repository.get_by_title(
+            title=title,
+            offset=offset,
+            limit=limit,
+            after_movie_id=after_movie_id,
+        )
+
+    async def get_document(
+        self,
+        movie_id: str,
+        fields: list[str] | None = None,
+        with_version: bool = False,
+    ) -> dict | None:
+        await self._settle([movie_id])
+        return await self._repository.get_document(
+            movie_id,
+            fields=fields,
+            with_version=with_version,
+        )
+
+    async def get_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        with_version: bool = False,
+    ) -> list[dict]:
+        await self._settle_all()
+        return await self._repository.get_documents_by_title(
+            title=title,
+            fields=fields,
+            offset=offset,
+            limit=limit,
+            after_movie_id=after_movie_id,
+            with_version=with_version,
+        )
+
+    async def get_version(self, movie_id: str) -> int | None:
+        await self._settle([movie_id])
+        return await self._repository.get_version(movie_id)
+
+    async def get_title_versions(
+        self,
+        title: str,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+    ) -> list[tuple[str, int]]:
+        await self._settle_all()
+        return await self._repository.get_title_versions(
+            title=title,
+            offset=offset,
+            limit=limit,
+            after_movie_id=after_movie_id,
+        )
+
+    async def search_documents(
+        self,
+        query: str,
+        mode: str = "text",
+        fields: list[str] | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        await self._settle_all()
+        return await self._repository.search_documents(
+            query,
+            mode=mode,
+            fields=fields,
+            limit=limit,
+        )
+
+    async def filter_documents(
+        self,
+        release_year_from: int | None = None,
+        release_year_to: int | None = None,
+        watched: bool | None = None,
+        sort: str = "release_year",
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+    ) -> list[dict]:
+        await self._settle_all()
+        return await self._repository.filter_documents(
+            release_year_from=release_year_from,
+            release_year_to=release_year_to,
+            watched=watched,
+            sort=sort,
+            fields=fields,
+            offset=offset,
+            limit=limit,
+        )
+
+    async def iter_documents(self, batch_size: int = 1000) -> AsyncIterator[dict]:
+        await self._settle_all()
+        async for document in self._repository.iter_documents(batch_size=batch_size):
+            yield document
+
+    async def iter_documents_by_title(
+        self,
+        title: str,
+        fields: list[str] | None = None,
+        offset: int = 0,
+        limit: int = 1000,
+        after_movie_id: str | None = None,
+        through_movie_id: str | None = None,
+    ) -> AsyncIterator[dict]:
+        await self._settle_all()
+        async for document in self._repository.iter_documents_by_title(
+            title=title,
+            fields=fields,
+            offset=offset,
+            limit=limit,
+            after_movie_id=after_movie_id,
+            through_movie_id=through_movie_id,
+        ):
+            yield document
+
+    async def stats(self) -> dict:
+        await self._settle_all()
+        return await self._repository.stats()
+
+    async def rebuild_stats(self):
+        await self._settle_all()
+        await self._repository.rebuild_stats()
+
+    async def delete(self, movie_id: str):
+        await self._settle([movie_id])
+        return await self._repository.delete(movie_id)
+
+    async def delete_many(self, movie_ids: list[str]) -> list[BulkItemResult]:
+        await self._settle(movie_ids)
+        return await self._repository.delete_many(movie_ids)
+
+    async def update(self, movie_id: str, update_parameters: dict):
+        await self._enqueue("update", movie_id, update_parameters)
+
+    async def update_if_version(
+        self,
+        movie_id: str,
+        version: int,
+        update_parameters: dict,
+    ) -> int:
+        await self._settle([movie_id])
+        return await self._repository.update_if_version(
+            movie_id,
+            version,
+            update_parameters,
+        )
+
+    async def update_many(
+        self,
+        updates: list[tuple[str, dict]],
+    ) -> list[BulkItemResult]:
+        await self._settle([movie_id for movie_id, _ in updates])
+        return await self._repository.update_many(updates)
+
+    def pending_writes(self) -> int:
+        return sum(len(futures) for futures in self._pending.values())
+
+    async def _enqueue(self, operation: str, movie_id: str, payload):
+        if self._closed:
+            raise RepositoryException("movie repository is closed")
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_continuously())
+        loop = asyncio.get_running_loop()
+        written = loop.create_future()
+        self._pending.setdefault(movie_id, []).append(written)
+        written.add_done_callback(lambda _: self._forget(movie_id, written))
+        await self._queue.put(
+            PendingWrite(operation, movie_id, payload, written, loop.time()),
+        )
+        if self._durability == "flushed":
+            # Shielded, a cancelled caller must not cancel the queued write.
+            await asyncio.shield(written)
+        else:
+            written.add_done_callback(self._log_failure)
+
+    async def _settle(self, movie_ids: list[str]):
+        """Wait until the queued writes of movie_ids are stored."""
+        await self._wait(
+            [
+                future
+                for movie_id in set(movie_ids)
+                for future in self._pending.get(movie_id, ())
+            ],
+        )
+
+    async def _settle_all(self):
+        """Wait until every queued write is stored."""
+        await self._wait(list(chain.from_iterable(self._pending.values())))
+
+    async def _wait(self, futures: list[asyncio.Future]):
+        if not futures:
+            return
+        # Flush now rather than once the batch is due.
+        await self._queue.put(None)
+        await asyncio.wait(futures)
+
+    async def _flush_continuously(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first_write = await self._queue.get()
+            if first_write is None:
+                self._queue.task_done()
+                continue
+            writes = [first_write]
+            # Writes queued during the previous flush are already due.
+            deadline = first_write.queued_at + self._flush_interval_seconds
+            while len(writes) < self._max_batch:
+                if not self._queue.empty():
+                    # Queued writes join the batch even once it is due.
+                    write = self._queue.get_nowait()
+                elif deadline <= loop.time():
+                    break
+                else:
+                    try:
+                        write = await asyncio.wait_for(
+                            self._queue.get(),
+                            deadline - loop.time(),
+                        )
+                    except asyncio.TimeoutError:
+                        break
+                if write is None:
+                    self._queue.task_done()
+                    break
+                writes.append(write)
+            try:
+                await self._flush(writes)
+            finally:
+                for _ in writes:
+                    self._queue.task_done()
+
+    async def _flush(self, writes: list[PendingWrite]):
+        # Consecutive writes of the same kind go in one call, the calls are
+        # made in queue order.
+        for operation, run in groupby(writes, key=lambda write: write.operation):
+            batch = list(run)
+            try:
+                if operation == "create":
+                    results = await self._repository.create_many(
+                        [write.payload for write in batch],
+                    )
+                else:
+                    results = await self._repository.update_many(
+                        [(write.movie_id, write.payload) for write in batch],
+                    )
+            except Exception as exc:
+                for write in batch:
+                    write.written.set_exception(exc)
+                continue
+            for write, result in zip(batch, results):
+                if result.error is None:
+                    write.written.set_result(None)
+                else:
+                    write.written.set_exception(RepositoryException(result.error))
+
+    def _forget(self, movie_id: str, written: asyncio.Future):
+        futures = self._pending[movie_id]
+        futures.remove(written)
+        if not futures:
+            del self._pending[movie_id]
+
+    @staticmethod
+    def _log_failure(written: asyncio.Future):
+        if written.exception() is not None:
+            logger.error("Queued movie write failed: %s", written.exception())
@@ -0,0 +1,9 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class BulkItemResponse(BaseModel):
+    movie_id: str
+    status: str
+    detail: Optional[str]
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class CacheStatsResponse(BaseModel):
+    size: int
+    max_entries: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
@@ -0,0 +1,33 @@
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def render_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    FastJSONResponse renders plain stored documents as they are, without
+    FastAPI's validation and jsonable_encoder pass, using orjson when it is
+    installed. Movies are validated when they are created and the memory
+    backends validate updates, but the Mongo backend stores the fields of an
+    update without validating the whole movie again.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+
+
+class ImportResponse(BaseModel):
+    imported: int
+    failed: int
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class PoolStatsResponse(BaseModel):
+    max_pool_size: int
+    open: int
+    in_use: int
+    waiting: int
+    utilization: float
+    created: int
+    closed: int
+    checkouts: int
+    checkout_failures: int
+    clears: int
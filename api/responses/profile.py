@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class ProfileResponse(BaseModel):
+    profile_id: str
+    method: str
+    path: str
+    status_code: int
+    duration_seconds: float
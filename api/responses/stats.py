@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class MovieStatsResponse(BaseModel):
+    total: int
+    watched: int
+    unwatched: int
+    watched_ratio: float
+    by_release_year: dict[int, int]
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseSettings, Field
 
 
@@ -5,6 +7,101 @@ class Settings(BaseSettings):
     def __hash__(self) -> int:
         return 1
 
+    # Server Settings
+    server_host: str = Field("0.0.0.0")  # nosec B104
+    server_port: int = Field(8080)
+    # Worker processes, 0 starts one per CPU core.
+    server_workers: int = Field(1)
+    # Event loop and HTTP parser, "auto" prefers uvloop and httptools.
+    server_loop: str = Field("auto")
+    server_http: str = Field("auto")
+    server_backlog: int = Field(2048)
+    server_keep_alive_seconds: int = Field(5)
+    server_limit_concurrency: Optional[int] = Field(None)
+
+    # Repository Settings
+    # Movie repository backend: "mongo", "memory" (lost on restart) or
+    # "sqlite", served from memory and persisted to a local SQLite file. The
+    # memory and sqlite backends hold the movies in the worker, main refuses
+    # to start more than one worker with them.
+    movie_repository_backend: str = Field("mongo")
+    # Store the movies of the memory and sqlite backends as compact slotted
+    # records, Movie models are only built for the callers.
+    memory_compact_storage: bool = Field(False)
+    # The memory backend is loaded from this snapshot file on startup, when
+    # it exists, and saved to it periodically and on shutdown.
+    memory_snapshot_path: Optional[str] = Field(None)
+    memory_snapshot_interval_seconds: float = Field(300.0)
+    sqlite_path: str = Field("movies.db")
+    # SQLite synchronous level, FULL makes acknowledged writes survive a
+    # power loss, NORMAL only a process crash.
+    sqlite_synchronous: str = Field("FULL")
+
     # MongoDB Settings
     mongo_connection_string: str = Field("mongodb://localhost:27017")
     mongo_database_name: str = Field("movie_tracker_db")
+    # Create the movie collection indexes on startup, and count the statistics
+    # of a stored catalog which has none yet.
+    mongo_ensure_indexes: bool = Field(True)
+    # Refuse to start when expected indexes are missing instead of logging.
+    mongo_require_indexes: bool = Field(False)
+    # Connection pool, sized per worker process.
+    mongo_max_pool_size: int = Field(100)
+    mongo_min_pool_size: int = Field(0)
+    mongo_max_idle_time_ms: Optional[int] = Field(None)
+    mongo_wait_queue_timeout_ms: Optional[int] = Field(None)
+    mongo_connect_timeout_ms: int = Field(20000)
+    mongo_server_selection_timeout_ms: int = Field(30000)
+    mongo_socket_timeout_ms: Optional[int] = Field(None)
+    mongo_read_preference: str = Field("primary")
+
+    # Bulk Settings
+    bulk_max_items: int = Field(10000)
+
+    # NDJSON import/export Settings
+    export_batch_size: int = Field(1000)
+    import_batch_size: int = Field(1000)
+    import_max_line_bytes: int = Field(1024 * 1024)
+
+    # Response Settings
+    # Title pages of up to this many movies are sent whole, larger ones are
+    # streamed as they are read.
+    title_stream_buffer_documents: int = Field(200)
+    title_stream_chunk_bytes: int = Field(64 * 1024)
+    # Responses are compressed with brotli, when installed, or gzip as the
+    # client accepts, bodies smaller than the minimum are sent as they are.
+    compression_enabled: bool = Field(True)
+    compression_minimum_bytes: int = Field(1024)
+    compression_gzip_level: int = Field(6)
+    compression_brotli_quality: int = Field(4)
+
+    # Metrics Settings
+    # Serve Prometheus metrics on /metrics, they are kept per worker process.
+    metrics_enabled: bool = Field(True)
+
+    # Profiling Settings
+    # Requests carrying the profiling header are profiled with cProfile, the
+    # latest profiles can be downloaded from /api/v1/admin/profiles.
+    profiling_enabled: bool = Field(False)
+    profiling_header: str = Field("X-Profile")
+    profiling_max_entries: int = Field(20)
+
+    # Write-behind Settings
+    # Single creates and updates are queued and stored in batches of up to
+    # max_batch writes, flushed at the latest interval seconds after the
+    # first one. Durability "flushed" answers once the batch is stored,
+    # "queued" once the write is queued, a crash then loses queued writes.
+    write_behind_enabled: bool = Field(False)
+    write_behind_max_batch: int = Field(500)
+    write_behind_flush_interval_seconds: float = Field(0.005)
+    write_behind_durability: str = Field("flushed")
+    write_behind_max_pending: int = Field(10000)
+
+    # Read coalescing Settings
+    # Concurrent identical reads share a single backend call.
+    movie_single_flight_enabled: bool = Field(True)
+
+    # Movie cache Settings
+    movie_cache_enabled: bool = Field(False)
+    movie_cache_max_entries: int = Field(10000)
+    movie_cache_ttl_seconds: float = Field(30.0)
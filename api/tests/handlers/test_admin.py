@@ -0,0 +1,128 @@
+import functools
+import marshal
+
+import pytest
+from starlette import status
+from starlette.testclient import TestClient
+
+from api.api import create_app
+from api.handlers.movie import movie_repository, settings_instance
+from api.repository.movie.cache import CachedMovieRepository
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.pool import PoolMetrics
+from api.tests.fixture import test_client  # type: ignore
+
+
+def memory_repository_dependency(dependency):
+    return dependency
+
+
+@pytest.mark.asyncio()
+async def test_get_cache_stats(test_client):
+    # Setup
+    repo = CachedMovieRepository(MemoryMovieRepository())
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    test_client.get("/api/v1/movies/missing")
+    test_client.get("/api/v1/movies/missing")
+
+    # Test
+    result = test_client.get("/api/v1/admin/cache")
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json()["hits"] == 1
+    assert result.json()["misses"] == 1
+
+
+@pytest.mark.asyncio()
+async def test_get_cache_stats_disabled(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+
+    # Test
+    result = test_client.get("/api/v1/admin/cache")
+
+    # Assertion
+    assert result.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio()
+async def test_get_pool_stats(test_client):
+    # Setup
+    test_client.app.state.pool_metrics = PoolMetrics(max_pool_size=10)
+
+    # Test
+    result = test_client.get("/api/v1/admin/pool")
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json()["max_pool_size"] == 10
+    assert result.json()["in_use"] == 0
+
+
+@pytest.fixture()
+def profiling_client(monkeypatch):
+    monkeypatch.setenv("PROFILING_ENABLED", "true")
+    settings_instance.cache_clear()
+    yield TestClient(app=create_app())
+    settings_instance.cache_clear()
+
+
+@pytest.mark.asyncio()
+async def test_profile_request(profiling_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    profiling_client.app.dependency_overrides[movie_repository] = patched_dependency
+    profiling_client.get("/api/v1/movies/missing")
+    profiled = profiling_client.get(
+        "/api/v1/movies/missing",
+        headers={"X-Profile": "1"},
+    )
+    profile_id = profiled.headers["X-Profile-Id"]
+
+    # Test
+    profiles = profiling_client.get("/api/v1/admin/profiles")
+    download = profiling_client.get(f"/api/v1/admin/profiles/{profile_id}")
+    text = profiling_client.get(
+        f"/api/v1/admin/profiles/{profile_id}",
+        params={"format": "text"},
+    )
+
+    # Assertion
+    assert profiles.status_code == status.HTTP_200_OK
+    assert [profile["profile_id"] for profile in profiles.json()] == [profile_id]
+    assert profiles.json()[0]["path"] == "/api/v1/movies/missing"
+    assert profiles.json()[0]["status_code"] == status.HTTP_404_NOT_FOUND
+    assert download.status_code == status.HTTP_200_OK
+    assert download.headers["content-type"] == "application/octet-stream"
+    assert "function calls" in text.text
+    profile = marshal.loads(download.content)
+    assert any(function[2] == "get_document" for function in profile)
+
+
+@pytest.mark.asyncio()
+async def test_get_profiles_disabled(test_client):
+    # Test
+    result = test_client.get("/api/v1/admin/profiles")
+
+    # Assertion
+    assert result.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio()
+async def test_rebuild_movie_stats(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+
+    # Test
+    result = test_client.post("/api/v1/admin/stats/rebuild")
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json()["total"] == 0
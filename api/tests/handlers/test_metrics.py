@@ -0,0 +1,50 @@
+import functools
+
+import pytest
+from starlette import status
+
+from api.handlers.movie import movie_repository
+from api.repository.movie.memory import MemoryMovieRepository
+from api.tests.fixture import test_client  # type: ignore
+
+
+def memory_repository_dependency(dependency):
+    return dependency
+
+
+@pytest.mark.asyncio()
+async def test_get_metrics(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    test_client.get("/api/v1/movies/missing")
+    test_client.get("/api/v1/unknown")
+
+    # Test
+    result = test_client.get("/metrics")
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert result.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/api/v1/movies/{movie_id}",status="404"} 1'
+    ) in result.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="unmatched",status="404"} 1'
+    ) in result.text
+    assert "http_requests_in_flight 1" in result.text
+
+
+@pytest.mark.asyncio()
+async def test_get_metrics_disabled(test_client):
+    # Setup
+    del test_client.app.state.metrics
+
+    # Test
+    result = test_client.get("/metrics")
+
+    # Assertion
+    assert result.status_code == status.HTTP_404_NOT_FOUND
@@ -1,4 +1,5 @@
 import functools
+import json
 import uuid
 
 import pytest
@@ -334,3 +335,549 @@ async def test_delete_movie_not_found(test_client):
 
     # Assertion
     assert result.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio()
+async def test_create_movies_bulk(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+
+    # Test
+    result = test_client.post(
+        "/api/v1/movies/bulk",
+        json=[
+            {
+                "movie_id": "ignored",
+                "title": f"My Movie {index}",
+                "description": "string",
+                "release_year": 2000,
+            }
+            for index in range(3)
+        ],
+    )
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    items = result.json()
+    assert [item["status"] for item in items] == ["created"] * 3
+    for item in items:
+        assert await repo.get(movie_id=item["movie_id"]) is not None
+
+
+@pytest.mark.asyncio()
+async def test_update_movies_bulk(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="top_movie",
+            title="Needs Update",
+            description="Needs Update",
+            release_year=2000,
+        ),
+    )
+
+    # Test
+    result = test_client.patch(
+        "/api/v1/movies/bulk",
+        json=[
+            {"movie_id": "top_movie", "watched": True},
+            {"movie_id": "missing", "watched": True},
+        ],
+    )
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json() == [
+        {"movie_id": "top_movie", "status": "updated", "detail": None},
+        {
+            "movie_id": "missing",
+            "status": "failed",
+            "detail": "movie: missing not found",
+        },
+    ]
+    movie = await repo.get(movie_id="top_movie")
+    assert movie.watched is True
+
+
+@pytest.mark.asyncio()
+async def test_delete_movies_bulk(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="top_movie",
+            title="Needs Update",
+            description="Needs Update",
+            release_year=2000,
+        ),
+    )
+
+    # Test
+    result = test_client.request(
+        "DELETE",
+        "/api/v1/movies/bulk",
+        json=["top_movie", "missing"],
+    )
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert [item["status"] for item in result.json()] == ["deleted", "failed"]
+    assert await repo.get(movie_id="top_movie") is None
+
+
+@pytest.mark.asyncio()
+async def test_export_movies(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for index in range(3):
+        await repo.create(
+            Movie(
+                movie_id=f"movie-{index}",
+                title="My movie",
+                description="Movie description",
+                release_year=2000,
+            ),
+        )
+
+    # Test
+    result = test_client.get("/api/v1/movies/export")
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert result.headers["content-type"] == "application/x-ndjson"
+    lines = result.text.splitlines()
+    assert [json.loads(line)["movie_id"] for line in lines] == [
+        "movie-0",
+        "movie-1",
+        "movie-2",
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_import_movies(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    lines = [
+        json.dumps(
+            {
+                "movie_id": f"movie-{index}",
+                "title": "My movie",
+                "description": "Movie description",
+                "release_year": 2000,
+            },
+        )
+        for index in range(3)
+    ]
+    lines.insert(1, '{"movie_id": "invalid"}')
+    lines.insert(2, "not json")
+    lines.insert(3, "")
+
+    # Test
+    result = test_client.post(
+        "/api/v1/movies/import",
+        content="\n".join(lines),
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json() == {"imported": 3, "failed": 2}
+    assert [movie.id for movie in await repo.get_by_title("My movie")] == [
+        "movie-0",
+        "movie-1",
+        "movie-2",
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_get_movie_by_title_cursor_pagination(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for index in range(5):
+        await repo.create(
+            Movie(
+                movie_id=f"movie-{index}",
+                title="My movie",
+                description="Movie description",
+                release_year=2000,
+            ),
+        )
+
+    # Test
+    pages = []
+    result = test_client.get("/api/v1/movies/?title=My movie&limit=2")
+    pages.append([movie["movie_id"] for movie in result.json()])
+    while "x-next-cursor" in result.headers:
+        result = test_client.get(
+            "/api/v1/movies/",
+            params={
+                "title": "My movie",
+                "limit": 2,
+                "cursor": result.headers["x-next-cursor"],
+            },
+        )
+        pages.append([movie["movie_id"] for movie in result.json()])
+
+    # Assertion
+    assert pages == [["movie-0", "movie-1"], ["movie-2", "movie-3"], ["movie-4"]]
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize(
+    "cursor",
+    ["not-a-cursor", "WyJPdGhlciB0aXRsZSIsICJtb3ZpZS0wIl0="],
+)
+async def test_get_movie_by_title_invalid_cursor(test_client, cursor):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+
+    # Test
+    result = test_client.get(
+        "/api/v1/movies/",
+        params={"title": "My movie", "cursor": cursor},
+    )
+
+    # Assertion
+    assert result.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio()
+async def test_get_movie_fields(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="found",
+            title="My movie",
+            description="Movie description",
+            release_year=2000,
+        ),
+    )
+
+    # Test
+    by_id = test_client.get("/api/v1/movies/found?fields=title")
+    by_title = test_client.get("/api/v1/movies/?title=My movie&fields=title,watched")
+
+    # Assertion
+    assert by_id.status_code == status.HTTP_200_OK
+    assert by_id.json() == {"movie_id": "found", "title": "My movie"}
+    assert by_title.status_code == status.HTTP_200_OK
+    assert by_title.json() == [
+        {"movie_id": "found", "title": "My movie", "watched": False},
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_get_movie_unknown_fields(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+
+    # Test
+    result = test_client.get("/api/v1/movies/found?fields=title,secret")
+
+    # Assertion
+    assert result.status_code == status.HTTP_400_BAD_REQUEST
+    assert result.json() == {"detail": "Unknown fields: secret"}
+
+
+@pytest.mark.asyncio()
+async def test_search_movies(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="found",
+            title="The Dark Knight",
+            description="Movie description",
+            release_year=2008,
+        ),
+    )
+
+    # Test
+    text = test_client.get("/api/v1/movies/search?q=knight&fields=title")
+    prefix = test_client.get("/api/v1/movies/search?q=the d&mode=prefix&fields=")
+    unknown_mode = test_client.get("/api/v1/movies/search?q=knight&mode=fuzzy")
+
+    # Assertion
+    assert text.status_code == status.HTTP_200_OK
+    assert text.json() == [{"movie_id": "found", "title": "The Dark Knight"}]
+    assert prefix.json() == [{"movie_id": "found"}]
+    assert unknown_mode.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio()
+async def test_filter_movies(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id, release_year, watched in (
+        ("old", 1985, False),
+        ("seen", 1995, True),
+        ("unseen", 1995, False),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My movie",
+                description="Movie description",
+                release_year=release_year,
+                watched=watched,
+            ),
+        )
+
+    # Test
+    result = test_client.get(
+        "/api/v1/movies/filter",
+        params={
+            "release_year_from": 1990,
+            "release_year_to": 2000,
+            "watched": "false",
+            "fields": "release_year",
+        },
+    )
+    invalid_sort = test_client.get("/api/v1/movies/filter?sort=title")
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json() == [{"movie_id": "unseen", "release_year": 1995}]
+    assert invalid_sort.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio()
+async def test_get_movie_stats(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id, watched in (("seen", True), ("unseen", False)):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My movie",
+                description="Movie description",
+                release_year=1995,
+                watched=watched,
+            ),
+        )
+
+    # Test
+    result = test_client.get("/api/v1/movies/stats")
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert result.json() == {
+        "total": 2,
+        "watched": 1,
+        "unwatched": 1,
+        "watched_ratio": 0.5,
+        "by_release_year": {"1995": 2},
+    }
+
+
+@pytest.mark.asyncio()
+async def test_get_movie_etag(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="found",
+            title="My movie",
+            description="Movie description",
+            release_year=2000,
+        ),
+    )
+    first = test_client.get("/api/v1/movies/found")
+    etag = first.headers["ETag"]
+
+    # Test
+    not_modified = test_client.get(
+        "/api/v1/movies/found",
+        headers={"If-None-Match": f'"other", W/{etag}'},
+    )
+    await repo.update("found", {"watched": True})
+    modified = test_client.get(
+        "/api/v1/movies/found",
+        headers={"If-None-Match": etag},
+    )
+
+    # Assertion
+    assert first.status_code == status.HTTP_200_OK
+    assert "version" not in first.json()
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    # The test client accepts gzip, a 304 carries the ETag of the compressed
+    # representation.
+    assert not_modified.headers["ETag"] == f"W/{etag}"
+    assert not_modified.content == b""
+    assert modified.status_code == status.HTTP_200_OK
+    assert modified.headers["ETag"] != etag
+    assert modified.json()["watched"] is True
+
+
+@pytest.mark.asyncio()
+async def test_get_movie_by_title_etag(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for movie_id in ("first", "second", "third"):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My movie",
+                description="Movie description",
+                release_year=2000,
+            ),
+        )
+    url = "/api/v1/movies/?title=My movie&limit=2"
+    first = test_client.get(url)
+    etag = first.headers["ETag"]
+
+    # Test
+    not_modified = test_client.get(url, headers={"If-None-Match": etag})
+    await repo.update("second", {"watched": True})
+    modified = test_client.get(url, headers={"If-None-Match": etag})
+
+    # Assertion
+    assert first.status_code == status.HTTP_200_OK
+    assert [movie["movie_id"] for movie in first.json()] == ["first", "second"]
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert modified.status_code == status.HTTP_200_OK
+    assert modified.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio()
+async def test_get_movie_by_title_streamed(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    for index in range(300):
+        await repo.create(
+            Movie(
+                movie_id=f"movie-{index:03}",
+                title="My movie",
+                description="Movie description",
+                release_year=2000,
+            ),
+        )
+    url = "/api/v1/movies/?title=My movie&limit=250&fields=title"
+
+    # Test
+    result = test_client.get(url, headers={"Accept-Encoding": "gzip"})
+    next_page = test_client.get(
+        f"{url}&cursor={result.headers['X-Next-Cursor']}",
+    )
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert result.headers["Content-Encoding"] == "gzip"
+    assert "ETag" not in result.headers
+    movies = result.json()
+    assert len(movies) == 250
+    assert movies[0] == {"movie_id": "movie-000", "title": "My movie"}
+    assert movies[-1] == {"movie_id": "movie-249", "title": "My movie"}
+    assert [movie["movie_id"] for movie in next_page.json()] == [
+        f"movie-{index}" for index in range(250, 300)
+    ]
+    assert "ETag" in next_page.headers
+
+
+@pytest.mark.asyncio()
+async def test_get_movie_by_title_small_page_not_streamed(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="movie-000",
+            title="My movie",
+            description="Movie description",
+            release_year=2000,
+        ),
+    )
+
+    # Test
+    result = test_client.get(
+        "/api/v1/movies/?title=My movie&limit=1000",
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    # Assertion
+    assert result.status_code == status.HTTP_200_OK
+    assert "Content-Encoding" not in result.headers
+    assert "ETag" in result.headers
+    assert len(result.json()) == 1
+
+
+@pytest.mark.asyncio()
+async def test_patch_update_movie_if_match(test_client):
+    # Setup
+    repo = MemoryMovieRepository()
+    patched_dependency = functools.partial(memory_repository_dependency, repo)
+    test_client.app.dependency_overrides[movie_repository] = patched_dependency
+    await repo.create(
+        Movie(
+            movie_id="top_movie",
+            title="Needs Update",
+            description="Needs Update",
+            release_year=2000,
+        ),
+    )
+    etag = test_client.get("/api/v1/movies/top_movie").headers["ETag"]
+
+    # Test
+    updated = test_client.patch(
+        "/api/v1/movies/top_movie",
+        json={"watched": True},
+        headers={"If-Match": etag},
+    )
+    conflict = test_client.patch(
+        "/api/v1/movies/top_movie",
+        json={"title": "Stale Update"},
+        headers={"If-Match": etag},
+    )
+    listed = test_client.patch(
+        "/api/v1/movies/top_movie",
+        json={"title": "Fresh Update"},
+        headers={"If-Match": f'{etag}, W/{updated.headers["ETag"]}'},
+    )
+
+    # Assertion
+    assert updated.status_code == status.HTTP_200_OK
+    assert updated.headers["ETag"] != etag
+    assert conflict.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert listed.status_code == status.HTTP_200_OK
+    movie = await repo.get("top_movie")
+    assert (movie.title, movie.watched) == ("Fresh Update", True)
+    assert (
+        listed.headers["ETag"]
+        == test_client.get(
+            "/api/v1/movies/top_movie",
+        ).headers["ETag"]
+    )
@@ -0,0 +1,146 @@
+import pytest
+
+from api.entities.movie import Movie
+from api.repository.movie.cache import MISSING, CachedMovieRepository, TTLCache
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(max_entries=2, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {
+        "size": 2,
+        "max_entries": 2,
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+        "expirations": 0,
+    }
+
+
+def test_ttl_cache_expiration():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.set("a", None)
+    clock.now = 9.9
+    assert cache.get("a") is None
+    clock.now = 10
+    assert cache.get("a") is MISSING
+    assert cache.expirations == 1
+    assert len(cache) == 0
+
+
+def test_ttl_cache_invalidate_tag():
+    cache = TTLCache(max_entries=10, ttl_seconds=10)
+    cache.set("a", 1, tags=["x"])
+    cache.set("b", 2, tags=["x", "y"])
+    cache.set("c", 3, tags=["y"])
+    cache.invalidate("x")
+    assert cache.get("a") is MISSING
+    assert cache.get("b") is MISSING
+    assert cache.get("c") == 3
+
+
+def new_movie(movie_id: str, title: str = "My movie") -> Movie:
+    return Movie(
+        movie_id=movie_id,
+        title=title,
+        description="My description",
+        release_year=1991,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_is_served_from_cache():
+    repo = CachedMovieRepository(MemoryMovieRepository())
+    await repo.create(new_movie("my-id"))
+    assert (await repo.get("my-id")).id == "my-id"
+    assert (await repo.get("my-id")).id == "my-id"
+    assert await repo.get("missing") is None
+    assert await repo.get("missing") is None
+    assert (repo.cache.hits, repo.cache.misses) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_create_invalidates_negative_entries():
+    repo = CachedMovieRepository(MemoryMovieRepository())
+    assert await repo.get("my-id") is None
+    assert await repo.get_by_title("My movie") == []
+    await repo.create(new_movie("my-id"))
+    assert (await repo.get("my-id")).id == "my-id"
+    assert [movie.id for movie in await repo.get_by_title("My movie")] == ["my-id"]
+
+
+@pytest.mark.asyncio
+async def test_update_title_invalidates_both_titles():
+    repo = CachedMovieRepository(MemoryMovieRepository())
+    await repo.create(new_movie("my-id"))
+    await repo.create(new_movie("other-id"))
+    assert len(await repo.get_by_title("My movie", offset=1)) == 1
+    assert await repo.get_by_title("New title") == []
+    await repo.get("my-id")
+
+    await repo.update("my-id", {"title": "New title"})
+
+    assert await repo.get_by_title("My movie", offset=1) == []
+    assert [movie.id for movie in await repo.get_by_title("New title")] == ["my-id"]
+    assert (await repo.get("my-id")).title == "New title"
+
+
+@pytest.mark.asyncio
+async def test_delete_of_uncached_movie_invalidates_title_pages():
+    repo = CachedMovieRepository(MemoryMovieRepository())
+    await repo.create(new_movie("a-id"))
+    await repo.create(new_movie("b-id"))
+    assert [movie.id for movie in await repo.get_by_title("My movie", offset=1)] == [
+        "b-id",
+    ]
+    await repo.delete("a-id")
+    assert await repo.get_by_title("My movie", offset=1) == []
+
+
+@pytest.mark.asyncio
+async def test_title_of_a_listed_movie_limits_invalidation():
+    repo = CachedMovieRepository(MemoryMovieRepository())
+    await repo.create(new_movie("my-id"))
+    await repo.create(new_movie("other-id", title="Other movie"))
+    assert len(await repo.get_documents_by_title("My movie", fields=[])) == 1
+    assert len(await repo.get_by_title("Other movie")) == 1
+
+    await repo.update("my-id", {"watched": True})
+    hits = repo.cache.hits
+
+    assert len(await repo.get_by_title("Other movie")) == 1
+    assert repo.cache.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_documents_are_invalidated_on_update():
+    repo = CachedMovieRepository(MemoryMovieRepository())
+    await repo.create(new_movie("my-id"))
+    assert await repo.get_document("my-id", fields=["watched"]) == {
+        "movie_id": "my-id",
+        "watched": False,
+    }
+    assert await repo.get_documents_by_title("My movie", fields=["watched"]) == [
+        {"movie_id": "my-id", "watched": False},
+    ]
+    await repo.update("my-id", {"watched": True})
+    assert (await repo.get_document("my-id", fields=["watched"]))["watched"] is True
+    assert await repo.get_documents_by_title("My movie", fields=["watched"]) == [
+        {"movie_id": "my-id", "watched": True},
+    ]
@@ -0,0 +1,51 @@
+import pytest
+
+from api.entities.movie import Movie
+from api.metrics import MetricsRegistry
+from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie.instrumented import InstrumentedMovieRepository
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+@pytest.mark.asyncio()
+async def test_instrumented_repository_times_operations():
+    registry = MetricsRegistry()
+    repo = InstrumentedMovieRepository(
+        MemoryMovieRepository(),
+        registry,
+        backend="memory",
+    )
+    await repo.create(
+        Movie(
+            movie_id="first",
+            title="My Movie",
+            description="My Movie description",
+            release_year=1990,
+        ),
+    )
+    assert await repo.get("first") is not None
+    assert await repo.get("missing") is None
+    assert [document async for document in repo.iter_documents()]
+
+    latency = registry.histogram("movie_repository_operation_duration_seconds", "")
+    assert latency.count(("memory", "create")) == 1
+    assert latency.count(("memory", "get")) == 2
+    assert latency.count(("memory", "iter_documents")) == 1
+
+
+@pytest.mark.asyncio()
+async def test_instrumented_repository_counts_errors():
+    registry = MetricsRegistry()
+    repo = InstrumentedMovieRepository(
+        MemoryMovieRepository(),
+        registry,
+        backend="memory",
+    )
+
+    with pytest.raises(RepositoryException):
+        await repo.update("missing", {"title": "My Movie"})
+
+    errors = registry.counter("movie_repository_operation_errors_total", "")
+    latency = registry.histogram("movie_repository_operation_duration_seconds", "")
+    assert errors.value(("memory", "update")) == 1
+    assert latency.count(("memory", "update")) == 1
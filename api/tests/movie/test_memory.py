@@ -1,8 +1,15 @@
+import asyncio
+import os
+
 import pytest
 
 from api.entities.movie import Movie
-from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie.abstractions import (
+    RepositoryException,
+    VersionConflictException,
+)
 from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.snapshot import write_snapshot
 
 
 @pytest.mark.asyncio
@@ -134,7 +141,7 @@ async def test_update():
 
 
 @pytest.mark.asyncio
-def test_update_fail():
+async def test_update_fail():
     repo = MemoryMovieRepository()
     await repo.create(
         Movie(
@@ -149,7 +156,7 @@ def test_update_fail():
 
 
 @pytest.mark.asyncio
-def test_delete():
+async def test_delete():
     repo = MemoryMovieRepository()
     await repo.create(
         Movie(
@@ -161,3 +168,507 @@ def test_delete():
     )
     await repo.delete("my-id-2")
     assert await repo.get("my-id-2") is None
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_pagination():
+    repo = MemoryMovieRepository()
+    for index in range(5):
+        await repo.create(
+            Movie(
+                movie_id=f"my-id-{index}",
+                title="My movie",
+                description="My description",
+                release_year=1991,
+            ),
+        )
+    movies = await repo.get_by_title(title="My movie", offset=1, limit=2)
+    assert [movie.id for movie in movies] == ["my-id-1", "my-id-2"]
+    movies = await repo.get_by_title(title="My movie", offset=3, limit=0)
+    assert [movie.id for movie in movies] == ["my-id-3", "my-id-4"]
+
+
+@pytest.mark.asyncio
+async def test_update_title_moves_title_index():
+    repo = MemoryMovieRepository()
+    await repo.create(
+        Movie(
+            movie_id="my-id-2",
+            title="My movie",
+            description="My description",
+            release_year=1991,
+        ),
+    )
+    await repo.update(movie_id="my-id-2", update_parameters={"title": "New title"})
+    assert await repo.get_by_title(title="My movie") == []
+    assert [movie.id for movie in await repo.get_by_title(title="New title")] == [
+        "my-id-2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_delete_removes_title_index():
+    repo = MemoryMovieRepository()
+    await repo.create(
+        Movie(
+            movie_id="my-id-2",
+            title="My movie",
+            description="My description",
+            release_year=1991,
+        ),
+    )
+    await repo.delete("my-id-2")
+    assert await repo.get_by_title(title="My movie") == []
+
+
+@pytest.mark.asyncio
+async def test_bulk_operations():
+    repo = MemoryMovieRepository()
+    movies = [
+        Movie(
+            movie_id=f"my-id-{index}",
+            title="My movie",
+            description="My description",
+            release_year=1991,
+        )
+        for index in range(3)
+    ]
+    results = await repo.create_many(movies)
+    assert [result.error for result in results] == [None, None, None]
+
+    results = await repo.update_many(
+        [
+            ("my-id-0", {"title": "Updated title"}),
+            ("my-id-1", {"id": "fail"}),
+            ("missing", {"watched": True}),
+        ],
+    )
+    assert [result.error is None for result in results] == [True, False, False]
+    assert [movie.id for movie in await repo.get_by_title("Updated title")] == [
+        "my-id-0",
+    ]
+
+    results = await repo.delete_many(["my-id-1", "missing"])
+    assert [result.error is None for result in results] == [True, False]
+    assert [movie.id for movie in await repo.get_by_title("My movie")] == ["my-id-2"]
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_after_movie_id():
+    repo = MemoryMovieRepository()
+    for index in (3, 1, 4, 0, 2):
+        await repo.create(
+            Movie(
+                movie_id=f"my-id-{index}",
+                title="My movie",
+                description="My description",
+                release_year=1991,
+            ),
+        )
+    movies = await repo.get_by_title(
+        title="My movie",
+        limit=2,
+        after_movie_id="my-id-1",
+    )
+    assert [movie.id for movie in movies] == ["my-id-2", "my-id-3"]
+
+
+@pytest.mark.asyncio
+async def test_iter_documents_by_title_through_movie_id():
+    repo = MemoryMovieRepository()
+    for index in range(5):
+        await repo.create(
+            Movie(
+                movie_id=f"my-id-{index}",
+                title="My movie",
+                description="My description",
+                release_year=1991,
+            ),
+        )
+    documents = repo.iter_documents_by_title(
+        title="My movie",
+        fields=[],
+        limit=0,
+        after_movie_id="my-id-1",
+        through_movie_id="my-id-3",
+    )
+    assert [document async for document in documents] == [
+        {"movie_id": "my-id-2"},
+        {"movie_id": "my-id-3"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_documents():
+    repo = MemoryMovieRepository()
+    await repo.create(
+        Movie(
+            movie_id="my-id",
+            title="My movie",
+            description="My description",
+            release_year=1991,
+        ),
+    )
+    assert await repo.get_document("my-id", fields=["release_year"]) == {
+        "movie_id": "my-id",
+        "release_year": 1991,
+    }
+    assert await repo.get_document("missing") is None
+    assert await repo.get_documents_by_title("My movie", fields=["title"]) == [
+        {"movie_id": "my-id", "title": "My movie"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_documents():
+    repo = MemoryMovieRepository()
+    for movie_id, title, description in (
+        ("first", "The Dark Knight", "A crime movie"),
+        ("second", "Batman Begins", "The dark origins"),
+        ("third", "Dark Water", "A horror movie"),
+        ("fourth", "Darkman", "A superhero movie"),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description=description,
+                release_year=2005,
+            ),
+        )
+    await repo.update("third", {"title": "Deep Water"})
+    await repo.delete("fourth")
+
+    text = await repo.search_documents("BATMAN dark", fields=["title"])
+    assert text == [
+        {"movie_id": "second", "title": "Batman Begins"},
+        {"movie_id": "first", "title": "The Dark Knight"},
+    ]
+    assert await repo.search_documents("dark", limit=1, fields=[]) == [
+        {"movie_id": "first"},
+    ]
+    prefix = await repo.search_documents("d", mode="prefix", fields=[])
+    assert prefix == [{"movie_id": "third"}]
+    assert await repo.search_documents("", mode="prefix") == []
+
+
+@pytest.mark.asyncio
+async def test_search_documents_ranks_by_every_word():
+    repo = MemoryMovieRepository()
+    for movie_id, title, description in (
+        ("a", "Space", "A long space trip to the moon"),
+        ("b", "Moon", "Space trip"),
+        ("c", "Trip", "Moon"),
+        ("d", "Other", "Nothing related"),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description=description,
+                release_year=2005,
+            ),
+        )
+
+    # Up to four words are ranked by weight combinations, more by scoring.
+    for query in ("space moon trip", "space moon trip to the long"):
+        documents = await repo.search_documents(query, fields=[])
+        assert documents == [{"movie_id": "a"}, {"movie_id": "b"}, {"movie_id": "c"}]
+        documents = await repo.search_documents(query, fields=[], limit=2)
+        assert documents == [{"movie_id": "a"}, {"movie_id": "b"}]
+
+
+@pytest.mark.asyncio
+async def test_filter_documents():
+    repo = MemoryMovieRepository()
+    for movie_id, release_year, watched in (
+        ("a", 1995, False),
+        ("b", 1990, True),
+        ("c", 2000, False),
+        ("d", 1995, True),
+        ("e", 2001, False),
+        ("f", 1989, False),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My movie",
+                description="My description",
+                release_year=release_year,
+                watched=watched,
+            ),
+        )
+    await repo.update("e", {"release_year": 1992})
+    await repo.update("d", {"watched": False})
+    await repo.delete("c")
+
+    async def filtered(**kwargs) -> list[str]:
+        documents = await repo.filter_documents(fields=[], **kwargs)
+        return [document["movie_id"] for document in documents]
+
+    assert await filtered() == ["f", "b", "e", "a", "d"]
+    assert await filtered(release_year_from=1990, release_year_to=2000) == [
+        "b",
+        "e",
+        "a",
+        "d",
+    ]
+    assert await filtered(watched=False, sort="-release_year") == [
+        "d",
+        "a",
+        "e",
+        "f",
+    ]
+    assert await filtered(watched=True) == ["b"]
+    assert await filtered(offset=2, limit=2) == ["e", "a"]
+    assert await filtered(sort="-release_year", offset=1, limit=2) == ["a", "e"]
+    assert await filtered(release_year_from=2000) == []
+
+
+@pytest.mark.asyncio
+async def test_stats():
+    repo = MemoryMovieRepository()
+    for movie_id, release_year, watched in (
+        ("a", 1995, False),
+        ("b", 1990, True),
+        ("c", 1995, True),
+        ("d", 2000, False),
+    ):
+        await repo.create(
+            Movie(
+                movie_id=movie_id,
+                title="My movie",
+                description="My description",
+                release_year=release_year,
+                watched=watched,
+            ),
+        )
+    await repo.update("a", {"watched": True})
+    await repo.delete("d")
+
+    assert await repo.stats() == {
+        "total": 3,
+        "watched": 3,
+        "unwatched": 0,
+        "watched_ratio": 1.0,
+        "by_release_year": {1990: 1, 1995: 2},
+    }
+
+
+@pytest.mark.asyncio
+async def test_versions():
+    repo = MemoryMovieRepository()
+    await repo.create(
+        Movie(
+            movie_id="my-id",
+            title="My movie",
+            description="My description",
+            release_year=1991,
+        ),
+    )
+    version = await repo.get_version("my-id")
+    document = await repo.get_document("my-id", fields=[], with_version=True)
+    assert document == {"movie_id": "my-id", "version": version}
+    assert await repo.get_title_versions("My movie") == [("my-id", version)]
+
+    await repo.update("my-id", {"watched": True})
+    assert await repo.get_version("my-id") == version + 1
+    await repo.delete("my-id")
+    assert await repo.get_version("my-id") is None
+
+
+@pytest.mark.asyncio
+async def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "movies.snapshot")
+    repo = MemoryMovieRepository()
+    await repo.create_many(
+        [
+            Movie(
+                movie_id=f"movie-{index}",
+                title="Première movie" if index % 2 else "Other movie",
+                description="My description",
+                release_year=1990 + index,
+                watched=index == 3,
+            )
+            for index in range(5)
+        ],
+    )
+    await repo.update("movie-1", {"description": "Updated description"})
+
+    await repo.save_snapshot(path)
+    loaded = MemoryMovieRepository()
+    loaded.load_snapshot(path)
+
+    for index in range(5):
+        movie_id = f"movie-{index}"
+        assert await loaded.get(movie_id) == await repo.get(movie_id)
+        assert await loaded.get_version(movie_id) == await repo.get_version(movie_id)
+    assert [movie.id for movie in await loaded.get_by_title("Première movie")] == [
+        "movie-1",
+        "movie-3",
+    ]
+    assert [
+        document["movie_id"]
+        for document in await loaded.search_documents("updated", fields=[])
+    ] == ["movie-1"]
+    assert [
+        document["movie_id"]
+        for document in await loaded.search_documents("prem", mode="prefix")
+    ] == ["movie-1", "movie-3"]
+    assert [
+        document["movie_id"]
+        for document in await loaded.filter_documents(
+            release_year_from=1992,
+            watched=False,
+            fields=[],
+        )
+    ] == ["movie-2", "movie-4"]
+    assert await loaded.stats() == await repo.stats()
+
+
+@pytest.mark.asyncio
+async def test_snapshots_are_written_one_at_a_time(tmp_path):
+    path = str(tmp_path / "movies.snapshot")
+    repo = MemoryMovieRepository()
+    await repo.create(
+        Movie(
+            movie_id="my-id",
+            title="My movie",
+            description="My description",
+            release_year=1991,
+        ),
+    )
+
+    cancelled = asyncio.create_task(repo.save_snapshot(path))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await repo.save_snapshot(path)
+
+    assert os.listdir(tmp_path) == ["movies.snapshot"]
+    loaded = MemoryMovieRepository()
+    loaded.load_snapshot(path)
+    assert await loaded.get("my-id") == await repo.get("my-id")
+
+
+def test_failed_snapshot_keeps_the_previous_one(tmp_path):
+    path = tmp_path / "movies.snapshot"
+    path.write_bytes(b"previous snapshot")
+
+    def failing_movies():
+        raise OSError("disk full")
+        yield
+
+    with pytest.raises(OSError):
+        write_snapshot(str(path), failing_movies(), 1)
+
+    assert os.listdir(tmp_path) == ["movies.snapshot"]
+    assert path.read_bytes() == b"previous snapshot"
+
+
+def test_load_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "movies.snapshot"
+    path.write_bytes(b"not a snapshot at all")
+
+    with pytest.raises(ValueError):
+        MemoryMovieRepository().load_snapshot(str(path))
+
+
+@pytest.mark.asyncio
+async def test_compact_storage():
+    repo = MemoryMovieRepository(compact=True)
+    movie = Movie(
+        movie_id="test",
+        title="My movie",
+        description="My description",
+        release_year=1991,
+    )
+    await repo.create(movie)
+    await repo.update("test", {"watched": True})
+
+    stored_movie = await repo.get("test")
+    stored_movie.title = "Changed by the caller"
+
+    assert isinstance(stored_movie, Movie)
+    assert await repo.get("test") == movie.copy(update={"watched": True})
+    assert await repo.get_by_title("My movie") == [
+        movie.copy(update={"watched": True}),
+    ]
+    assert await repo.get_document("test", fields=["watched"]) == {
+        "movie_id": "test",
+        "watched": True,
+    }
+    assert [document async for document in repo.iter_documents()] == [
+        movie.dict() | {"watched": True},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_update_changes_nothing():
+    repo = MemoryMovieRepository()
+    movie = Movie(
+        movie_id="my-id",
+        title="My movie",
+        description="My description",
+        release_year=1991,
+    )
+    await repo.create(movie)
+    version = await repo.get_version("my-id")
+
+    with pytest.raises(RepositoryException):
+        await repo.update("my-id", {"title": "New title", "id": "fail"})
+    with pytest.raises(RepositoryException):
+        await repo.update("my-id", {"title": "New title", "release_year": 1800})
+    await repo.update("my-id", {"watched": False})
+
+    assert await repo.get("my-id") == movie
+    assert await repo.get_version("my-id") == version
+    assert [movie.id for movie in await repo.get_by_title("My movie")] == ["my-id"]
+    assert await repo.get_by_title("New title") == []
+
+
+@pytest.mark.asyncio
+async def test_update_replaces_the_stored_movie():
+    repo = MemoryMovieRepository()
+    movie = Movie(
+        movie_id="my-id",
+        title="My movie",
+        description="My description",
+        release_year=1991,
+    )
+    await repo.create(movie)
+
+    await repo.update("my-id", {"title": "New title"})
+
+    assert movie.title == "My movie"
+    assert (await repo.get("my-id")).title == "New title"
+
+
+@pytest.mark.asyncio
+async def test_update_if_version():
+    repo = MemoryMovieRepository()
+    await repo.create(
+        Movie(
+            movie_id="my-id",
+            title="My movie",
+            description="My description",
+            release_year=1991,
+        ),
+    )
+    version = await repo.get_version("my-id")
+
+    new_version = await repo.update_if_version("my-id", version, {"watched": True})
+    unchanged_version = await repo.update_if_version(
+        "my-id",
+        new_version,
+        {"watched": True},
+    )
+    with pytest.raises(VersionConflictException):
+        await repo.update_if_version("my-id", version, {"title": "Other movie"})
+    with pytest.raises(RepositoryException):
+        await repo.update_if_version("missing", version, {"watched": True})
+
+    assert new_version == version + 1
+    assert unchanged_version == new_version
+    movie = await repo.get("my-id")
+    assert (movie.title, movie.watched) == ("My movie", True)
+    assert (await repo.stats())["watched"] == 1
@@ -1,7 +1,11 @@
 import pytest
 
 from api.entities.movie import Movie
-from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie.abstractions import (
+    RepositoryException,
+    VersionConflictException,
+)
+from api.repository.movie.memory import MemoryMovieRepository
 
 # noinspection PyUnresolvedReferences
 from api.tests.fixture import mongo_movie_repo_fixture
@@ -170,3 +174,398 @@ async def test_delete(mongo_movie_repo_fixture):
     await mongo_movie_repo_fixture.create(initial_movie)
     await mongo_movie_repo_fixture.delete(movie_id="first one")
     assert await mongo_movie_repo_fixture.get(movie_id="first one") is None
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes(mongo_movie_repo_fixture):
+    assert await mongo_movie_repo_fixture.missing_indexes() != []
+    await mongo_movie_repo_fixture.ensure_indexes()
+    # Provisioning is idempotent.
+    await mongo_movie_repo_fixture.ensure_indexes()
+    assert await mongo_movie_repo_fixture.missing_indexes() == []
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_counts_stored_movies(mongo_movie_repo_fixture):
+    # Setup
+    movie = Movie(
+        movie_id="first",
+        title="My movie",
+        description="My movie descriptions",
+        release_year=1991,
+    )
+    # Stored without the statistics, as before they were counted.
+    await mongo_movie_repo_fixture._movies.insert_one(movie.dict())
+
+    # Test
+    await mongo_movie_repo_fixture.ensure_indexes()
+
+    # Assertion
+    assert (await mongo_movie_repo_fixture.stats())["by_release_year"] == {1991: 1}
+
+
+@pytest.mark.asyncio
+async def test_bulk_operations(mongo_movie_repo_fixture):
+    movies = [
+        Movie(
+            movie_id=f"movie-{index}",
+            title="My movie",
+            description="My movie descriptions",
+            release_year=1991,
+        )
+        for index in range(3)
+    ]
+    results = await mongo_movie_repo_fixture.create_many(movies)
+    assert [result.error for result in results] == [None, None, None]
+
+    results = await mongo_movie_repo_fixture.update_many(
+        [
+            ("movie-0", {"title": "Update title"}),
+            ("movie-1", {"id": "Not allowed"}),
+            ("missing", {"watched": True}),
+            ("movie-2", {"watched": False}),
+        ],
+    )
+    assert [result.error for result in results] == [
+        None,
+        "can't update movie id.",
+        "movie: missing not found",
+        "movie: movie-2 not updated",
+    ]
+    movie = await mongo_movie_repo_fixture.get(movie_id="movie-0")
+    assert movie.title == "Update title"
+
+    results = await mongo_movie_repo_fixture.delete_many(["movie-1", "missing"])
+    assert [result.error is None for result in results] == [True, False]
+    assert await mongo_movie_repo_fixture.get(movie_id="movie-1") is None
+
+
+@pytest.mark.asyncio
+async def test_iter_documents(mongo_movie_repo_fixture):
+    movie = Movie(
+        movie_id="first",
+        title="My movie",
+        description="My movie descriptions",
+        release_year=1991,
+    )
+    await mongo_movie_repo_fixture.create(movie)
+    documents = [
+        document
+        async for document in mongo_movie_repo_fixture.iter_documents(batch_size=1)
+    ]
+    assert documents == [movie.dict()]
+
+
+@pytest.mark.asyncio
+async def test_get_by_title_after_movie_id(mongo_movie_repo_fixture):
+    for index in (3, 1, 4, 0, 2):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=f"movie-{index}",
+                title="My movie",
+                description="My movie descriptions",
+                release_year=1991,
+            ),
+        )
+    movies = await mongo_movie_repo_fixture.get_by_title(
+        title="My movie",
+        limit=2,
+        after_movie_id="movie-1",
+    )
+    assert [movie.id for movie in movies] == ["movie-2", "movie-3"]
+    documents = mongo_movie_repo_fixture.iter_documents_by_title(
+        title="My movie",
+        fields=[],
+        limit=0,
+        after_movie_id="movie-1",
+        through_movie_id="movie-3",
+    )
+    assert [document async for document in documents] == [
+        {"movie_id": "movie-2"},
+        {"movie_id": "movie-3"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_documents(mongo_movie_repo_fixture):
+    movie = Movie(
+        movie_id="first",
+        title="My movie",
+        description="My movie descriptions",
+        release_year=1991,
+    )
+    await mongo_movie_repo_fixture.create(movie)
+    assert await mongo_movie_repo_fixture.get_document("first") == movie.dict()
+    assert await mongo_movie_repo_fixture.get_documents_by_title(
+        "My movie",
+        fields=["title"],
+    ) == [{"movie_id": "first", "title": "My movie"}]
+
+
+@pytest.mark.asyncio
+async def test_search_documents(mongo_movie_repo_fixture):
+    await mongo_movie_repo_fixture.ensure_indexes()
+    for movie_id, title, description in (
+        ("first", "The Dark Knight", "A crime movie"),
+        ("second", "Batman Begins", "The dark origins"),
+        ("third", "Deep Water", "A horror movie"),
+    ):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title=title,
+                description=description,
+                release_year=2005,
+            ),
+        )
+
+    text = await mongo_movie_repo_fixture.search_documents(
+        "BATMAN dark",
+        fields=["title"],
+    )
+    assert text == [
+        {"movie_id": "second", "title": "Batman Begins"},
+        {"movie_id": "first", "title": "The Dark Knight"},
+    ]
+    prefix = await mongo_movie_repo_fixture.search_documents(
+        "batman b",
+        mode="prefix",
+        fields=[],
+    )
+    assert prefix == [{"movie_id": "second"}]
+
+
+@pytest.mark.asyncio
+async def test_filter_documents(mongo_movie_repo_fixture):
+    for movie_id, release_year, watched in (
+        ("a", 1995, False),
+        ("b", 1990, True),
+        ("c", 2000, False),
+        ("d", 1995, True),
+    ):
+        await mongo_movie_repo_fixture.create(
+            Movie(
+                movie_id=movie_id,
+                title="My movie",
+                description="My description",
+                release_year=release_year,
+                watched=watched,
+            ),
+        )
+
+    documents = await mongo_movie_repo_fixture.filter_documents(
+        release_year_from=1991,
+        watched=False,
+        sort="-release_year",
+        fields=["release_year"],
+    )
+    assert documents == [
+        {"movie_id": "c", "release_year": 2000},
+        {"movie_id": "a", "release_year": 1995},
+    ]
+    documents = await mongo_movie_repo_fixture.filter_documents(
+        release_year_to=1995,
+        fields=[],
+        offset=1,
+    )
+    assert documents == [{"movie_id": "a"}, {"movie_id": "d"}]
+
+
+@pytest.mark.asyncio
+async def test_stats(mongo_movie_repo_fixture):
+    movies = [
+        Movie(
+            movie_id=movie_id,
+            title="My movie",
+            description="My movie descriptions",
+            release_year=release_year,
+            watched=watched,
+        )
+        for movie_id, release_year, watched in (
+            ("a", 1995, False),
+            ("b", 1990, True),
+            ("c", 1995, True),
+            ("d", 2000, False),
+        )
+    ]
+    await mongo_movie_repo_fixture.create(movies[0])
+    await mongo_movie_repo_fixture.create_many(movies[1:])
+    await mongo_movie_repo_fixture.update("a", {"watched": True})
+    await mongo_movie_repo_fixture.update_many(
+        [
+            ("b", {"release_year": 1995}),
+            ("b", {"watched": False}),
+            ("b", {"watched": True}),
+        ],
+    )
+    await mongo_movie_repo_fixture.delete("d")
+    deleted = await mongo_movie_repo_fixture.delete_many(["c", "missing", "c"])
+    expected_stats = {
+        "total": 2,
+        "watched": 2,
+        "unwatched": 0,
+        "watched_ratio": 1.0,
+        "by_release_year": {1995: 2},
+    }
+
+    assert [result.error is None for result in deleted] == [True, False, False]
+    assert await mongo_movie_repo_fixture.stats() == expected_stats
+    await mongo_movie_repo_fixture.rebuild_stats()
+    assert await mongo_movie_repo_fixture.stats() == expected_stats
+
+
+@pytest.mark.asyncio
+async def test_create_many_duplicates_like_memory(mongo_movie_repo_fixture):
+    # Setup
+    movies = [
+        Movie(
+            movie_id=movie_id,
+            title="My movie",
+            description="My movie descriptions",
+            release_year=1991,
+        )
+        for movie_id in ("a", "b", "a")
+    ]
+    memory_repo = MemoryMovieRepository()
+    await memory_repo.create(movies[1])
+    await mongo_movie_repo_fixture.ensure_indexes()
+    await mongo_movie_repo_fixture.create(movies[1])
+
+    # Test
+    memory_results = await memory_repo.create_many(movies)
+    mongo_results = await mongo_movie_repo_fixture.create_many(movies)
+
+    # Assertion
+    assert [result.error is None for result in memory_results] == [
+        True,
+        False,
+        False,
+    ]
+    assert [result.error is None for result in mongo_results] == [
+        result.error is None for result in memory_results
+    ]
+    assert await memory_repo.stats() == await mongo_movie_repo_fixture.stats()
+
+
+@pytest.mark.asyncio
+async def test_bulk_writes_of_movies_changed_meanwhile(
+    mongo_movie_repo_fixture,
+    monkeypatch,
+):
+    # Setup
+    repo = mongo_movie_repo_fixture
+    await repo.create_many(
+        [
+            Movie(
+                movie_id=movie_id,
+                title="My movie",
+                description="My movie descriptions",
+                release_year=1995,
+            )
+            for movie_id in ("a", "b", "c")
+        ],
+    )
+    existing_ids = repo._existing_ids
+
+    def update_after_read(watched: bool):
+        async def existing_ids_then_update(movie_ids, fields=()):
+            documents = await existing_ids(movie_ids, fields)
+            # Another writer moves "a" to another counter after the read.
+            monkeypatch.setattr(repo, "_existing_ids", existing_ids)
+            await repo.update("a", {"watched": watched})
+            return documents
+
+        monkeypatch.setattr(repo, "_existing_ids", existing_ids_then_update)
+
+    # Test
+    update_after_read(watched=True)
+    updated = await repo.update_many(
+        [("a", {"release_year": 2000}), ("b", {"release_year": 2000})],
+    )
+    update_after_read(watched=False)
+    deleted = await repo.delete_many(["a", "c"])
+
+    # Assertion
+    assert [result.error for result in updated] == [None, None]
+    assert [result.error for result in deleted] == [None, None]
+    assert await repo.stats() == {
+        "total": 1,
+        "watched": 0,
+        "unwatched": 1,
+        "watched_ratio": 0.0,
+        "by_release_year": {2000: 1},
+    }
+    await repo.rebuild_stats()
+    assert (await repo.stats())["by_release_year"] == {2000: 1}
+
+
+@pytest.mark.asyncio
+async def test_versions(mongo_movie_repo_fixture):
+    movie = Movie(
+        movie_id="first",
+        title="My movie",
+        description="My movie descriptions",
+        release_year=1991,
+    )
+    await mongo_movie_repo_fixture.create(movie)
+    version = await mongo_movie_repo_fixture.get_version("first")
+    assert await mongo_movie_repo_fixture.get_document("first") == movie.dict()
+    assert await mongo_movie_repo_fixture.get_document(
+        "first",
+        fields=[],
+        with_version=True,
+    ) == {"movie_id": "first", "version": version}
+    assert await mongo_movie_repo_fixture.get_title_versions("My movie") == [
+        ("first", version),
+    ]
+
+    await mongo_movie_repo_fixture.update("first", {"watched": True})
+    assert await mongo_movie_repo_fixture.get_version("first") == version + 1
+    # An update which changes nothing keeps the version.
+    with pytest.raises(RepositoryException):
+        await mongo_movie_repo_fixture.update("first", {"watched": True})
+    assert await mongo_movie_repo_fixture.get_version("first") == version + 1
+    assert await mongo_movie_repo_fixture.get_version("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_update_if_version(mongo_movie_repo_fixture):
+    await mongo_movie_repo_fixture.create(
+        Movie(
+            movie_id="first",
+            title="My movie",
+            description="My movie descriptions",
+            release_year=1991,
+        ),
+    )
+    version = await mongo_movie_repo_fixture.get_version("first")
+
+    new_version = await mongo_movie_repo_fixture.update_if_version(
+        "first",
+        version,
+        {"watched": True},
+    )
+    unchanged_version = await mongo_movie_repo_fixture.update_if_version(
+        "first",
+        new_version,
+        {"watched": True},
+    )
+    with pytest.raises(VersionConflictException):
+        await mongo_movie_repo_fixture.update_if_version(
+            "first",
+            version,
+            {"title": "Other movie"},
+        )
+    with pytest.raises(RepositoryException):
+        await mongo_movie_repo_fixture.update_if_version(
+            "missing",
+            version,
+            {"watched": True},
+        )
+
+    assert new_version == version + 1
+    assert unchanged_version == new_version
+    assert await mongo_movie_repo_fixture.get_version("first") == new_version
+    movie = await mongo_movie_repo_fixture.get("first")
+    assert (movie.title, movie.watched) == ("My movie", True)
+    assert (await mongo_movie_repo_fixture.stats())["watched"] == 1
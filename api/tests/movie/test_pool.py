@@ -0,0 +1,29 @@
+from api.repository.movie.pool import PoolMetrics
+
+
+def test_pool_metrics():
+    metrics = PoolMetrics(max_pool_size=4)
+    metrics.connection_created(None)
+    metrics.connection_created(None)
+    metrics.connection_check_out_started(None)
+    metrics.connection_checked_out(None)
+    metrics.connection_check_out_started(None)
+    metrics.connection_check_out_started(None)
+    metrics.connection_check_out_failed(None)
+    metrics.connection_checked_in(None)
+    metrics.connection_check_out_started(None)
+    metrics.connection_checked_out(None)
+    metrics.connection_closed(None)
+
+    assert metrics.stats() == {
+        "max_pool_size": 4,
+        "open": 1,
+        "in_use": 1,
+        "waiting": 1,
+        "utilization": 0.25,
+        "created": 2,
+        "closed": 1,
+        "checkouts": 2,
+        "checkout_failures": 1,
+        "clears": 0,
+    }
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from api.entities.movie import Movie
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.single_flight import SingleFlightMovieRepository
+
+
+class GatedMovieRepository(MemoryMovieRepository):
+    """Memory repository whose reads wait until the gate is opened."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = asyncio.Event()
+        self.reads = 0
+
+    async def get_document(
+        self,
+        movie_id: str,
+        fields=None,
+        with_version: bool = False,
+    ) -> dict | None:
+        self.reads += 1
+        await self.gate.wait()
+        return await super().get_document(
+            movie_id,
+            fields=fields,
+            with_version=with_version,
+        )
+
+
+def build_movie(title: str = "My movie") -> Movie:
+    return Movie(
+        movie_id="first",
+        title=title,
+        description="My description",
+        release_year=1990,
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_are_collapsed():
+    backend = GatedMovieRepository()
+    await backend.create(build_movie())
+    repo = SingleFlightMovieRepository(backend)
+
+    reads = [asyncio.ensure_future(repo.get_document("first")) for _ in range(5)]
+    other = asyncio.ensure_future(repo.get_document("first", fields=["title"]))
+    await asyncio.sleep(0)
+    backend.gate.set()
+    documents = await asyncio.gather(*reads)
+
+    assert backend.reads == 2
+    assert all(document["title"] == "My movie" for document in documents)
+    assert (await other) == {"movie_id": "first", "title": "My movie"}
+    assert repo.collapsed_calls("get_document") == 4
+    # Completed reads are not reused.
+    await repo.get_document("first")
+    assert backend.reads == 3
+
+
+@pytest.mark.asyncio
+async def test_reads_after_write_are_not_collapsed():
+    backend = GatedMovieRepository()
+    await backend.create(build_movie())
+    repo = SingleFlightMovieRepository(backend)
+
+    before_write = asyncio.ensure_future(repo.get_document("first"))
+    await asyncio.sleep(0)
+    await repo.update("first", {"title": "My new movie"})
+    after_write = asyncio.ensure_future(repo.get_document("first"))
+    await asyncio.sleep(0)
+    backend.gate.set()
+
+    await before_write
+    assert (await after_write)["title"] == "My new movie"
+    assert backend.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_read():
+    backend = GatedMovieRepository()
+    await backend.create(build_movie())
+    repo = SingleFlightMovieRepository(backend)
+
+    first = asyncio.ensure_future(repo.get_document("first"))
+    second = asyncio.ensure_future(repo.get_document("first"))
+    await asyncio.sleep(0)
+    first.cancel()
+    backend.gate.set()
+
+    assert (await second)["movie_id"] == "first"
+    assert first.cancelled()
@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie.sqlite import SqliteMovieRepository
+
+
+def build_movie(movie_id: str, title: str = "My movie") -> Movie:
+    return Movie(
+        movie_id=movie_id,
+        title=title,
+        description="My description",
+        release_year=1991,
+    )
+
+
+@pytest.mark.asyncio
+async def test_writes_survive_reopening(tmp_path):
+    path = str(tmp_path / "movies.db")
+    repo = SqliteMovieRepository(path)
+    await repo.create(build_movie("first"))
+    await repo.create_many([build_movie("second"), build_movie("third")])
+    await repo.update("first", {"title": "Other movie", "watched": True})
+    await repo.update_many([("second", {"release_year": 2000})])
+    await repo.delete("third")
+    versions = [await repo.get_version(movie_id) for movie_id in ("first", "second")]
+    await repo.close()
+
+    reopened = SqliteMovieRepository(path)
+
+    assert await reopened.get("first") == Movie(
+        movie_id="first",
+        title="Other movie",
+        description="My description",
+        release_year=1991,
+        watched=True,
+    )
+    assert (await reopened.get("second")).release_year == 2000
+    assert await reopened.get("third") is None
+    assert [
+        await reopened.get_version(movie_id) for movie_id in ("first", "second")
+    ] == versions
+    assert [movie.id for movie in await reopened.get_by_title("Other movie")] == [
+        "first",
+    ]
+    assert (await reopened.stats())["total"] == 2
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_deletes_survive_reopening(tmp_path):
+    path = str(tmp_path / "movies.db")
+    repo = SqliteMovieRepository(path)
+    await repo.create(build_movie("first"))
+
+    with pytest.raises(RepositoryException):
+        await repo.update("missing", {"title": "Other movie"})
+    await repo.delete_many(["first", "missing"])
+    await repo.close()
+
+    reopened = SqliteMovieRepository(path)
+    assert await reopened.get("first") is None
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_rolls_back_memory(tmp_path, monkeypatch):
+    repo = SqliteMovieRepository(str(tmp_path / "movies.db"))
+    await repo.create(build_movie("first"))
+    version = await repo.get_version("first")
+
+    def failing_commit(upserts, deletes):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(repo, "_commit", failing_commit)
+    with pytest.raises(sqlite3.OperationalError):
+        await repo.update("first", {"title": "Other movie"})
+    with pytest.raises(sqlite3.OperationalError):
+        await repo.create(build_movie("second"))
+    with pytest.raises(sqlite3.OperationalError):
+        await repo.delete("first")
+
+    assert await repo.get("first") == build_movie("first")
+    assert await repo.get_version("first") == version
+    assert await repo.get_by_title("Other movie") == []
+    assert await repo.get("second") is None
+    assert (await repo.stats())["total"] == 1
+    await repo.close()
+
+
+def test_unknown_synchronous_level(tmp_path):
+    with pytest.raises(ValueError):
+        SqliteMovieRepository(str(tmp_path / "movies.db"), synchronous="SOMETIMES")
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from api.entities.movie import Movie
+from api.repository.movie.abstractions import RepositoryException
+from api.repository.movie.cache import CachedMovieRepository
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.write_behind import WriteBehindMovieRepository
+
+
+class RecordingMovieRepository(MemoryMovieRepository):
+    """Memory repository recording the batch calls it receives."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    async def create_many(self, movies):
+        self.calls.append(("create_many", [movie.id for movie in movies]))
+        return await super().create_many(movies)
+
+    async def update_many(self, updates):
+        self.calls.append(("update_many", [movie_id for movie_id, _ in updates]))
+        return await super().update_many(updates)
+
+
+def build_movie(movie_id: str) -> Movie:
+    return Movie(
+        movie_id=movie_id,
+        title="My movie",
+        description="My description",
+        release_year=1990,
+    )
+
+
+@pytest.mark.asyncio
+async def test_writes_are_batched_in_order():
+    backend = RecordingMovieRepository()
+    repo = WriteBehindMovieRepository(backend, flush_interval_seconds=0.05)
+
+    await asyncio.gather(
+        repo.create(build_movie("first")),
+        repo.create(build_movie("second")),
+        repo.update("first", {"watched": True}),
+        repo.create(build_movie("third")),
+    )
+
+    assert backend.calls == [
+        ("create_many", ["first", "second"]),
+        ("update_many", ["first"]),
+        ("create_many", ["third"]),
+    ]
+    assert (await backend.get("first")).watched is True
+    assert repo.pending_writes() == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_size_triggers_flush():
+    backend = RecordingMovieRepository()
+    repo = WriteBehindMovieRepository(backend, max_batch=2, flush_interval_seconds=10)
+
+    await asyncio.gather(
+        repo.create(build_movie("first")),
+        repo.create(build_movie("second")),
+    )
+
+    assert backend.calls == [("create_many", ["first", "second"])]
+
+
+@pytest.mark.asyncio
+async def test_queued_writes_join_a_due_batch():
+    backend = RecordingMovieRepository()
+    repo = WriteBehindMovieRepository(backend, flush_interval_seconds=0)
+
+    await asyncio.gather(
+        repo.create(build_movie("first")),
+        repo.create(build_movie("second")),
+        repo.create(build_movie("third")),
+    )
+
+    assert backend.calls == [("create_many", ["first", "second", "third"])]
+
+
+@pytest.mark.asyncio
+async def test_flushed_write_raises_its_error():
+    repo = WriteBehindMovieRepository(MemoryMovieRepository())
+
+    with pytest.raises(RepositoryException):
+        await repo.update("missing", {"watched": True})
+
+
+@pytest.mark.asyncio
+async def test_queued_writes_are_read_back_and_drained():
+    backend = RecordingMovieRepository()
+    repo = WriteBehindMovieRepository(
+        backend,
+        flush_interval_seconds=10,
+        durability="queued",
+    )
+
+    await repo.create(build_movie("first"))
+    await repo.update("first", {"watched": True})
+    await repo.create(build_movie("second"))
+
+    assert backend.calls == []
+    assert (await repo.get("first")).watched is True
+    assert await repo.get_version("first") is not None
+    await repo.close()
+    assert backend.calls == [
+        ("create_many", ["first"]),
+        ("update_many", ["first"]),
+        ("create_many", ["second"]),
+    ]
+    with pytest.raises(RepositoryException):
+        await repo.create(build_movie("third"))
+
+
+@pytest.mark.asyncio
+async def test_cached_pages_hold_queued_writes():
+    repo = CachedMovieRepository(
+        WriteBehindMovieRepository(
+            MemoryMovieRepository(),
+            flush_interval_seconds=10,
+            durability="queued",
+        ),
+    )
+    await repo.create(build_movie("first"))
+    assert [movie.id for movie in await repo.get_by_title("My movie")] == ["first"]
+
+    await repo.create(build_movie("second"))
+    await repo.update("first", {"watched": True})
+
+    assert [movie.id for movie in await repo.get_by_title("My movie")] == [
+        "first",
+        "second",
+    ]
+    assert [
+        document["movie_id"] for document in await repo.filter_documents(watched=True)
+    ] == ["first"]
+    assert (await repo.stats())["total"] == 2
+    await repo.close()
+
+
+def test_unknown_durability():
+    with pytest.raises(ValueError):
+        WriteBehindMovieRepository(MemoryMovieRepository(), durability="eventually")
@@ -0,0 +1,96 @@
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+from starlette import status
+from starlette.testclient import TestClient
+
+from api.api import create_app, provision_indexes, register_repository_metrics
+from api.handlers.movie import settings_instance
+from api.metrics import MetricsRegistry
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.mongo import MongoMovieRepository
+from api.repository.movie.pool import PoolMetrics
+from api.settings import Settings
+
+
+@pytest.fixture()
+def snapshot_settings(monkeypatch, tmp_path):
+    snapshot_path = str(tmp_path / "movies.snapshot")
+    monkeypatch.setenv("MOVIE_REPOSITORY_BACKEND", "memory")
+    monkeypatch.setenv("MEMORY_SNAPSHOT_PATH", snapshot_path)
+    monkeypatch.setenv("WRITE_BEHIND_ENABLED", "true")
+    monkeypatch.setenv("WRITE_BEHIND_DURABILITY", "queued")
+    monkeypatch.setenv("WRITE_BEHIND_FLUSH_INTERVAL_SECONDS", "60")
+    settings_instance.cache_clear()
+    yield snapshot_path
+    settings_instance.cache_clear()
+
+
+def test_shutdown_snapshot_holds_queued_writes(snapshot_settings):
+    # Test
+    with TestClient(app=create_app()) as client:
+        result = client.post(
+            "/api/v1/movies",
+            json={
+                "movie_id": "ignored",
+                "title": "My Movie",
+                "description": "My description",
+                "release_year": 2000,
+            },
+        )
+        assert result.status_code == status.HTTP_201_CREATED
+        movie_id = result.json()
+
+    # Assertion
+    repo = MemoryMovieRepository()
+    repo.load_snapshot(snapshot_settings)
+    assert repo._storage[movie_id].title == "My Movie"
+
+
+class UnreachableMovieRepository(MemoryMovieRepository):
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+
+    async def ensure_indexes(self):
+        self.attempts += 1
+        raise ServerSelectionTimeoutError("mongo unreachable")
+
+    async def missing_indexes(self) -> list[str]:
+        self.attempts += 1
+        raise ServerSelectionTimeoutError("mongo unreachable")
+
+
+@pytest.mark.asyncio
+async def test_provision_indexes_of_unreachable_mongo():
+    repo = UnreachableMovieRepository()
+
+    await provision_indexes(repo, Settings())
+    # The indexes are not checked once creating them failed.
+    assert repo.attempts == 1
+    with pytest.raises(ServerSelectionTimeoutError):
+        await provision_indexes(repo, Settings(mongo_require_indexes=True))
+    assert repo.attempts == 2
+    await provision_indexes(repo, Settings(mongo_ensure_indexes=False))
+    assert repo.attempts == 3
+
+
+def test_mongo_pool_metrics_only_for_mongo():
+    pool_metrics = PoolMetrics(max_pool_size=10)
+    memory_repo = MemoryMovieRepository()
+    mongo_repo = MongoMovieRepository(
+        connection_string="mongodb://localhost:27017",
+        database="movies",
+    )
+    memory_registry = MetricsRegistry()
+    mongo_registry = MetricsRegistry()
+
+    register_repository_metrics(
+        memory_registry,
+        memory_repo,
+        memory_repo,
+        pool_metrics,
+    )
+    register_repository_metrics(mongo_registry, mongo_repo, mongo_repo, pool_metrics)
+
+    assert "mongo_pool" not in memory_registry.render()
+    assert "mongo_pool" in mongo_registry.render()
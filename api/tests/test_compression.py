@@ -0,0 +1,123 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from api.compression import CompressionMiddleware, accepted_encodings
+
+BODY = "movie " * 1000
+
+
+async def large(request):
+    return PlainTextResponse(BODY, headers={"ETag": '"1"'})
+
+
+async def small(request):
+    return PlainTextResponse("movie")
+
+
+async def streamed(request):
+    async def chunks():
+        for _ in range(10):
+            yield BODY
+
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+async def not_modified(request):
+    return Response(status_code=304, headers={"ETag": '"1"'})
+
+
+def build_client() -> TestClient:
+    app = Starlette(
+        routes=[
+            Route("/large", large),
+            Route("/small", small),
+            Route("/streamed", streamed),
+            Route("/not-modified", not_modified),
+        ],
+    )
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip;q=0.5, br, identity;q=0, x;q=bad") == {
+        "gzip": 0.5,
+        "br": 1.0,
+        "identity": 0.0,
+        "x": 0.0,
+    }
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "content_encoding"),
+    [
+        ("gzip", "gzip"),
+        ("gzip, br", "br"),
+        ("gzip;q=1, br;q=0.1", "gzip"),
+        ("gzip;q=0.5, *;q=0.8", "br"),
+        ("br;q=0, *", "gzip"),
+        ("identity", None),
+    ],
+)
+def test_negotiated_encoding(accept_encoding, content_encoding):
+    client = build_client()
+
+    result = client.get("/large", headers={"Accept-Encoding": accept_encoding})
+
+    assert result.headers.get("Content-Encoding") == content_encoding
+    assert result.text == BODY
+    if content_encoding is not None:
+        assert result.headers["Vary"] == "Accept-Encoding"
+        assert result.headers["ETag"] == 'W/"1"'
+        assert int(result.headers["Content-Length"]) < len(BODY)
+
+
+def test_gzip_body():
+    client = build_client()
+
+    with client.stream("GET", "/large", headers={"Accept-Encoding": "gzip"}) as result:
+        body = b"".join(result.iter_raw())
+
+    assert gzip.decompress(body).decode() == BODY
+
+
+def test_small_and_not_modified_responses_are_not_compressed():
+    client = build_client()
+
+    small_result = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    not_modified_result = client.get(
+        "/not-modified",
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert "Content-Encoding" not in small_result.headers
+    assert small_result.text == "movie"
+    assert "Content-Encoding" not in not_modified_result.headers
+    # The ETag of the compressed representation it stands for.
+    assert not_modified_result.headers["ETag"] == 'W/"1"'
+    assert not_modified_result.headers["Vary"] == "Accept-Encoding"
+    identity_result = client.get(
+        "/not-modified",
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert identity_result.headers["ETag"] == '"1"'
+
+
+def test_streamed_response():
+    client = build_client()
+
+    with client.stream(
+        "GET",
+        "/streamed",
+        headers={"Accept-Encoding": "gzip"},
+    ) as result:
+        body = b"".join(result.iter_raw())
+
+    assert result.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in result.headers
+    assert gzip.decompress(body).decode() == BODY * 10
@@ -0,0 +1,56 @@
+from api.metrics import MetricsRegistry
+
+
+def test_counter_render():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", ("method",))
+    counter.inc(("GET",))
+    counter.inc(("GET",))
+    counter.inc(("POST",), amount=3)
+
+    assert registry.counter("requests_total", "Requests.") is counter
+    assert registry.render() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{method="GET"} 2\n'
+        'requests_total{method="POST"} 3\n'
+    )
+
+
+def test_gauge_inc_dec():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("in_flight", "In flight.")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    assert gauge.value() == 1
+    assert "in_flight 1\n" in registry.render()
+
+
+def test_histogram_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ("route",))
+    histogram.observe(0.0005, ("/",))
+    histogram.observe(0.003, ("/",))
+    histogram.observe(60, ("/",))
+
+    rendered = registry.render()
+    assert histogram.count(("/",)) == 3
+    assert 'latency_seconds_bucket{route="/",le="0.001"} 1\n' in rendered
+    assert 'latency_seconds_bucket{route="/",le="0.005"} 2\n' in rendered
+    assert 'latency_seconds_bucket{route="/",le="5"} 2\n' in rendered
+    assert 'latency_seconds_bucket{route="/",le="+Inf"} 3\n' in rendered
+    assert 'latency_seconds_count{route="/"} 3\n' in rendered
+
+
+def test_callback_gauge_and_label_escaping():
+    registry = MetricsRegistry()
+    registry.callback_gauge(
+        "cache",
+        "Cache statistics.",
+        lambda: {('say "hi"',): 1.5},
+        ("stat",),
+    )
+
+    assert 'cache{stat="say \\"hi\\""} 1.5\n' in registry.render()
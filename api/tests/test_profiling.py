@@ -0,0 +1,34 @@
+import pstats
+
+from api.profiling import ProfileRecord, ProfileStore, profile_data, profile_text
+
+
+def build_record(profile_id: str) -> ProfileRecord:
+    return ProfileRecord(
+        profile_id=profile_id,
+        method="GET",
+        path="/api/v1/movies/",
+        status_code=200,
+        duration_seconds=0.1,
+        stats={},
+    )
+
+
+def test_profile_store_keeps_latest_entries():
+    store = ProfileStore(max_entries=2)
+    store.add(build_record("first"))
+    store.add(build_record("second"))
+    store.add(build_record("third"))
+
+    assert store.get("first") is None
+    assert [record.profile_id for record in store.records()] == ["third", "second"]
+
+
+def test_profile_output(tmp_path):
+    stats = {("movie.py", 1, "get_movie"): (1, 1, 0.01, 0.02, {})}
+    record = build_record("first")._replace(stats=stats)
+    profile_file = tmp_path / "first.prof"
+    profile_file.write_bytes(profile_data(record))
+
+    assert pstats.Stats(str(profile_file)).stats == stats
+    assert "get_movie" in profile_text(record)
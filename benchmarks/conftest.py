@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from api.entities.movie import Movie
+from api.repository.movie.memory import MemoryMovieRepository
+
+# Storage sizes for the scaling curves, override with BENCHMARK_SIZES=10000,...
+SIZES = [
+    int(size)
+    for size in os.environ.get("BENCHMARK_SIZES", "10000,100000,1000000").split(",")
+]
+
+# Movies sharing a title, title lookups should cost the same at every size.
+MOVIES_PER_TITLE = 100
+
+
+def resolve(coroutine):
+    """
+    Run a coroutine which never suspends without an event loop, so that
+    only the cost of the repository itself is measured.
+    """
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError("coroutine suspended")
+
+
+def build_movie(index: int, size: int) -> Movie:
+    return Movie.construct(
+        movie_id=f"movie-{index:08d}",
+        title=f"Benchmark movie {index % max(1, size // MOVIES_PER_TITLE)}",
+        description="A movie created by the repository benchmarks",
+        release_year=1901 + index % 120,
+        watched=index % 2 == 0,
+    )
+
+
+@pytest.fixture()
+def movie_document() -> dict:
+    return {
+        "movie_id": "movie-00000001",
+        "title": "Benchmark movie",
+        "description": "A movie created by the repository benchmarks",
+        "release_year": 1991,
+        "watched": False,
+    }
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}-movies")
+def memory_repository(request) -> MemoryMovieRepository:
+    repo = MemoryMovieRepository()
+    for index in range(request.param):
+        resolve(repo.create(build_movie(index, request.param)))
+    return repo
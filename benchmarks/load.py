@@ -0,0 +1,252 @@
+"""
+HTTP load benchmark for the movies API.
+
+Drives a weighted create/get/search/update/delete mix against create_app()
+in process, over an ASGI transport, and reports per operation p50/p95/p99
+latency and throughput. Results are saved as JSON so runs can be compared:
+
+    python -m benchmarks.load --backend memory --output memory.json
+    python -m benchmarks.load --backend mongomock --compare memory.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess  # nosec B404
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from api.api import create_app
+from api.handlers.movie import movie_repository
+from api.repository.movie.abstractions import MovieRepository
+from api.repository.movie.memory import MemoryMovieRepository
+from api.repository.movie.mongo import MongoMovieRepository
+
+OPERATIONS = ("create", "get", "search", "update", "delete")
+DEFAULT_MIX = "create=2,get=10,search=5,update=2,delete=1"
+MOVIES_URL = "/api/v1/movies"
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation: {name}")
+        weights[name] = int(weight)
+    return weights
+
+
+def build_repository(backend: str) -> MovieRepository:
+    if backend == "memory":
+        return MemoryMovieRepository()
+    from mongomock_motor import AsyncMongoMockClient
+
+    return MongoMovieRepository(
+        connection_string="",
+        database="movie_tracker_benchmark",
+        client=AsyncMongoMockClient(),
+    )
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": len(latencies) / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+class LoadRun:
+    def __init__(self, client: httpx.AsyncClient, titles: int, seed: int):
+        self._client = client
+        self._random = random.Random(seed)  # nosec B311
+        self._titles = [f"Benchmark movie {index}" for index in range(titles)]
+        self._movie_ids: list[str] = []
+        self.latencies: dict[str, list[float]] = {name: [] for name in OPERATIONS}
+        self.errors: dict[str, int] = dict.fromkeys(OPERATIONS, 0)
+
+    def movie_json(self) -> dict:
+        return {
+            "movie_id": "benchmark",
+            "title": self._random.choice(self._titles),
+            "description": "A movie created by the load benchmark",
+            "release_year": self._random.randint(1901, 2030),
+            "watched": self._random.random() < 0.5,
+        }
+
+    async def create(self) -> httpx.Response:
+        response = await self._client.post(f"{MOVIES_URL}/", json=self.movie_json())
+        if response.status_code == 201:
+            self._movie_ids.append(response.json())
+        return response
+
+    async def get(self) -> httpx.Response:
+        return await self._client.get(f"{MOVIES_URL}/{self.known_movie_id()}")
+
+    async def search(self) -> httpx.Response:
+        return await self._client.get(
+            f"{MOVIES_URL}/",
+            params={"title": self._random.choice(self._titles), "limit": 100},
+        )
+
+    async def update(self) -> httpx.Response:
+        return await self._client.patch(
+            f"{MOVIES_URL}/{self.known_movie_id()}",
+            json={"watched": self._random.random() < 0.5},
+        )
+
+    async def delete(self) -> httpx.Response:
+        movie_id = self.known_movie_id()
+        if movie_id in self._movie_ids:
+            self._movie_ids.remove(movie_id)
+        return await self._client.delete(f"{MOVIES_URL}/{movie_id}")
+
+    def known_movie_id(self) -> str:
+        if not self._movie_ids:
+            return "missing"
+        return self._random.choice(self._movie_ids)
+
+    async def seed(self, movies: int):
+        for _ in range(movies):
+            await self.create()
+
+    async def run(self, operations: list[str], concurrency: int):
+        queue = iter(operations)
+
+        async def worker():
+            for name in queue:
+                started = time.perf_counter()
+                response = await getattr(self, name)()
+                self.latencies[name].append(time.perf_counter() - started)
+                if response.status_code >= 500:
+                    self.errors[name] += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_benchmark(arguments: argparse.Namespace) -> dict:
+    app = create_app()
+    repo = build_repository(arguments.backend)
+    app.dependency_overrides[movie_repository] = lambda: repo
+    transport = httpx.ASGITransport(app=app)
+    client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+    async with client:
+        load = LoadRun(client, titles=arguments.titles, seed=arguments.seed)
+        await load.seed(arguments.seed_movies)
+        weights = parse_mix(arguments.mix)
+        operations = random.Random(arguments.seed).choices(  # nosec B311
+            list(weights),
+            weights=list(weights.values()),
+            k=arguments.requests,
+        )
+        started = time.perf_counter()
+        await load.run(operations, arguments.concurrency)
+        elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in load.latencies.values() for value in values]
+    return {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": current_commit(),
+            "python": platform.python_version(),
+            "arguments": vars(arguments),
+        },
+        "total": summarize(all_latencies, sum(load.errors.values()), elapsed),
+        "operations": {
+            name: summarize(load.latencies[name], load.errors[name], elapsed)
+            for name in OPERATIONS
+            if load.latencies[name]
+        },
+    }
+
+
+def current_commit() -> str | None:
+    try:
+        return subprocess.run(  # nosec B603 B607
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict, baseline: dict | None = None):
+    header = f"{'operation':<10}{'requests':>10}{'errors':>8}{'req/s':>12}"
+    header += f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)  # noqa: T201
+    rows = {**results["operations"], "total": results["total"]}
+    for name, summary in rows.items():
+        if not summary["requests"]:
+            continue
+        line = f"{name:<10}{summary['requests']:>10}{summary['errors']:>8}"
+        line += f"{summary['requests_per_second']:>12.1f}"
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            line += f"{summary[key]:>10.3f}"
+        print(line)  # noqa: T201
+        previous = (baseline or {}).get("operations", {}).get(name)
+        if name == "total" and baseline:
+            previous = baseline["total"]
+        if previous and previous.get("requests"):
+            delta = f"{'':<10}{'vs baseline':>18}"
+            delta += f"{change(summary, previous, 'requests_per_second'):>12}"
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                delta += f"{change(summary, previous, key):>10}"
+            print(delta)  # noqa: T201
+
+
+def change(summary: dict, previous: dict, key: str) -> str:
+    if not previous[key]:
+        return "n/a"
+    return f"{(summary[key] / previous[key] - 1) * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--backend", choices=["memory", "mongomock"], default="memory")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed-movies", type=int, default=1000)
+    parser.add_argument("--titles", type=int, default=100)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    arguments = parser.parse_args()
+    parse_mix(arguments.mix)
+
+    results = asyncio.run(run_benchmark(arguments))
+    baseline = None
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(results, baseline)
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Measure the bytes per movie held by MemoryMovieRepository, with Movie models
+and with compact storage, for the stored movies alone and with the indexes.
+
+    python -m benchmarks.memory_footprint --movies 100000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from api.entities.movie import Movie
+from api.repository.movie.memory import MemoryMovieRepository
+
+
+def build_movie(index: int) -> Movie:
+    return Movie(
+        movie_id=f"{index:08}-0000-4000-8000-000000000000",
+        title=f"Benchmark movie {index % 5000}",
+        description=f"Description of benchmark movie number {index}",
+        release_year=1900 + index % 120,
+        watched=index % 2 == 0,
+    )
+
+
+def bytes_per_movie(movies: int, compact: bool, indexed: bool) -> float:
+    gc.collect()
+    tracemalloc.start()
+    repo = MemoryMovieRepository(compact=compact)
+    for index in range(movies):
+        movie = build_movie(index)
+        if indexed:
+            repo._create(movie)
+        else:
+            repo._storage[movie.id] = repo._stored(movie)
+    del movie
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / movies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=100000)
+    arguments = parser.parse_args()
+
+    for indexed in (False, True):
+        scope = "with indexes" if indexed else "storage"
+        for compact in (False, True):
+            name = "compact" if compact else "models"
+            size = bytes_per_movie(arguments.movies, compact, indexed)
+            print(f"{scope:>12} {name:>8}: {size:8.0f} bytes per movie")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compare the model based read path against the trusted document path for a
+title page of stored movie documents.
+
+    python -m benchmarks.read_path --page-size 1000
+"""
+import argparse
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from api.entities.movie import Movie
+from api.responses.fast_json import FastJSONResponse
+
+
+def title_page(page_size: int) -> list[dict]:
+    return [
+        Movie(
+            movie_id=f"movie-{index}",
+            title="My movie",
+            description="A movie description which is a bit longer " * 4,
+            release_year=1900 + index % 120,
+            watched=index % 2 == 0,
+        ).dict()
+        for index in range(page_size)
+    ]
+
+
+def model_path(documents: list[dict]) -> bytes:
+    # Movie(**document) in the repository, then FastAPI's encoding of the
+    # returned models.
+    movies = [Movie(**document) for document in documents]
+    return JSONResponse(content=jsonable_encoder(movies)).body
+
+
+def document_path(documents: list[dict]) -> bytes:
+    return FastJSONResponse(content=documents).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    arguments = parser.parse_args()
+
+    documents = title_page(arguments.page_size)
+    assert model_path(documents) == document_path(documents)
+    results = {}
+    for name, path in (("model", model_path), ("document", document_path)):
+        timings = timeit.repeat(
+            lambda path=path: path(documents),
+            repeat=arguments.repeat,
+            number=arguments.number,
+        )
+        results[name] = min(timings) / arguments.number
+        print(f"{name:>8}: {results[name] * 1000:8.3f} ms per page")  # noqa: T201
+    print(f" speedup: {results['model'] / results['document']:8.1f}x")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
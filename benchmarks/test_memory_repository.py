@@ -0,0 +1,56 @@
+from benchmarks.conftest import MOVIES_PER_TITLE, build_movie, resolve
+
+
+def size_of(repo) -> int:
+    return len(repo._storage)
+
+
+def test_get(benchmark, memory_repository):
+    benchmark.group = "memory-get"
+    size = size_of(memory_repository)
+    benchmark.extra_info["size"] = size
+    movie_id = build_movie(size // 2, size).movie_id
+    assert benchmark(lambda: resolve(memory_repository.get(movie_id))) is not None
+
+
+def test_get_by_title(benchmark, memory_repository):
+    benchmark.group = "memory-get-by-title"
+    benchmark.extra_info["size"] = size_of(memory_repository)
+    movies = benchmark(
+        lambda: resolve(memory_repository.get_by_title("Benchmark movie 7")),
+    )
+    assert len(movies) == MOVIES_PER_TITLE
+
+
+def test_get_by_title_page(benchmark, memory_repository):
+    benchmark.group = "memory-get-by-title-page"
+    benchmark.extra_info["size"] = size_of(memory_repository)
+    movies = benchmark(
+        lambda: resolve(
+            memory_repository.get_by_title("Benchmark movie 7", offset=90, limit=10),
+        ),
+    )
+    assert len(movies) == 10
+
+
+def test_text_search(benchmark, memory_repository):
+    benchmark.group = "memory-text-search"
+    benchmark.extra_info["size"] = size_of(memory_repository)
+    documents = benchmark(
+        lambda: resolve(memory_repository.search_documents("movie 7", fields=[])),
+    )
+    assert len(documents) == 20
+
+
+def test_create_and_delete(benchmark, memory_repository):
+    benchmark.group = "memory-create-delete"
+    size = size_of(memory_repository)
+    benchmark.extra_info["size"] = size
+    movie = build_movie(size, size)
+
+    def create_and_delete():
+        resolve(memory_repository.create(movie))
+        resolve(memory_repository.delete(movie.movie_id))
+
+    benchmark(create_and_delete)
+    assert size_of(memory_repository) == size
@@ -1,11 +1,38 @@
+import os
+
 import uvicorn
 
-from api.api import create_app
+from api.handlers.movie import settings_instance
+from api.settings import Settings
+
+
+def worker_count(settings: Settings) -> int:
+    workers = settings.server_workers or os.cpu_count() or 1
+    if workers != 1 and settings.movie_repository_backend != "mongo":
+        # Every worker would serve and write its own copy of the movies.
+        raise ValueError(
+            f"The {settings.movie_repository_backend} movie repository backend "
+            "needs a single worker, set SERVER_WORKERS=1",
+        )
+    return workers
 
 
 def main():
-    app = create_app()
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    settings = settings_instance()
+    # The application is imported by its factory in every worker, so the
+    # repository clients are created after the fork, in each worker's lifespan.
+    uvicorn.run(
+        "api.api:create_app",
+        factory=True,
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=worker_count(settings),
+        loop=settings.server_loop,
+        http=settings.server_http,
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keep_alive_seconds,
+        limit_concurrency=settings.server_limit_concurrency,
+    )
 
 
 if __name__ == "__main__":